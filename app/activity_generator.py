@@ -0,0 +1,134 @@
+"""
+Синтетические данные трекеров для нагрузочных тестов без реальных устройств.
+
+Для users пользователей (chat_id synthetic-0, synthetic-1, ...) генерируются
+сэмплы за последние days суток с шагом interval минут: базовый обмен круглые
+сутки плюс случайная активность днём. Результат пишется NDJSON-файлом
+(формат ActivitySampleForm) или сразу в БД через ActivityService.
+
+Пример:
+    poetry run generate-activity --users 100 --days 365 --db
+    poetry run generate-activity --users 10 --days 7 --output samples.ndjson
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from app.activity_service import ActivityService
+from app.schemas.activity import MAX_SAMPLE_AGE, ActivitySampleForm
+from app.utils.database import Database
+from app.utils.log import setup_logging
+
+log = logging.getLogger("activity-generator")
+
+BASAL_CALORIES_PER_DAY = 1500
+CHAT_ID_PREFIX = "synthetic-"
+
+
+def chat_ids(users: int) -> List[str]:
+    return [f"{CHAT_ID_PREFIX}{i}" for i in range(users)]
+
+
+def generate_samples(
+    users: int,
+    days: int,
+    interval_minutes: int = 15,
+    seed: int = 0,
+    now: Optional[datetime] = None,
+) -> Iterator[ActivitySampleForm]:
+    """Сэмплы по дням, внутри дня — по пользователям; память не растёт с days."""
+    rng = random.Random(seed)
+    step = timedelta(minutes=interval_minutes)
+    basal = BASAL_CALORIES_PER_DAY * interval_minutes / (24 * 60)
+    now = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    start = (now - timedelta(days=days)).replace(minute=0)
+    ids = chat_ids(users)
+    day_start = start
+    while day_start < now:
+        day_end = min(day_start + timedelta(days=1), now)
+        for chat_id in ids:
+            started_at = day_start
+            while started_at < day_end:
+                calories = basal
+                if 7 <= started_at.hour < 22 and rng.random() < 0.3:
+                    calories += rng.uniform(5, 120) * interval_minutes / 15
+                yield ActivitySampleForm(chat_id=chat_id, started_at=started_at, calories=round(calories, 2))
+                started_at += step
+        day_start = day_end
+
+
+def write_ndjson(samples: Iterator[ActivitySampleForm], path: str) -> int:
+    count = 0
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    try:
+        for sample in samples:
+            out.write(json.dumps({
+                "chat_id": sample.chat_id,
+                "started_at": sample.started_at.isoformat(),
+                "calories": sample.calories,
+            }) + "\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+async def load_to_db(samples: Iterator[ActivitySampleForm], users: int, batch_size: int) -> int:
+    db = Database()
+    service = ActivityService()
+    for chat_id in chat_ids(users):
+        await db.get_or_create_user_id(chat_id)
+
+    started = time.monotonic()
+    received = inserted = 0
+    batch: List[ActivitySampleForm] = []
+
+    async def flush() -> None:
+        nonlocal inserted
+        inserted += await service.ingest(batch)
+        batch.clear()
+        elapsed = time.monotonic() - started
+        log.info("Сэмплов %d, новых %d (%.0f сэмплов/с)", received, inserted, received / elapsed if elapsed else 0.0)
+
+    for sample in samples:
+        batch.append(sample)
+        received += 1
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return inserted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Синтетические сэмплы активности")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=15, help="Длина интервала сэмпла, минуты")
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="NDJSON-файл, '-' — stdout")
+    target.add_argument("--db", action="store_true", help="Записать в БД из .env")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    if not 1 <= args.days <= MAX_SAMPLE_AGE.days - 1:
+        parser.error(f"--days: от 1 до {MAX_SAMPLE_AGE.days - 1}, старые сэмплы не принимаются")
+
+    samples = generate_samples(args.users, args.days, args.interval, args.seed)
+    if args.output:
+        write_ndjson(samples, args.output)
+        return
+
+    setup_logging()
+    asyncio.run(load_to_db(samples, args.users, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
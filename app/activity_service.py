@@ -0,0 +1,93 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from app.config import get_settings
+from app.mocks import HumanApiServiceMock
+from app.schemas.activity import ActivitySampleForm
+from app.utils.database import Database, is_transient_db_error
+from app.utils.write_behind import WriteBehindBuffer
+
+log = logging.getLogger("activity")
+
+
+class ActivityService:
+    """
+    Сожжённые калории по данным трекеров.
+
+    Сэмплы за интервалы пишутся в секционированную по месяцам таблицу
+    activity_samples, и в том же запросе прибавляются к дневным суммам
+    activity_daily. Запрос за N дней читает не больше N строк activity_daily
+    и не трогает сырые сэмплы. Пока от трекера ничего не пришло, ответ
+    берётся из HumanApiServiceMock.
+
+    Потоковый приём (POST /activity/stream) пишет через buffer: сэмплы
+    копятся в памяти и уходят в ingest пачками по ACTIVITY_FLUSH_BATCH_SIZE.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.db = Database()
+        self.fallback = HumanApiServiceMock()
+        self.timezone = settings.ACTIVITY_TIMEZONE
+        self.zone = ZoneInfo(self.timezone)
+        # Месяцы, секции которых уже созданы этим процессом
+        self._partitions: Set[date] = set()
+        self.samples_received = 0
+        self.samples_inserted = 0
+        self.rollup_reads = 0
+        self.fallback_reads = 0
+        self.buffer: WriteBehindBuffer[ActivitySampleForm] = WriteBehindBuffer(
+            "activity",
+            self.ingest,
+            max_items=settings.ACTIVITY_BUFFER_MAX_SAMPLES,
+            batch_size=settings.ACTIVITY_FLUSH_BATCH_SIZE,
+            interval=settings.ACTIVITY_FLUSH_INTERVAL,
+            put_timeout=settings.ACTIVITY_BUFFER_PUT_TIMEOUT,
+            attempts=settings.ACTIVITY_FLUSH_ATTEMPTS,
+            retry_if=is_transient_db_error,
+        )
+
+    async def ingest(self, samples: List[ActivitySampleForm]) -> int:
+        """Сохраняет пачку сэмплов; возвращает, сколько из них новые."""
+        if not samples:
+            return 0
+        months = {
+            sample.started_at.astimezone(timezone.utc).date().replace(day=1) for sample in samples
+        }
+        missing = months - self._partitions
+        if missing:
+            await self.db.ensure_activity_partitions(missing)
+            self._partitions |= missing
+        inserted, days = await self.db.add_activity_samples(samples, self.timezone)
+        self.samples_received += len(samples)
+        self.samples_inserted += inserted
+        log.debug("Сэмплов: %d, новых: %d, дней обновлено: %d", len(samples), inserted, days)
+        return inserted
+
+    def first_day(self, days: Optional[int]) -> date:
+        """Первый день периода: days=1 — только сегодня (в ACTIVITY_TIMEZONE)."""
+        days = days if days and days > 0 else 1
+        return datetime.now(self.zone).date() - timedelta(days=days - 1)
+
+    async def get_calories_burned(self, user_id: UUID, days: Optional[int] = None) -> float:
+        """Калории за последние days суток, включая сегодняшние."""
+        calories, days_with_data = await self.db.get_activity_total(user_id, self.first_day(days))
+        if days_with_data:
+            self.rollup_reads += 1
+            return calories
+        self.fallback_reads += 1
+        return self.fallback.get_calories_burned(days)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timezone": self.timezone,
+            "partitions_known": len(self._partitions),
+            "samples_received": self.samples_received,
+            "samples_inserted": self.samples_inserted,
+            "rollup_reads": self.rollup_reads,
+            "fallback_reads": self.fallback_reads,
+            "buffer": self.buffer.stats(),
+        }
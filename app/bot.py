@@ -14,14 +14,27 @@ from telegram.ext import (
 
 from app.config import get_settings
 from app import handlers
+from app.send_queue import OutboundQueue
+from app.update_processor import PerChatUpdateProcessor
+from app.utils.log import setup_logging
+from app.utils.metrics import registry, timed
+from app.utils.unit_of_work import unit_of_work
 
 
-logging.basicConfig(
-    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    level=logging.INFO,
-)
 log = logging.getLogger("tg-bot")
 
+HANDLER_DURATION = registry.histogram(
+    "bot_handler_duration_seconds", "Длительность обработчиков команд бота", ("command",)
+)
+HANDLER_ERRORS = registry.counter(
+    "bot_handler_errors_total", "Ошибки в обработчиках команд бота", ("command",)
+)
+
+# Процессор обновлений последнего собранного приложения (для /bot/stats)
+update_processor: Optional[PerChatUpdateProcessor] = None
+# Очередь исходящих сообщений того же приложения
+send_queue: Optional[OutboundQueue] = None
+
 
 # ====================== УТИЛИТЫ ======================
 def _user_id(update: Update) -> Optional[int]:
@@ -78,13 +91,22 @@ def _build_full_model(update: Update, command: str) -> Dict[str, Any]:
     }
 
 
+def _reply(update: Update, text: str, **kwargs: Any) -> None:
+    """Ответ в чат через очередь отправки: обработчик не ждёт Telegram."""
+    send_queue.enqueue(update.effective_chat.id, text, **kwargs)
+
+
 # ====================== ОБРАБОТЧИКИ ======================
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="start")
 async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     model = _build_full_model(update, "start")
-    log.info(f"Start command: {model}")
-    reply = await handlers.start(model)
-    await update.message.reply_text(reply)
+    log.info("Start command: chat_id=%s", model["chat"]["id"])
+    log.debug("Start command model: %s", model)
+    async with unit_of_work(actor=model["chat"]["id"]):
+        reply = await handlers.start(model)
+    _reply(update, reply)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="help")
 async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     text = (
         "Доступные команды:\n"
@@ -95,39 +117,53 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "/change_product — сменить текущий продукт\n"
         "/add_custom_product — добавить персональный продукт\n"
         "/notify — авто-оповещение за прошлый день\n"
+        "/suggest — что можно съесть на сожжённые калории (калории, белок, избранное)\n"
         "/get_product — показать текущий продукт\n"
         "\n"
         "Можно вводить и варианты с подчёркиванием: /product_count_manual и т.д."
     )
-    await update.message.reply_text(text, parse_mode=ParseMode.HTML)
+    _reply(update, text, parse_mode=ParseMode.HTML)
 
 
 async def _call_service_and_reply(update: Update, command: str, handler):
     model = _build_full_model(update, command)
     try:
-        reply = await handler(model)
+        # Все запросы команды — в одной сессии и транзакции; ответ уходит после COMMIT
+        async with unit_of_work(actor=model["chat"]["id"]):
+            reply = await handler(model)
     except Exception as e:
+        HANDLER_ERRORS.inc(command=command)
         log.exception("Service handler failed for %s: %s", command, e)
         reply = f"Ошибка: {str(e)}"
-    await update.message.reply_text(reply)
+    _reply(update, reply)
 
 
 # ====== Команды ======
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="product-count-manual")
 async def product_count_manual_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "product-count-manual", handlers.product_count_manual)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="product-count")
 async def product_count_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "product-count", handlers.product_count)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="change-product")
 async def change_product_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "change-product", handlers.change_product)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="add-custom-product")
 async def add_custom_product_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "add-custom-product", handlers.add_custom_product)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="notify")
 async def notify_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "notify", handlers.notify)
 
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="suggest")
+async def suggest_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await _call_service_and_reply(update, "suggest", handlers.suggest)
+
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="get-product")
 async def get_product_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _call_service_and_reply(update, "get-product", handlers.get_product)
 
@@ -142,24 +178,61 @@ async def hyphen_alias_router(update: Update, context: ContextTypes.DEFAULT_TYPE
         "change-product": change_product_cmd,
         "add-custom-product": add_custom_product_cmd,
         "notify": notify_cmd,
+        "suggest": suggest_cmd,
         "get-product": get_product_cmd,
     }
     handler = mapping.get(cmd)
     if handler:
         await handler(update, context)
     else:
-        await update.message.reply_text("Неизвестная команда. Напиши /help.")
+        _reply(update, "Неизвестная команда. Напиши /help.")
 
 
 # ====== Текст ======
+@timed(HANDLER_DURATION, HANDLER_ERRORS, command="text")
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     model = _build_full_model(update, "text")
     reply = handlers.process_text(model)
-    await update.message.reply_text(reply)
+    _reply(update, reply)
 
 
-def build_app(token: str) -> Application:
-    app = ApplicationBuilder().token(token).build()
+async def _post_init(app: Application) -> None:
+    # Токен FatSecret и продукт по умолчанию получаем заранее,
+    # а не на первом запросе пользователя
+    await handlers.service.start()
+    await send_queue.start()
+
+
+async def _post_stop(app: Application) -> None:
+    # Бот ещё инициализирован: успеваем отправить уже поставленные в очередь ответы
+    await send_queue.stop()
+
+
+async def _post_shutdown(app: Application) -> None:
+    # Закрываем пул соединений FatSecret в том же loop, где он создавался
+    await handlers.service.nutrition.aclose()
+
+
+def build_app(token: str, webhook: bool = False) -> Application:
+    global update_processor, send_queue
+    settings = get_settings()
+    update_processor = PerChatUpdateProcessor(
+        workers=settings.BOT_CONCURRENT_UPDATES,
+        max_pending=settings.BOT_MAX_PENDING_UPDATES,
+    )
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(update_processor)
+        .post_init(_post_init)
+        .post_stop(_post_stop)
+        .post_shutdown(_post_shutdown)
+    )
+    if webhook:
+        # Обновления кладёт в update_queue маршрут FastAPI, Updater не нужен
+        builder = builder.updater(None)
+    app = builder.build()
+    send_queue = OutboundQueue(app.bot, workers=settings.TELEGRAM_SEND_WORKERS)
 
     # Базовые команды
     app.add_handler(CommandHandler("start", start_cmd))
@@ -171,6 +244,7 @@ def build_app(token: str) -> Application:
     app.add_handler(CommandHandler("change_product", change_product_cmd))
     app.add_handler(CommandHandler("add_custom_product", add_custom_product_cmd))
     app.add_handler(CommandHandler("notify", notify_cmd))
+    app.add_handler(CommandHandler("suggest", suggest_cmd))
     app.add_handler(CommandHandler("get_product", get_product_cmd))
 
     # Алиасы с дефисами
@@ -179,6 +253,7 @@ def build_app(token: str) -> Application:
     app.add_handler(MessageHandler(filters.Regex(r"^/(change\-product)\b"), hyphen_alias_router))
     app.add_handler(MessageHandler(filters.Regex(r"^/(add\-custom\-product)\b"), hyphen_alias_router))
     app.add_handler(MessageHandler(filters.Regex(r"^/(notify)\b"), hyphen_alias_router))
+    app.add_handler(MessageHandler(filters.Regex(r"^/(suggest)\b"), hyphen_alias_router))
     app.add_handler(MessageHandler(filters.Regex(r"^/(get\-product)\b"), hyphen_alias_router))
 
     # Обычный текст
@@ -188,6 +263,7 @@ def build_app(token: str) -> Application:
 
 
 def main() -> None:
+    setup_logging()
     token = get_settings().TELEGRAM_BOT_TOKEN
     if not token:
         raise RuntimeError("TELEGRAM_BOT_TOKEN не задан в .env")
@@ -0,0 +1,39 @@
+"""food cache
+
+Revision ID: 7d3f2a9c1b6e
+Revises: 40cc56154025
+Create Date: 2025-11-20 18:12:41.503127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f2a9c1b6e'
+down_revision: Union[str, Sequence[str], None] = '40cc56154025'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('food_cache',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('found', sa.Boolean(), nullable=False),
+    sa.Column('food_name', sa.String(), nullable=True),
+    sa.Column('calories', sa.Float(), nullable=True),
+    sa.Column('serving_description', sa.String(), nullable=True),
+    sa.Column('protein', sa.Float(), nullable=True),
+    sa.Column('fat', sa.Float(), nullable=True),
+    sa.Column('carbohydrates', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key', name=op.f('pk__food_cache'))
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('food_cache')
@@ -0,0 +1,54 @@
+"""daily digest deliveries
+
+Revision ID: 9a4f0c6e2b17
+Revises: e5c81d3a7f42
+Create Date: 2026-10-18 15:20:11.530482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f0c6e2b17'
+down_revision: Union[str, Sequence[str], None] = 'e5c81d3a7f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('notify_enabled', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Сводку строим только по подписчикам: частичный индекс вместо полного скана users
+    op.create_index(
+        'ix__users__notify_enabled', 'users', ['id'], postgresql_where=sa.text('notify_enabled'),
+    )
+    op.create_table('digest_deliveries',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=False),
+    sa.Column('product_name', sa.String(), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.Column('grams', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk__digest_deliveries__user_id__users')),
+    sa.PrimaryKeyConstraint('user_id', 'day', name=op.f('pk__digest_deliveries')),
+    )
+    # Очередь на отправку и незавершённые отправки; отправленные в индекс не попадают
+    op.create_index(
+        'ix__digest_deliveries__day_shard_status', 'digest_deliveries', ['day', 'shard', 'status'],
+        postgresql_where=sa.text("status IN ('pending', 'sending')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix__digest_deliveries__day_shard_status', table_name='digest_deliveries')
+    op.drop_table('digest_deliveries')
+    op.drop_index('ix__users__notify_enabled', table_name='users')
+    op.drop_column('users', 'notify_enabled')
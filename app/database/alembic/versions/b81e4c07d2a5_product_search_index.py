@@ -0,0 +1,72 @@
+"""product search index
+
+Revision ID: b81e4c07d2a5
+Revises: 7d3f2a9c1b6e
+Create Date: 2025-11-22 13:40:07.918254
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e4c07d2a5'
+down_revision: Union[str, Sequence[str], None] = '7d3f2a9c1b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize(name: str) -> str:
+    # Копия app.utils.food_names.normalize_food_name на момент миграции
+    name = name.casefold().replace("ё", "е")
+    name = re.sub(r"[^\w\s%-]+", " ", name)
+    return " ".join(name.split())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('products', sa.Column('normalized_name', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('protein', sa.Float(), nullable=True))
+    op.add_column('products', sa.Column('fat', sa.Float(), nullable=True))
+    op.add_column('products', sa.Column('carbohydrates', sa.Float(), nullable=True))
+
+    bind = op.get_bind()
+    products = bind.execute(sa.text("SELECT id, name FROM products")).fetchall()
+    for product_id, name in products:
+        bind.execute(
+            sa.text("UPDATE products SET normalized_name = :normalized WHERE id = :id"),
+            {"normalized": _normalize(name), "id": product_id},
+        )
+    op.alter_column('products', 'normalized_name', nullable=False)
+
+    # btree для точного и префиксного поиска, GIN-триграммы для нечёткого
+    op.create_index(op.f('ix__products__normalized_name'), 'products', ['normalized_name'], unique=False)
+    op.create_index(
+        'ix__products__normalized_name_pattern', 'products', ['normalized_name'],
+        postgresql_ops={'normalized_name': 'text_pattern_ops'},
+    )
+    op.create_index(
+        'ix__products__normalized_name_trgm', 'products', ['normalized_name'],
+        postgresql_using='gin', postgresql_ops={'normalized_name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix__food_cache__key_trgm', 'food_cache', ['key'],
+        postgresql_using='gin', postgresql_ops={'key': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix__food_cache__key_trgm', table_name='food_cache')
+    op.drop_index('ix__products__normalized_name_trgm', table_name='products')
+    op.drop_index('ix__products__normalized_name_pattern', table_name='products')
+    op.drop_index(op.f('ix__products__normalized_name'), table_name='products')
+    op.drop_column('products', 'carbohydrates')
+    op.drop_column('products', 'fat')
+    op.drop_column('products', 'protein')
+    op.drop_column('products', 'normalized_name')
@@ -0,0 +1,36 @@
+"""user product picks for /suggest favorites
+
+Revision ID: c3e7a91f5d08
+Revises: 9a4f0c6e2b17
+Create Date: 2026-10-18 18:42:37.204915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a91f5d08'
+down_revision: Union[str, Sequence[str], None] = '9a4f0c6e2b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_products',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('picks', sa.Integer(), nullable=False),
+    sa.Column('last_picked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk__user_products__product_id__products')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk__user_products__user_id__users')),
+    sa.PrimaryKeyConstraint('user_id', 'product_id', name=op.f('pk__user_products')),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_products')
@@ -0,0 +1,46 @@
+"""activity samples and daily rollups
+
+Revision ID: e5c81d3a7f42
+Revises: b81e4c07d2a5
+Create Date: 2026-10-18 11:02:36.214907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c81d3a7f42'
+down_revision: Union[str, Sequence[str], None] = 'b81e4c07d2a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Помесячные секции создаются приложением по мере поступления данных
+    op.create_table('activity_samples',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk__activity_samples__user_id__users')),
+    sa.PrimaryKeyConstraint('user_id', 'started_at', name=op.f('pk__activity_samples')),
+    postgresql_partition_by='RANGE (started_at)',
+    )
+    op.create_table('activity_daily',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk__activity_daily__user_id__users')),
+    sa.PrimaryKeyConstraint('user_id', 'day', name=op.f('pk__activity_daily')),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('activity_daily')
+    # Секции удаляются вместе с родительской таблицей
+    op.drop_table('activity_samples')
@@ -0,0 +1,154 @@
+"""
+Метрики async-движка: время каждого SQL-запроса по его отпечатку,
+ожидание соединения из пула, заполненность пула и пересоздание соединений.
+"""
+import hashlib
+import logging
+import re
+import time
+import weakref
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.utils.metrics import Family, registry
+
+slow_query_log = logging.getLogger("slow-query")
+
+STATEMENT_DURATION = registry.histogram(
+    "db_statement_duration_seconds",
+    "Длительность SQL-запросов по отпечатку (см. db_statement_info)",
+    ("engine", "query"),
+)
+CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула",
+    ("engine",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+CHECKOUT_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total", "Не дождались соединения из пула за pool_timeout", ("engine",)
+)
+CONNECTIONS = registry.counter(
+    "db_connections_total", "События жизненного цикла соединений пула", ("engine", "event")
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+(?:::[\w\[\]]+)?|%\(\w+\)s|\?")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+# Движок -> имя: по ним коллектор снимает состояние пулов. Движков с одним
+# именем несколько (свой у каждого event loop), их пулы суммируются
+_engines: "weakref.WeakKeyDictionary[AsyncEngine, str]" = weakref.WeakKeyDictionary()
+# id отпечатка -> текст, для db_statement_info
+_statements: Dict[str, str] = {}
+MAX_STATEMENTS = 1024
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """
+    Нормализованный текст запроса без значений и его короткий id:
+    `WHERE key IN ($1, $2, $3)` и `IN ($1)` дают один отпечаток.
+    """
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _STRING.sub("?", text)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _PARAM_LIST.sub("(...)", text)
+    text = _VALUES_LIST.sub(r"\1", text)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12], text
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, замеряющий ожидание свободного соединения."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            CHECKOUT_TIMEOUTS.inc(engine=self.metrics_name)
+            raise
+        finally:
+            CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+
+def instrument_engine(engine: AsyncEngine, name: str, slow_query_ms: int) -> None:
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, InstrumentedPool):
+        sync_engine.pool.metrics_name = name
+    _engines[engine] = name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        query_id, text = fingerprint(statement)
+        STATEMENT_DURATION.observe(elapsed, engine=name, query=query_id)
+        if query_id not in _statements and len(_statements) < MAX_STATEMENTS:
+            _statements[query_id] = text
+        if slow_query_ms > 0 and elapsed * 1000 >= slow_query_ms:
+            # Параметры не логируем: в них могут быть chat_id и пачки импорта
+            slow_query_log.warning(
+                "%.1f ms [%s] %s", elapsed * 1000, query_id, text[:1000],
+                extra={"query_id": query_id, "duration_ms": round(elapsed * 1000, 1), "engine": name},
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute не вызывается, если запрос упал
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+    for pool_event in ("connect", "close", "invalidate", "soft_invalidate"):
+        event.listen(sync_engine.pool, pool_event, _count_connection_event(name, pool_event))
+
+
+def _count_connection_event(name: str, pool_event: str):
+    def listener(*args) -> None:
+        CONNECTIONS.inc(engine=name, event=pool_event)
+    return listener
+
+
+def _collect_pool_metrics() -> Iterable[Family]:
+    pools: Dict[str, Dict[str, int]] = {}
+    for engine, name in list(_engines.items()):
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            continue
+        totals = pools.setdefault(name, {"checked_out": 0, "size": 0, "overflow": 0, "capacity": 0})
+        totals["checked_out"] += pool.checkedout()
+        totals["size"] += pool.size()
+        totals["overflow"] += pool.overflow()
+        totals["capacity"] += pool.size() + max(pool._max_overflow, 0)
+    checked_out, size, overflow, saturation = [], [], [], []
+    for name, totals in pools.items():
+        labels = {"engine": name}
+        checked_out.append((labels, totals["checked_out"]))
+        size.append((labels, totals["size"]))
+        overflow.append((labels, totals["overflow"]))
+        capacity = totals["capacity"]
+        saturation.append((labels, totals["checked_out"] / capacity if capacity else 0.0))
+    yield ("db_pool_checked_out", "gauge", "Соединения, выданные из пула", checked_out)
+    yield ("db_pool_size", "gauge", "pool_size движков (сумма по event loop)", size)
+    yield ("db_pool_overflow", "gauge", "Текущее превышение pool_size (отрицательно, пока пул не заполнен)", overflow)
+    yield ("db_pool_saturation", "gauge", "Доля занятых соединений от pool_size + max_overflow", saturation)
+    yield ("db_statement_info", "gauge", "Отпечатки SQL-запросов по id",
+           [({"query": query_id, "statement": text[:500]}, 1) for query_id, text in list(_statements.items())])
+
+
+registry.add_collector(_collect_pool_metrics)
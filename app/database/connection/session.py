@@ -1,23 +1,91 @@
-from typing import AsyncGenerator
+"""
+Движки и фабрики сессий — свои у каждого event loop.
+
+Соединения asyncpg привязаны к loop, в котором открыты, а в режиме polling
+бот работает в отдельном потоке со своим loop. Общий пул отдавал бы
+соединение, открытое одним loop, другому ("attached to a different loop"),
+поэтому движок и пул создаются лениво для каждого работающего loop.
+Настройки DB_POOL_* относятся к пулу одного loop.
+"""
+import asyncio
+import threading
+import weakref
+from typing import AsyncGenerator, Optional
 
 from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.config import get_settings
+from app.database.connection.instrumentation import InstrumentedPool, instrument_engine
 
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.database_uri,
-    echo=True,
-    future=True,
-    pool_size=10,
-    max_overflow=0,
+
+def _create_engine(uri: str, name: str) -> AsyncEngine:
+    settings = get_settings()
+    engine = create_async_engine(
+        uri,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        query_cache_size=settings.DB_COMPILED_CACHE_SIZE,
+        connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(engine, name, slow_query_ms=settings.DB_SLOW_QUERY_MS)
+    return engine
+
+
+class _LoopEngines:
+    def __init__(self):
+        settings = get_settings()
+        self.engine = _create_engine(settings.database_uri, "primary")
+        self.session_maker = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        # Только для чтения; None, если DATABASE_REPLICA_URI не задан
+        self.replica_session_maker: Optional[sessionmaker] = None
+        if settings.database_replica_uri is not None:
+            self.replica_session_maker = sessionmaker(
+                _create_engine(settings.database_replica_uri, "replica"),
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+
+
+# Запись пропадает вместе с закрытым loop
+_loop_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopEngines]" = (
+    weakref.WeakKeyDictionary()
 )
+_lock = threading.Lock()
+
 
-async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+def _current() -> _LoopEngines:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        engines = _loop_engines.get(loop)
+        if engines is None:
+            engines = _loop_engines[loop] = _LoopEngines()
+        return engines
+
+
+def get_engine() -> AsyncEngine:
+    """Движок primary текущего event loop."""
+    return _current().engine
+
+
+def async_session_maker() -> AsyncSession:
+    """Новая сессия primary в текущем event loop."""
+    return _current().session_maker()
+
+
+def get_replica_session_maker() -> Optional[sessionmaker]:
+    """Фабрика сессий реплики текущего event loop; None, если реплики нет."""
+    return _current().replica_session_maker
 
 
 def get_sync_session():
@@ -31,14 +99,9 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 def refresh_engine() -> None:
-    global engine, async_session_maker
-    engine = create_async_engine(
-        get_settings().database_uri,
-        echo=True,
-        future=True,
-        pool_size=200,
-        max_overflow=0,
-    )
-    async_session_maker = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+    """
+    Пересоздаёт движки с текущими настройками пула (DB_POOL_*): каждый
+    loop получит новый при следующем обращении.
+    """
+    with _lock:
+        _loop_engines.clear()
@@ -1,2 +1,6 @@
 from .user import User
 from .product import Product
+from .food_cache import FoodCache
+from .activity import ActivitySample, ActivityDaily
+from .digest import DigestDelivery
+from .user_product import UserProduct
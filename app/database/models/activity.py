@@ -0,0 +1,33 @@
+from sqlalchemy import UUID, Column, Date, DateTime, Float, ForeignKey, Integer
+from app.database import DeclarativeBase
+
+
+class ActivitySample(DeclarativeBase):
+    """
+    Сожжённые калории за интервал от трекера. Таблица секционирована по
+    месяцам started_at (секции создаёт Database.ensure_activity_partitions),
+    поэтому started_at входит в первичный ключ. Повторно присланный
+    интервал с тем же started_at не учитывается дважды.
+    """
+    __tablename__ = "activity_samples"
+    __table_args__ = {"postgresql_partition_by": "RANGE (started_at)"}
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    started_at = Column(DateTime(timezone=True), primary_key=True)
+    calories = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"ActivitySample(user_id={self.user_id}, started_at={self.started_at}, calories={self.calories})"
+
+
+class ActivityDaily(DeclarativeBase):
+    """Суммы activity_samples по дням (ACTIVITY_TIMEZONE), обновляются при вставке."""
+    __tablename__ = "activity_daily"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    calories = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"ActivityDaily(user_id={self.user_id}, day={self.day}, calories={self.calories})"
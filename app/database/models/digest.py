@@ -0,0 +1,27 @@
+from sqlalchemy import UUID, Column, Date, DateTime, Float, ForeignKey, SmallInteger, String
+from app.database import DeclarativeBase
+
+
+class DigestDelivery(DeclarativeBase):
+    """
+    Ежедневная сводка одному пользователю за день day. Строка создаётся
+    со статусом pending, перед отправкой переводится в sending, после —
+    в sent/failed/blocked. sending, оставшийся после падения процесса,
+    становится unknown и повторно не отправляется: Telegram мог сообщение
+    уже доставить.
+    """
+    __tablename__ = "digest_deliveries"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    shard = Column(SmallInteger, nullable=False)
+    chat_id = Column(String, nullable=False)
+    product_name = Column(String, nullable=False)
+    calories = Column(Float, nullable=False)
+    grams = Column(Float, nullable=False)
+    status = Column(String, nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"DigestDelivery(user_id={self.user_id}, day={self.day}, status='{self.status}')"
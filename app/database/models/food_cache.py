@@ -0,0 +1,20 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, String, func
+from app.database import DeclarativeBase
+
+
+class FoodCache(DeclarativeBase):
+    __tablename__ = "food_cache"
+
+    # Нормализованное название запроса (см. normalize_food_name)
+    key = Column(String, primary_key=True)
+    found = Column(Boolean, nullable=False)
+    food_name = Column(String, nullable=True)
+    calories = Column(Float, nullable=True)
+    serving_description = Column(String, nullable=True)
+    protein = Column(Float, nullable=True)
+    fat = Column(Float, nullable=True)
+    carbohydrates = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"FoodCache(key='{self.key}', found={self.found}, food_name='{self.food_name}')"
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import UUID, Column, String, Integer, ForeignKey
+from sqlalchemy import UUID, Column, Float, String, Integer, ForeignKey
 from app.database import DeclarativeBase
 
 
@@ -8,8 +8,12 @@ class Product(DeclarativeBase):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, unique=True)
+    # Ключ для поиска: app.utils.food_names.normalize_food_name(name)
+    normalized_name = Column(String, nullable=False, index=True)
     calories = Column(Integer, nullable=False)
+    protein = Column(Float, nullable=True)
+    fat = Column(Float, nullable=True)
+    carbohydrates = Column(Float, nullable=True)
 
     def __repr__(self):
         return f"Product(id={self.id}, name='{self.name}', calories={self.calories})"
-
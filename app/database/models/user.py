@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import UUID, Column, ForeignKey, String
+from sqlalchemy import UUID, Boolean, Column, ForeignKey, String, false
 from app.database import DeclarativeBase
 
 
@@ -9,6 +9,8 @@ class User(DeclarativeBase):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
     chat_id = Column(String, nullable=True, unique=True, index=True)
     curr_product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    # Подписка на ежедневную сводку (/notify)
+    notify_enabled = Column(Boolean, nullable=False, default=False, server_default=false())
 
     def __repr__(self):
         return f"User(id={self.id}, chat_id={self.chat_id}, curr_product_id={self.curr_product_id})"
@@ -0,0 +1,18 @@
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Integer
+from app.database import DeclarativeBase
+
+
+class UserProduct(DeclarativeBase):
+    """
+    Продукты, которые пользователь выбирал через /change_product: picks —
+    сколько раз. Это «избранное» для /suggest.
+    """
+    __tablename__ = "user_products"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), primary_key=True)
+    picks = Column(Integer, nullable=False, default=1)
+    last_picked_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"UserProduct(user_id={self.user_id}, product_id={self.product_id}, picks={self.picks})"
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from telegram.error import Forbidden, TimedOut
+
+from app.config import get_settings
+from app.send_queue import BULK, OutboundMessage, OutboundQueue
+from app.utils.database import Database
+from app.utils.metrics import registry
+
+log = logging.getLogger("digest")
+
+# Первый ключ advisory-блокировки шардов сводки, второй — номер шарда
+DIGEST_LOCK_KEY = 0x64676573
+
+DIGEST_MESSAGES = registry.counter(
+    "digest_messages_total", "Ежедневные сводки по итогу отправки", ("status",)
+)
+DIGEST_SHARD_DURATION = registry.histogram(
+    "digest_shard_duration_seconds", "Обработка одного шарда сводки",
+    buckets=(0.1, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+def format_digest(calories: float, grams: float, product_name: str) -> str:
+    return f"Вчера ты сжёг {calories:.0f} ккал — это {grams:.1f}г {product_name}"
+
+
+class DigestScheduler:
+    """
+    Раз в сутки, начиная с DIGEST_HOUR (ACTIVITY_TIMEZONE), рассылает
+    подписчикам /notify сводку за вчера. Кому трекер за вчера ничего не
+    прислал, сводку не получают: оценка вместо данных выглядела бы как замер.
+
+    Подписчики поделены на DIGEST_SHARDS шардов по id. Процесс берёт шард
+    под advisory-блокировку, одним запросом создаёт строки сводок всего
+    шарда (digest_deliveries) и отправляет их пачками: pending -> sending
+    -> sent. Каждый воркер API обходит шарды со случайного, занятые
+    другими пропускает. После падения процесса его sending становятся
+    unknown и не отправляются повторно: лучше пропустить сводку, чем
+    прислать её дважды. Сообщения идут через очередь отправки с
+    приоритетом BULK: лимиты Telegram и 429 соблюдает она.
+    """
+
+    def __init__(self, send_queue: OutboundQueue):
+        settings = get_settings()
+        self.db = Database()
+        self.send_queue = send_queue
+        self.zone = ZoneInfo(settings.ACTIVITY_TIMEZONE)
+        self.hour = settings.DIGEST_HOUR
+        self.shards = settings.DIGEST_SHARDS
+        self.batch_size = settings.DIGEST_BATCH_SIZE
+        self.poll_interval = settings.DIGEST_POLL_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        # День, за который все шарды уже обработаны этим процессом
+        self._done_day: Optional[date] = None
+        self.runs = 0
+        self.shards_processed = 0
+        self.shards_skipped = 0
+        self.statuses: Dict[str, int] = {}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.send_queue.bot.initialize()
+                await self.run_due()
+            except Exception as e:
+                log.error("Ошибка рассылки сводки: %s", e, exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    def due_day(self, now: Optional[datetime] = None) -> Optional[date]:
+        """Вчерашний день, если время рассылки уже наступило."""
+        local = (now or datetime.now(self.zone)).astimezone(self.zone)
+        if local.hour < self.hour:
+            return None
+        return local.date() - timedelta(days=1)
+
+    async def run_due(self) -> None:
+        day = self.due_day()
+        if day is None or day == self._done_day:
+            return
+        if await self.run(day):
+            self._done_day = day
+
+    async def run(self, day: date) -> bool:
+        """Обходит шарды за day; True, если ни один не был занят другим процессом."""
+        self.runs += 1
+        complete = True
+        first = random.randrange(self.shards)
+        for i in range(self.shards):
+            shard = (first + i) % self.shards
+            async with self.db.advisory_lock(DIGEST_LOCK_KEY, shard) as acquired:
+                if not acquired:
+                    self.shards_skipped += 1
+                    complete = False
+                    continue
+                started = time.perf_counter()
+                await self._run_shard(day, shard)
+                DIGEST_SHARD_DURATION.observe(time.perf_counter() - started)
+                self.shards_processed += 1
+        return complete
+
+    async def _run_shard(self, day: date, shard: int) -> None:
+        stale = await self.db.reset_stale_digests(day, shard)
+        if stale:
+            self._count("unknown", stale)
+            log.warning("Шард %d за %s: %d сводок в неизвестном состоянии не будут отправлены", shard, day, stale)
+        created = await self.db.prepare_digests(day, shard, self.shards)
+        if created:
+            log.info("Шард %d за %s: %d новых сводок", shard, day, created)
+
+        while True:
+            rows = await self.db.claim_digests(day, shard, self.batch_size)
+            if not rows:
+                return
+            await self._send_batch(day, rows)
+
+    async def _send_batch(self, day: date, rows: list) -> None:
+        messages: Dict[UUID, OutboundMessage] = {
+            row.user_id: self.send_queue.enqueue(
+                row.chat_id, format_digest(row.calories, row.grams, row.product_name), priority=BULK
+            )
+            for row in rows
+        }
+        try:
+            await asyncio.wait([message.future for message in messages.values()])
+        finally:
+            # При остановке ещё не отправленные возвращаются в pending
+            statuses = {user_id: self._status(message) for user_id, message in messages.items()}
+            await self.db.finish_digests(day, statuses)
+            for status in statuses.values():
+                self._count(status)
+
+    @staticmethod
+    def _status(message: OutboundMessage) -> str:
+        future = message.future
+        if not future.done():
+            if message.started:
+                # Запрос к Telegram уже ушёл: сводка могла дойти
+                return "unknown"
+            future.cancel()
+            return "pending"
+        if future.cancelled():
+            return "pending"
+        error = future.exception()
+        if error is None:
+            return "sent"
+        if isinstance(error, Forbidden):
+            return "blocked"
+        if isinstance(error, TimedOut):
+            return "unknown"
+        return "failed"
+
+    def _count(self, status: str, amount: int = 1) -> None:
+        if status == "pending":
+            return
+        self.statuses[status] = self.statuses.get(status, 0) + amount
+        DIGEST_MESSAGES.inc(amount, status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hour": self.hour,
+            "shards": self.shards,
+            "done_day": self._done_day.isoformat() if self._done_day else None,
+            "runs": self.runs,
+            "shards_processed": self.shards_processed,
+            "shards_skipped": self.shards_skipped,
+            "messages": dict(self.statuses),
+            "send_queue": self.send_queue.stats(),
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+
+from app.utils.resilience import UpstreamUnavailable
+
+log = logging.getLogger("fatsecret-auth")
+
+# (access_token, expires_in в секундах)
+TokenFetcher = Callable[[], Awaitable[Tuple[str, float]]]
+
+
+class TokenUnavailable(UpstreamUnavailable):
+    """Токен не получен (нет ключей, OAuth-сервер недоступен): запрос к API не отправлялся."""
+
+
+class TokenManager:
+    """
+    Хранит OAuth2-токен FatSecret вместе со сроком действия.
+
+    Фоновая задача обновляет токен за refresh_margin секунд до истечения,
+    поэтому на пути запроса токен обычно уже готов. Обновления сериализуются
+    через lock: одновременные запросы не получают каждый свой токен.
+    Фоновая задача появляется после первого полученного токена; неудачные
+    обновления она повторяет с нарастающей паузой, от retry_interval до
+    max_retry_interval.
+    """
+
+    def __init__(
+        self,
+        fetch_token: TokenFetcher,
+        refresh_margin: float = 300.0,
+        retry_interval: float = 30.0,
+        max_retry_interval: float = 600.0,
+    ):
+        self._fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.monotonic() < self._refresh_at
+
+    def _is_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    async def get_token(self) -> str:
+        if not self._is_valid():
+            await self.refresh()
+        self._ensure_background_refresh()
+        return self._token
+
+    async def refresh(self, stale_token: Optional[str] = None) -> str:
+        """
+        Получает новый токен. Если за время ожидания lock токен уже обновил
+        кто-то другой, возвращает его без повторного запроса.
+        """
+        async with self._get_lock():
+            if self._token is not None and self._token != stale_token and self._is_fresh():
+                return self._token
+            try:
+                token, expires_in = await self._fetch_token()
+            except Exception:
+                self.failures += 1
+                raise
+            now = time.monotonic()
+            self._token = token
+            self._expires_at = now + expires_in
+            # Для короткоживущих токенов обновляемся не раньше середины срока
+            self._refresh_at = now + max(expires_in - self.refresh_margin, expires_in / 2)
+            self.refreshes += 1
+            return token
+
+    async def start(self) -> None:
+        """
+        Получает первый токен заранее и запускает фоновое обновление. Если не
+        вышло, токен запросит первый вызов get_token.
+        """
+        try:
+            await self.refresh()
+        except Exception as e:
+            log.warning("Не удалось получить токен FatSecret при старте: %s", e)
+            return
+        self._ensure_background_refresh()
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def _ensure_background_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        failures = 0
+        while True:
+            delay = self._refresh_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.refresh(stale_token=self._token)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                retry_in = min(self.retry_interval * 2 ** (failures - 1), self.max_retry_interval)
+                log.warning("Фоновое обновление токена FatSecret не удалось: %s; повтор через %.0f с", e, retry_in)
+                await asyncio.sleep(retry_in)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "valid": self._is_valid(),
+            "expires_in": max(0.0, self._expires_at - time.monotonic()) if self._token else 0.0,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
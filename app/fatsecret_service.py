@@ -1,7 +1,61 @@
-import requests
-from typing import Optional, Dict, Any
+import asyncio
+import time
+from typing import Optional, Dict, Any, Tuple
+
+import httpx
+
 from app.config import get_settings
+from app.fatsecret_auth import TokenManager, TokenUnavailable
 from app.models import CaloriesResponse
+from app.utils.metrics import registry
+from app.utils.resilience import CircuitBreaker, TokenBucket, retry_with_backoff
+
+REQUEST_DURATION = registry.histogram(
+    "fatsecret_request_duration_seconds",
+    "Длительность HTTP-запросов к FatSecret",
+    ("method", "status"),
+)
+REQUEST_ERRORS = registry.counter(
+    "fatsecret_request_errors_total",
+    "Запросы к FatSecret без ответа (сеть, таймаут)",
+    ("method",),
+)
+
+# Квота FatSecret одна на ключ, поэтому лимитер и breaker общие для всех
+# экземпляров сервиса (у бота и FastAPI они свои, в разных event loop'ах),
+# а между воркерами API лимит делится поровну
+_rate_limiter: Optional[TokenBucket] = None
+_breaker: Optional[CircuitBreaker] = None
+
+
+def _shared_guards() -> Tuple[TokenBucket, CircuitBreaker]:
+    global _rate_limiter, _breaker
+    settings = get_settings()
+    if _rate_limiter is None:
+        workers = max(1, settings.API_WORKERS)
+        _rate_limiter = TokenBucket(
+            rate=settings.FATSECRET_RATE_LIMIT_PER_SECOND / workers,
+            capacity=max(1, settings.FATSECRET_RATE_LIMIT_BURST // workers),
+            max_wait=settings.FATSECRET_RATE_LIMIT_MAX_WAIT,
+        )
+    if _breaker is None:
+        _breaker = CircuitBreaker(
+            "FatSecret",
+            window=settings.FATSECRET_BREAKER_WINDOW,
+            min_calls=settings.FATSECRET_BREAKER_MIN_CALLS,
+            failure_rate=settings.FATSECRET_BREAKER_FAILURE_RATE,
+            reset_timeout=settings.FATSECRET_BREAKER_RESET_TIMEOUT,
+        )
+    return _rate_limiter, _breaker
+
+
+def _is_transient(e: Exception) -> bool:
+    """Сетевые ошибки, таймауты, 429 и 5xx имеет смысл повторить."""
+    if isinstance(e, httpx.TransportError):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return False
 
 
 class FatSecretService:
@@ -12,104 +66,190 @@ class FatSecretService:
         settings = get_settings()
         self.client_id = settings.FATSECRET_CONSUMER_KEY
         self.client_secret = settings.FATSECRET_CONSUMER_SECRET
-        self._access_token = None
+        self.base_url = settings.FATSECRET_BASE_URL or self.BASE_URL
+        self.token_url = settings.FATSECRET_TOKEN_URL or self.TOKEN_URL
+        self._timeout = httpx.Timeout(
+            settings.FATSECRET_TIMEOUT,
+            connect=settings.FATSECRET_CONNECT_TIMEOUT,
+        )
+        self._limits = httpx.Limits(
+            max_connections=settings.FATSECRET_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.FATSECRET_MAX_KEEPALIVE_CONNECTIONS,
+        )
+        self._max_concurrency = settings.FATSECRET_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.tokens = TokenManager(
+            self._fetch_token,
+            refresh_margin=settings.FATSECRET_TOKEN_REFRESH_MARGIN,
+        )
+        self.rate_limiter, self.breaker = _shared_guards()
+        self._retry_attempts = settings.FATSECRET_RETRY_ATTEMPTS
+        self._retry_base_delay = settings.FATSECRET_RETRY_BASE_DELAY
+        self._retry_max_delay = settings.FATSECRET_RETRY_MAX_DELAY
+        self.retries = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Клиент и семафор создаются лениво внутри работающего event loop:
+        # бот и FastAPI живут в разных loop'ах и держат свои экземпляры сервиса.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    async def start(self) -> None:
+        await self.tokens.start()
 
-    def _get_access_token(self) -> str:
-        if self._access_token:
-            return self._access_token
+    async def aclose(self) -> None:
+        await self.tokens.stop()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
+    @staticmethod
+    def _format_error(e: httpx.HTTPError) -> str:
+        error_detail = f"{str(e)}"
+        if isinstance(e, httpx.HTTPStatusError):
+            try:
+                error_data = e.response.json()
+                error_detail += f" | Response: {error_data}"
+            except ValueError:
+                error_detail += f" | Status: {e.response.status_code} | Text: {e.response.text[:200]}"
+        return error_detail
+
+    async def _fetch_token(self) -> Tuple[str, float]:
+        if not (self.client_id and self.client_secret):
+            raise TokenUnavailable("Не заданы FATSECRET_CONSUMER_KEY и FATSECRET_CONSUMER_SECRET")
+        client = self._get_client()
         try:
-            response = requests.post(
-                self.TOKEN_URL,
-                data={
-                    'grant_type': 'client_credentials',
-                    'scope': 'basic'
-                },
-                auth=(self.client_id, self.client_secret)
-            )
+            async with self._semaphore:
+                response = await self._timed_request(
+                    "token",
+                    client.post(
+                        self.token_url,
+                        data={
+                            'grant_type': 'client_credentials',
+                            'scope': 'basic'
+                        },
+                        auth=(self.client_id, self.client_secret)
+                    ),
+                )
             response.raise_for_status()
             token_data = response.json()
-            self._access_token = token_data['access_token']
-            return self._access_token
-        except requests.exceptions.RequestException as e:
-            error_detail = f"{str(e)}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_detail += f" | Response: {error_data}"
-                except:
-                    error_detail += f" | Status: {e.response.status_code} | Text: {e.response.text[:200]}"
-            raise Exception(f"Ошибка при получении токена доступа: {error_detail}")
+            return token_data['access_token'], float(token_data.get('expires_in', 86400))
+        except httpx.HTTPError as e:
+            raise TokenUnavailable(f"Ошибка при получении токена доступа: {self._format_error(e)}")
+
+    async def _send_api_request(self, params: Dict[str, Any], access_token: str) -> httpx.Response:
+        client = self._get_client()
+        headers = {'Authorization': f'Bearer {access_token}'}
+        async with self._semaphore:
+            return await self._timed_request(
+                params.get('method', 'unknown'),
+                client.get(self.base_url, params=params, headers=headers),
+            )
+
+    @staticmethod
+    async def _timed_request(method: str, request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            REQUEST_ERRORS.inc(method=method)
+            REQUEST_DURATION.observe(time.perf_counter() - started, method=method, status="error")
+            raise
+        REQUEST_DURATION.observe(time.perf_counter() - started, method=method, status=response.status_code)
+        return response
+
+    async def _api_get_once(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # Сначала breaker: при разомкнутой цепи отказываем сразу, не тратя квоту
+        self.breaker.allow()
+        try:
+            await self.rate_limiter.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        try:
+            access_token = await self.tokens.get_token()
+            response = await self._send_api_request(params, access_token)
+            if response.status_code == 401:
+                # Токен отозван или истёк раньше срока — один прозрачный повтор
+                access_token = await self.tokens.refresh(stale_token=access_token)
+                response = await self._send_api_request(params, access_token)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            # 4xx — ответ от живого сервиса, breaker их не считает
+            self.breaker.record(success=not _is_transient(e))
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(success=False)
+            raise
+        self.breaker.record(success=True)
+        return data
+
+    def _on_retry(self, e: Exception) -> None:
+        self.retries += 1
+
+    async def _api_get(self, params: Dict[str, Any], error_prefix: str) -> Dict[str, Any]:
+        try:
+            data = await retry_with_backoff(
+                lambda: self._api_get_once(params),
+                attempts=self._retry_attempts,
+                base_delay=self._retry_base_delay,
+                max_delay=self._retry_max_delay,
+                retry_if=_is_transient,
+                on_retry=self._on_retry,
+            )
+        except httpx.HTTPError as e:
+            raise Exception(f"{error_prefix}: {self._format_error(e)}")
+
+        if 'error' in data:
+            error_msg = data['error'].get('message', 'Unknown error')
+            raise Exception(f"FatSecret API error: {error_msg}")
+        return data
 
-    def search_food(self, food_name: str) -> Optional[Dict[str, Any]]:
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_limiter": self.rate_limiter.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "retries": self.retries,
+        }
+
+    async def search_food(self, food_name: str) -> Optional[Dict[str, Any]]:
         params = {
             'method': 'foods.search',
             'search_expression': food_name,
             'format': 'json',
             'max_results': 1
         }
+        data = await self._api_get(params, "Ошибка при поиске продукта")
 
-        try:
-            access_token = self._get_access_token()
-            headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get(self.BASE_URL, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            if 'error' in data:
-                error_msg = data['error'].get('message', 'Unknown error')
-                raise Exception(f"FatSecret API error: {error_msg}")
-
-            if 'foods' in data and 'food' in data['foods']:
-                foods = data['foods']['food']
-                if isinstance(foods, list) and len(foods) > 0:
-                    return foods[0]
-                elif isinstance(foods, dict):
-                    return foods
-            return None
-        except requests.exceptions.RequestException as e:
-            error_detail = f"{str(e)}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_detail += f" | Response: {error_data}"
-                except:
-                    error_detail += f" | Status: {e.response.status_code} | Text: {e.response.text[:200]}"
-            raise Exception(f"Ошибка при поиске продукта: {error_detail}")
+        if 'foods' in data and 'food' in data['foods']:
+            foods = data['foods']['food']
+            if isinstance(foods, list) and len(foods) > 0:
+                return foods[0]
+            elif isinstance(foods, dict):
+                return foods
+        return None
 
-    def get_food_details(self, food_id: str) -> Optional[Dict[str, Any]]:
+    async def get_food_details(self, food_id: str) -> Optional[Dict[str, Any]]:
         params = {
             'method': 'food.get',
             'food_id': food_id,
             'format': 'json'
         }
+        data = await self._api_get(params, "Ошибка при получении информации о продукте")
 
-        try:
-            access_token = self._get_access_token()
-            headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get(self.BASE_URL, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        if 'food' in data:
+            return data['food']
+        return None
 
-            if 'error' in data:
-                error_msg = data['error'].get('message', 'Unknown error')
-                raise Exception(f"FatSecret API error: {error_msg}")
-
-            if 'food' in data:
-                return data['food']
-            return None
-        except requests.exceptions.RequestException as e:
-            error_detail = f"{str(e)}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_detail += f" | Response: {error_data}"
-                except:
-                    error_detail += f" | Status: {e.response.status_code} | Text: {e.response.text[:200]}"
-            raise Exception(f"Ошибка при получении информации о продукте: {error_detail}")
-
-    def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
-        food = self.search_food(food_name)
+    async def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
+        food = await self.search_food(food_name)
         if not food:
             return None
 
@@ -117,7 +257,7 @@ class FatSecretService:
         if not food_id:
             return None
 
-        food_details = self.get_food_details(str(food_id))
+        food_details = await self.get_food_details(str(food_id))
         if not food_details:
             return None
 
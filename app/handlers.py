@@ -1,5 +1,6 @@
 from typing import Dict, Any
 from uuid import UUID
+from app.config import get_settings
 from app.service import MainService
 
 service = MainService()
@@ -9,6 +10,19 @@ MIN_CALORIES = 0
 MAX_CALORIES = 10000
 MIN_DAYS = 1
 MAX_DAYS = 365
+# /suggest: аргумент -> порядок ранжирования (см. app.suggest_service.SORTS)
+SUGGEST_SORTS = {
+    "calories": "calories",
+    "калории": "calories",
+    "protein": "protein",
+    "белок": "protein",
+    "favorites": "favorites",
+    "избранное": "favorites",
+}
+SUGGEST_USAGE = (
+    "Использование: /suggest [калории|белок|избранное] [дни]\n"
+    "Например: /suggest белок 7"
+)
 
 
 def validate_product_name(product_name: str) -> tuple[bool, str]:
@@ -97,7 +111,6 @@ async def product_count(model: Dict[str, Any]) -> str:
     if chat_id is None:
         return "Ошибка: не удалось определить пользователя"
 
-    user_id = await service.get_or_create_user_by_chat_id(chat_id)
     days = model.get("days")
     
     if days is not None:
@@ -110,7 +123,7 @@ async def product_count(model: Dict[str, Any]) -> str:
         except (ValueError, TypeError):
             return "Ошибка: количество дней должно быть числом"
 
-    result = await service.product_count(user_id, days)
+    result = await service.product_count(chat_id, days)
     if result is None:
         return "Не удалось рассчитать"
 
@@ -135,8 +148,7 @@ async def change_product(model: Dict[str, Any]) -> str:
     if not is_valid:
         return f"Ошибка валидации: {error_msg}"
     
-    user_id = await service.get_or_create_user_by_chat_id(chat_id)
-    result = await service.change_product(user_id, product_name)
+    result = await service.change_product(chat_id, product_name)
     if not result:
         return "Продукт не найден"
 
@@ -180,17 +192,62 @@ async def add_custom_product(model: Dict[str, Any]) -> str:
 
 
 async def notify(model: Dict[str, Any]) -> str:
-    return "Уведомления появятся позже"
+    chat_id = model.get("chat", {}).get("id")
+    if chat_id is None:
+        return "Ошибка: не удалось определить пользователя"
 
+    args_text = model.get("args_text", "").strip().lower()
+    if args_text in ("", "on", "вкл"):
+        await service.set_notify(chat_id, True)
+        return "Каждое утро пришлю, сколько ты заработал за вчера, если трекер прислал данные. Отключить: /notify off"
+    if args_text in ("off", "выкл"):
+        await service.set_notify(chat_id, False)
+        return "Ежедневная сводка отключена"
+    return "Использование: /notify — включить ежедневную сводку, /notify off — отключить"
 
-async def get_product(model: Dict[str, Any]) -> str:
+
+async def suggest(model: Dict[str, Any]) -> str:
     chat_id = model.get("chat", {}).get("id")
     if chat_id is None:
         return "Ошибка: не удалось определить пользователя"
 
-    user_id = await service.get_or_create_user_by_chat_id(chat_id)
+    sort = "calories"
+    days = None
+    for arg in model.get("args_text", "").lower().split():
+        if arg in SUGGEST_SORTS:
+            sort = SUGGEST_SORTS[arg]
+            continue
+        try:
+            days = int(arg)
+        except ValueError:
+            return SUGGEST_USAGE
+        is_valid, error_msg = validate_days(days)
+        if not is_valid:
+            return f"Ошибка валидации: {error_msg}"
+
+    result = await service.suggest_products(chat_id, days, sort, get_settings().SUGGEST_LIMIT)
+    if not result.items:
+        return "Не нашлось подходящих продуктов"
+
+    days_str = f" за {days} дней" if days else ""
+    lines = [f"Сожжено {result.calories_burned:.0f} ккал{days_str}. Можно съесть:"]
+    for i, item in enumerate(result.items, 1):
+        line = f"{i}. {item.name} — {item.grams:.1f}г ({item.calories:.0f} ккал/100г"
+        if sort == "protein" and item.protein_grams is not None:
+            line += f", белка {item.protein_grams:.1f}г"
+        line += ")"
+        if item.favorite:
+            line += " ★"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+async def get_product(model: Dict[str, Any]) -> str:
+    chat_id = model.get("chat", {}).get("id")
+    if chat_id is None:
+        return "Ошибка: не удалось определить пользователя"
 
-    result = await service.get_product(user_id)
+    result = await service.get_product(chat_id)
     if result is None:
         return "Продукт не найден"
 
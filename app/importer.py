@@ -0,0 +1,162 @@
+"""
+Массовый импорт продуктов из CSV/JSONL-дампа в таблицу products.
+
+Файл читается потоково, строки валидируются ProductImportForm и пишутся
+пачками (один INSERT ... ON CONFLICT на пачку), так что память не зависит
+от размера файла.
+
+Пример:
+    poetry run import-products foods.csv.gz --columns name=product_name,calories=energy_kcal_100g
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.product import ProductImportForm
+from app.utils.database import Database
+from app.utils.log import setup_logging
+
+log = logging.getLogger("importer")
+
+FIELDS = ("name", "calories", "protein", "fat", "carbohydrates")
+MAX_LOGGED_ERRORS = 20
+
+
+def _open(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _parse_columns(spec: Optional[str]) -> Dict[str, str]:
+    """'name=product_name,calories=kcal' -> {'name': 'product_name', 'calories': 'kcal'}"""
+    columns = {field: field for field in FIELDS}
+    if not spec:
+        return columns
+    for pair in spec.split(","):
+        field, _, source = pair.partition("=")
+        field = field.strip()
+        if field not in FIELDS or not source.strip():
+            raise argparse.ArgumentTypeError(f"Некорректное сопоставление колонок: {pair!r}")
+        columns[field] = source.strip()
+    return columns
+
+
+def read_rows(path: str, fmt: str, delimiter: str = ",") -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Номер строки и сырая запись; файл не читается в память целиком."""
+    with _open(path) as f:
+        if fmt == "jsonl":
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {"__error__": str(e)}
+                if not isinstance(record, dict):
+                    record = {"__error__": "ожидался JSON-объект"}
+                yield line_no, record
+        else:
+            reader = csv.DictReader(f, delimiter=delimiter)
+            for line_no, row in enumerate(reader, start=2):
+                yield line_no, row
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.read = 0
+        self.rejected = 0
+        self.written = 0
+
+    def log_progress(self) -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.read / elapsed if elapsed else 0.0
+        log.info(
+            "Прочитано %d, записано %d, отклонено %d (%.0f строк/с, %.1f с)",
+            self.read, self.written, self.rejected, rate, elapsed,
+        )
+
+
+async def import_products(
+    path: str,
+    fmt: Optional[str] = None,
+    columns: Optional[Dict[str, str]] = None,
+    batch_size: int = 5000,
+    update_existing: bool = True,
+    delimiter: str = ",",
+) -> ImportStats:
+    db = Database()
+    columns = columns or _parse_columns(None)
+    stats = ImportStats()
+    batch: List[ProductImportForm] = []
+
+    async def flush() -> None:
+        stats.written += await db.upsert_products(batch, update_existing=update_existing)
+        batch.clear()
+        stats.log_progress()
+
+    for line_no, raw in read_rows(path, fmt or _detect_format(path), delimiter):
+        stats.read += 1
+        try:
+            if "__error__" in raw:
+                raise ValueError(raw["__error__"])
+            batch.append(ProductImportForm(**{
+                field: raw.get(source) for field, source in columns.items()
+                if raw.get(source) is not None
+            }))
+        except (ValidationError, ValueError) as e:
+            stats.rejected += 1
+            if stats.rejected <= MAX_LOGGED_ERRORS:
+                log.warning("Строка %d отклонена: %s", line_no, str(e).replace("\n", " "))
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    else:
+        stats.log_progress()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Импорт продуктов из CSV/JSONL в таблицу products")
+    parser.add_argument("path", help="Путь к .csv/.jsonl (можно .gz)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="По умолчанию — по расширению файла")
+    parser.add_argument("--columns", type=_parse_columns, default=None,
+                        help="Сопоставление полей: name=col,calories=col,protein=col,fat=col,carbohydrates=col")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--delimiter", default=",", help="Разделитель CSV")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Не обновлять продукты, которые уже есть в каталоге")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    asyncio.run(import_products(
+        args.path,
+        fmt=args.format,
+        columns=args.columns,
+        batch_size=args.batch_size,
+        update_existing=not args.skip_existing,
+        delimiter=args.delimiter,
+    ))
+
+
+if __name__ == "__main__":
+    main()
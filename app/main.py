@@ -1,22 +1,59 @@
+import secrets
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
 import uvicorn
 import threading
 import logging
-from telegram import Update
-from app.fatsecret_service import FatSecretService
-from app.models import CaloriesResponse, CaloriesRequest
+from telegram import Bot, Update
+from telegram.ext import Application
+from app.nutrition_service import NutritionService
+from app.digest_service import DigestScheduler
+from app.send_queue import OutboundQueue
+from app.suggest_service import SORTS, SuggestService
+from app.utils.food_names import normalize_food_name
+from app.utils.process_lock import ProcessLock
+from app.utils.log import setup_logging
+from app.utils.ndjson import iter_lines
+from app.utils.metrics import CONTENT_TYPE, Family, MetricsMiddleware, registry
+from app.utils.resilience import UpstreamUnavailable
+from app.utils.unit_of_work import unit_of_work
+from app.utils.write_behind import BufferFull
+from app.models import (
+    CaloriesResponse,
+    CaloriesRequest,
+    CaloriesBatchRequest,
+    CaloriesBatchItem,
+    CaloriesBatchResponse,
+    ProductSearchItem,
+    ActivityBatchRequest,
+    ActivityBatchResponse,
+    ActivityStreamError,
+    ActivityStreamResponse,
+    SuggestResponse,
+)
+from app.schemas.activity import ActivitySampleForm
 from app.bot import build_app
+from app import bot, handlers
 from app.config import get_settings
 
-logging.basicConfig(
-    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    level=logging.INFO,
-)
+setup_logging()
 logger = logging.getLogger("main")
 
 bot_thread = None
+# В режиме webhook бот живёт в event loop FastAPI, а не в отдельном потоке
+bot_application: Optional[Application] = None
+digest_scheduler: Optional[DigestScheduler] = None
+# Очередь отправки сводки, если у воркера нет своего приложения бота (polling)
+digest_send_queue: Optional[OutboundQueue] = None
+# При нескольких воркерах polling-бот и регистрация webhook — только у владельца
+bot_lock = ProcessLock(get_settings().BOT_LOCK_FILE)
+
+# Сэмплы потокового приёма кладутся в буфер записи такими порциями
+ACTIVITY_STREAM_CHUNK = 1000
+MAX_REPORTED_ERRORS = 20
 
 
 def run_bot():
@@ -35,30 +72,183 @@ def run_bot():
         bot_logger.info("=" * 50)
         bot_app.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
     except Exception as e:
-        bot_logger.error(f"Ошибка при запуске бота: {e}", exc_info=True)
+        bot_logger.error("Ошибка при запуске бота: %s", e, exc_info=True)
         raise
 
 
+async def start_webhook_bot(register: bool = True) -> Application:
+    settings = get_settings()
+    if not settings.TELEGRAM_BOT_TOKEN:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN не задан в .env")
+    if not settings.SECRET_TOKEN:
+        raise RuntimeError("SECRET_TOKEN обязателен в режиме webhook")
+
+    bot_app = build_app(settings.TELEGRAM_BOT_TOKEN, webhook=True)
+    await bot_app.initialize()
+    # post_init/post_stop/post_shutdown вызываются только run_polling/run_webhook
+    await bot_app.post_init(bot_app)
+    await bot_app.start()
+    if register and settings.WEBHOOK_URL:
+        await bot_app.bot.set_webhook(
+            url=settings.WEBHOOK_URL,
+            secret_token=settings.SECRET_TOKEN,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logger.info("Webhook зарегистрирован: %s", settings.WEBHOOK_URL)
+    return bot_app
+
+
+async def stop_webhook_bot(bot_app: Application) -> None:
+    await bot_app.stop()
+    await bot_app.post_stop(bot_app)
+    await bot_app.post_shutdown(bot_app)
+    await bot_app.shutdown()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global bot_thread
+    global bot_thread, bot_application, digest_scheduler, digest_send_queue
+    settings = get_settings()
     logger.info("=" * 50)
     logger.info("Запуск приложения: FastAPI + Telegram Bot")
-    logger.info("Создание потока для Telegram бота...")
-    bot_thread = threading.Thread(target=run_bot, daemon=True, name="TelegramBot")
-    bot_thread.start()
-    logger.info(f"Поток бота запущен: {bot_thread.name} (ID: {bot_thread.ident})")
+    is_bot_owner = bot_lock.acquire()
+    if settings.BOT_MODE == "webhook":
+        # Telegram шлёт обновления на один URL, балансировщик (общий сокет
+        # uvicorn) раздаёт их воркерам: приложение бота есть в каждом
+        logger.info("Бот в режиме webhook: обновления принимает %s", settings.WEBHOOK_PATH)
+        if settings.API_WORKERS > 1:
+            logger.warning(
+                "Воркеров API: %d — обновления одного чата могут обрабатываться "
+                "параллельно в разных воркерах, порядок внутри чата не гарантируется",
+                settings.API_WORKERS,
+            )
+        bot_application = await start_webhook_bot(register=is_bot_owner)
+    elif not is_bot_owner:
+        logger.info("Polling-бот уже запущен другим воркером (%s)", settings.BOT_LOCK_FILE)
+    else:
+        logger.info("Создание потока для Telegram бота...")
+        bot_thread = threading.Thread(target=run_bot, daemon=True, name="TelegramBot")
+        bot_thread.start()
+        logger.info("Поток бота запущен: %s (ID: %s)", bot_thread.name, bot_thread.ident)
+    await nutrition_service.start()
+    handlers.service.activity.buffer.start()
+    if settings.DIGEST_ENABLED and settings.TELEGRAM_BOT_TOKEN:
+        # В каждом воркере: шарды рассылки распределяются advisory-блокировками
+        if bot_application is not None:
+            # webhook: сводка делит очередь с ответами бота, ответы идут первыми
+            send_queue = bot.send_queue
+        else:
+            # polling-бот живёт в своём потоке и loop; лимиты у очередей общие
+            send_queue = digest_send_queue = OutboundQueue(
+                Bot(settings.TELEGRAM_BOT_TOKEN), workers=settings.TELEGRAM_SEND_WORKERS
+            )
+            await digest_send_queue.start()
+        digest_scheduler = DigestScheduler(send_queue)
+        digest_scheduler.start()
     logger.info("FastAPI сервер готов к работе")
     logger.info("=" * 50)
     yield
     # Shutdown
     logger.info("Завершение работы приложения...")
+    # Сначала рассылка: в режиме webhook она пользуется очередью бота
+    if digest_scheduler is not None:
+        await digest_scheduler.stop()
+        digest_scheduler = None
+    if bot_application is not None:
+        await stop_webhook_bot(bot_application)
+        bot_application = None
+    if digest_send_queue is not None:
+        await digest_send_queue.stop()
+        await digest_send_queue.bot.shutdown()
+        digest_send_queue = None
+    # Дописываем принятые, но ещё не записанные сэмплы
+    await handlers.service.activity.buffer.stop()
+    await nutrition_service.aclose()
+    bot_lock.release()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+nutrition_service = NutritionService()
+# Свой снимок каталога: в режиме polling бот живёт в другом event loop
+suggest_service = SuggestService(handlers.service.activity)
+
+
+def _collect_service_metrics() -> Iterable[Family]:
+    """Счётчики из stats() сервисов API (service="api") и бота (service="bot")."""
+    services = {"api": nutrition_service, "bot": handlers.service.nutrition}
+    stats: Dict[str, Dict[str, Any]] = {name: s.stats() for name, s in services.items()}
 
-fatsecret_service = FatSecretService()
+    def samples(get) -> List:
+        return [({"service": name}, get(st)) for name, st in stats.items()]
+
+    yield ("nutrition_cache_hits_total", "counter", "Попадания в кэш КБЖУ",
+           samples(lambda st: st["memory"]["hits"]))
+    yield ("nutrition_cache_misses_total", "counter", "Промахи кэша КБЖУ",
+           samples(lambda st: st["memory"]["misses"]))
+    yield ("nutrition_cache_size", "gauge", "Записей в кэше КБЖУ",
+           samples(lambda st: st["memory"]["size"]))
+    yield ("nutrition_negative_hits_total", "counter", "Попадания в негативный кэш",
+           samples(lambda st: st["negative_hits"]))
+    yield ("nutrition_db_hits_total", "counter", "Найдено в локальном индексе",
+           samples(lambda st: st["db_hits"]))
+    yield ("nutrition_upstream_calls_total", "counter", "Обращения к FatSecret",
+           samples(lambda st: st["upstream_calls"]))
+    yield ("nutrition_stale_served_total", "counter", "Отдано устаревших записей при недоступности FatSecret",
+           samples(lambda st: st["stale_served"]))
+    yield ("fatsecret_retries_total", "counter", "Повторы запросов к FatSecret",
+           samples(lambda st: st["upstream"]["retries"]))
+
+    # Лимитер и breaker общие для всех экземпляров FatSecretService
+    upstream = stats["api"]["upstream"]
+    breaker = upstream["circuit_breaker"]
+    yield ("fatsecret_circuit_open", "gauge", "1, если circuit breaker FatSecret не замкнут",
+           [({}, 0 if breaker["state"] == "closed" else 1)])
+    yield ("fatsecret_circuit_rejected_total", "counter", "Вызовы, отклонённые circuit breaker",
+           [({}, breaker["rejected"])])
+    yield ("fatsecret_circuit_transitions_total", "counter", "Переходы circuit breaker",
+           [({"transition": k}, v) for k, v in breaker["transitions"].items()])
+    yield ("fatsecret_rate_limited_total", "counter", "Запросы, задержанные или отклонённые лимитером",
+           [({"outcome": "throttled"}, upstream["rate_limiter"]["throttled"]),
+            ({"outcome": "rejected"}, upstream["rate_limiter"]["rejected"])])
+
+    activity = handlers.service.activity.stats()
+    yield ("activity_samples_received_total", "counter", "Принятые сэмплы активности",
+           [({}, activity["samples_received"])])
+    yield ("activity_samples_inserted_total", "counter", "Новые сэмплы активности (без повторов)",
+           [({}, activity["samples_inserted"])])
+    buffer = activity["buffer"]
+    yield ("activity_buffer_samples", "gauge", "Сэмплы в буфере отложенной записи", [({}, buffer["buffered"])])
+    yield ("activity_buffer_written_total", "counter", "Сэмплы, записанные из буфера", [({}, buffer["written"])])
+    yield ("activity_buffer_dropped_total", "counter", "Сэмплы, потерянные после всех повторов записи",
+           [({}, buffer["dropped"])])
+    yield ("activity_buffer_rejected_total", "counter", "Сэмплы, не принятые из-за заполненного буфера",
+           [({}, buffer["rejected"])])
+    yield ("activity_buffer_backpressure_waits_total", "counter", "Ожидания места в буфере",
+           [({}, buffer["backpressure_waits"])])
+    yield ("activity_reads_total", "counter", "Расчёты сожжённых калорий по источнику",
+           [({"source": "rollup"}, activity["rollup_reads"]),
+            ({"source": "fallback"}, activity["fallback_reads"])])
+
+    users = handlers.service.users.stats()
+    yield ("user_cache_hits_total", "counter", "Попадания в кэш пользователей", [({}, users["hits"])])
+    yield ("user_cache_misses_total", "counter", "Промахи кэша пользователей", [({}, users["misses"])])
+
+    if bot.update_processor is not None:
+        updates = bot.update_processor.stats()
+        yield ("bot_updates_in_flight", "gauge", "Обновления бота в обработке", [({}, updates["running"])])
+        yield ("bot_updates_queue_depth", "gauge", "Обновления бота, ждущие своей очереди",
+               [({}, updates["queue_depth"])])
+        yield ("bot_updates_processed_total", "counter", "Обработанные обновления бота",
+               [({}, updates["processed"])])
+    if bot.send_queue is not None:
+        yield ("telegram_send_paused_seconds", "gauge", "Оставшаяся пауза отправки после 429",
+               [({}, bot.send_queue.limits.stats()["paused_for"])])
+
+
+registry.add_collector(_collect_service_metrics)
 
 
 @app.get("/")
@@ -71,6 +261,60 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.post(get_settings().WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+):
+    if bot_application is None:
+        raise HTTPException(status_code=404, detail="Webhook не включён")
+    if not secrets.compare_digest(
+        x_telegram_bot_api_secret_token or "", get_settings().SECRET_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Неверный секретный токен")
+
+    update = Update.de_json(await request.json(), bot_application.bot)
+    # Обработка идёт в фоне, Telegram получает ответ сразу
+    await bot_application.update_queue.put(update)
+    return Response(status_code=200)
+
+
+@app.get("/calories/cache/stats")
+async def calories_cache_stats():
+    return nutrition_service.stats()
+
+
+@app.get("/users/cache/stats")
+async def users_cache_stats():
+    return handlers.service.users.stats()
+
+
+@app.get("/bot/stats")
+async def bot_stats():
+    """Очередь обработки обновлений бота: глубина, ожидание, активные чаты."""
+    if bot.update_processor is None:
+        raise HTTPException(status_code=404, detail="Бот не запущен")
+    stats = bot.update_processor.stats()
+    if bot_application is not None:
+        stats["update_queue_size"] = bot_application.update_queue.qsize()
+    if bot.send_queue is not None:
+        stats["send_queue"] = bot.send_queue.stats()
+    return stats
+
+
+@app.get("/digest/stats")
+async def digest_stats():
+    """Рассылка ежедневной сводки в этом воркере: шарды, итоги отправки, лимитер."""
+    if digest_scheduler is None:
+        raise HTTPException(status_code=404, detail="Рассылка сводки выключена")
+    return digest_scheduler.stats()
+
+
 @app.get("/calories", response_model=CaloriesResponse)
 async def get_calories(food_name: str = Query(...)):
     """
@@ -85,13 +329,16 @@ async def get_calories(food_name: str = Query(...)):
         CaloriesResponse: КБЖУ блюда на 100 г/мл
     """
     try:
-        result = fatsecret_service.get_calories(food_name)
+        async with unit_of_work():
+            result = await nutrition_service.get_calories(food_name)
         if result is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Блюдо '{food_name}' не найдено"
             )
         return result
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -112,13 +359,16 @@ async def get_calories_post(request: CaloriesRequest):
     """
 
     try:
-        result = fatsecret_service.get_calories(request.food_name)
+        async with unit_of_work():
+            result = await nutrition_service.get_calories(request.food_name)
         if result is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Блюдо '{request.food_name}' не найдено"
             )
         return result
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -126,13 +376,236 @@ async def get_calories_post(request: CaloriesRequest):
         )
 
 
+@app.post("/calories/batch", response_model=CaloriesBatchResponse)
+async def get_calories_batch(request: CaloriesBatchRequest):
+    """
+    Получить КБЖУ сразу для списка блюд.
+
+    Повторяющиеся названия запрашиваются один раз, закэшированные отдаются
+    сразу, остальные запрашиваются параллельно. Ошибка по одному блюду
+    не валит весь запрос: статус и текст ошибки возвращаются по каждому элементу.
+
+    Args:
+        food_names
+
+    Returns:
+        CaloriesBatchResponse: по элементу на каждое название в исходном порядке
+    """
+    settings = get_settings()
+    if len(request.food_names) > settings.CALORIES_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много блюд в запросе (максимум {settings.CALORIES_BATCH_MAX_ITEMS})"
+        )
+
+    async with unit_of_work():
+        results = await nutrition_service.get_calories_batch(
+            request.food_names, concurrency=settings.CALORIES_BATCH_CONCURRENCY
+        )
+
+    items = []
+    for food_name in request.food_names:
+        result = results[normalize_food_name(food_name)]
+        if isinstance(result, Exception):
+            items.append(CaloriesBatchItem(food_name=food_name, status="error", error=str(result)))
+        elif result is None:
+            items.append(CaloriesBatchItem(food_name=food_name, status="not_found"))
+        else:
+            items.append(CaloriesBatchItem(food_name=food_name, status="ok", result=result))
+    return CaloriesBatchResponse(items=items)
+
+
+@app.get("/products/search", response_model=List[ProductSearchItem])
+async def search_products(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1)):
+    """
+    Подсказки для автодополнения по локальному каталогу и кэшу FatSecret.
+
+    Регистр, «ё» и русские/английские алиасы не важны; поддерживается
+    поиск по префиксу и с опечатками. В FatSecret запрос не уходит.
+
+    Args:
+        q: начало или часть названия
+        limit
+
+    Returns:
+        List[ProductSearchItem]: найденные продукты, лучшие совпадения первыми
+    """
+    limit = min(limit, get_settings().PRODUCT_SEARCH_MAX_LIMIT)
+    try:
+        async with unit_of_work():
+            return await nutrition_service.search(q, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при поиске продуктов: {str(e)}"
+        )
+
+
+@app.post("/activity", response_model=ActivityBatchResponse)
+async def ingest_activity(request: ActivityBatchRequest):
+    """
+    Принять пачку сэмплов сожжённых калорий от трекера.
+
+    Интервал определяется парой chat_id + started_at: повторная отправка
+    того же интервала не удваивает калории. Сэмплы неизвестных чатов
+    пропускаются.
+
+    Args:
+        samples
+
+    Returns:
+        ActivityBatchResponse: сколько сэмплов принято и сколько из них новые
+    """
+    settings = get_settings()
+    if len(request.samples) > settings.ACTIVITY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много сэмплов в запросе (максимум {settings.ACTIVITY_BATCH_MAX_ITEMS})"
+        )
+    try:
+        async with unit_of_work():
+            inserted = await handlers.service.activity.ingest(request.samples)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при сохранении активности: {str(e)}"
+        )
+    return ActivityBatchResponse(received=len(request.samples), inserted=inserted)
+
+
+@app.post("/activity/stream", response_model=ActivityStreamResponse, status_code=202)
+async def ingest_activity_stream(request: Request):
+    """
+    Потоковый приём сэмплов трекера в формате NDJSON (application/x-ndjson).
+
+    Каждая строка — объект ActivitySampleForm. Тело читается и проверяется
+    построчно, не целиком; валидные сэмплы попадают в буфер и пишутся в БД
+    пачками в фоне, поэтому ответ 202 означает «принято», а не «записано».
+    Невалидные строки пропускаются и перечисляются в errors.
+
+    Если БД не успевает и буфер заполнен, отвечаем 503 с Retry-After:
+    строки до resume_from_line уже приняты, остаток нужно отправить заново.
+
+    Returns:
+        ActivityStreamResponse: сколько строк принято и отклонено
+    """
+    settings = get_settings()
+    buffer = handlers.service.activity.buffer
+    received = accepted = rejected = 0
+    errors: List[ActivityStreamError] = []
+    chunk: List[ActivitySampleForm] = []
+    chunk_start = 1
+
+    async def put_chunk() -> None:
+        nonlocal accepted
+        await buffer.put_many(chunk)
+        accepted += len(chunk)
+        chunk.clear()
+
+    try:
+        async for line_no, line in iter_lines(request.stream(), settings.ACTIVITY_STREAM_MAX_LINE_BYTES):
+            if line is not None and not line.strip():
+                continue
+            received += 1
+            try:
+                if line is None:
+                    raise ValueError(f"Строка длиннее {settings.ACTIVITY_STREAM_MAX_LINE_BYTES} байт")
+                chunk.append(ActivitySampleForm.model_validate_json(line))
+            except ValidationError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    message = "; ".join(
+                        f"{'.'.join(map(str, err['loc'])) or 'line'}: {err['msg']}" for err in e.errors()
+                    )
+                    errors.append(ActivityStreamError(line=line_no, error=message))
+                continue
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(ActivityStreamError(line=line_no, error=str(e)))
+                continue
+            if len(chunk) >= ACTIVITY_STREAM_CHUNK:
+                await put_chunk()
+                chunk_start = line_no + 1
+        await put_chunk()
+    except BufferFull as e:
+        response = ActivityStreamResponse(
+            received=received, accepted=accepted, rejected=rejected, errors=errors,
+            resume_from_line=chunk_start,
+        )
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(e), **response.model_dump()},
+            headers={"Retry-After": str(max(1, round(settings.ACTIVITY_FLUSH_INTERVAL)))},
+        )
+    return ActivityStreamResponse(received=received, accepted=accepted, rejected=rejected, errors=errors)
+
+
+@app.get("/activity/stats")
+async def activity_stats():
+    return handlers.service.activity.stats()
+
+
+@app.get("/suggest", response_model=SuggestResponse)
+async def suggest_products(
+    chat_id: str = Query(...),
+    days: int = Query(1, ge=handlers.MIN_DAYS, le=handlers.MAX_DAYS),
+    sort: str = Query("calories"),
+    limit: int = Query(10, ge=1),
+    min_protein: float = Query(0.0, ge=0),
+):
+    """
+    Что можно съесть на калории, сожжённые за days суток: граммы для каждого
+    продукта каталога, лучшие limit по выбранному порядку.
+
+    Args:
+        chat_id: пользователь бота
+        days
+        sort: calories — больше всего граммов, protein — больше всего белка
+            в порции, favorites — сначала продукты, которые пользователь выбирал
+        limit
+        min_protein: не меньше стольких граммов белка на 100 г
+
+    Returns:
+        SuggestResponse: сожжённые калории и продукты, лучшие первыми
+    """
+    if sort not in SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный порядок {sort!r}, допустимо: {', '.join(SORTS)}"
+        )
+    limit = min(limit, get_settings().SUGGEST_MAX_LIMIT)
+    try:
+        async with unit_of_work(actor=chat_id):
+            user = await handlers.service.db.get_user_by_chat_id(chat_id)
+            if user is None:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            return await suggest_service.suggest(
+                user.id, user.curr_product_id, days, sort, limit, min_protein
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при подборе продуктов: {str(e)}"
+        )
+
+
+@app.get("/suggest/stats")
+async def suggest_stats():
+    return {"api": suggest_service.stats(), "bot": handlers.service.suggest.stats()}
+
+
 def main():
-    logger.info("Запуск FastAPI сервера на http://0.0.0.0:8000")
+    workers = get_settings().API_WORKERS
+    logger.info("Запуск FastAPI сервера на http://0.0.0.0:8000 (воркеров: %d)", workers)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=False
+        reload=False,
+        workers=workers,
+        # Логи uvicorn идут через корневой логгер: тот же формат и очередь
+        log_config=None,
     )
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ from app.models import CaloriesResponse
 
 
 class FatSecretServiceMock:
-    def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
+    async def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
         food_name = food_name.lower()
         mock_data = {
             'chicken': CaloriesResponse(
@@ -25,7 +25,7 @@ class FatSecretServiceMock:
         }
         return mock_data.get(food_name)
 
-    def search_food(self, food_name: str) -> Optional[Dict[str, Any]]:
+    async def search_food(self, food_name: str) -> Optional[Dict[str, Any]]:
         food_name = food_name.lower()
         print(f"Searching food: {food_name}")
         mock_data = {
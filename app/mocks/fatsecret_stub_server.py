@@ -0,0 +1,126 @@
+"""
+Локальная заглушка FatSecret API для нагрузочного тестирования без сети.
+
+Запуск:
+    uvicorn app.mocks.fatsecret_stub_server:app --port 8081
+
+И в .env:
+    FATSECRET_BASE_URL=http://127.0.0.1:8081/rest/server.api
+    FATSECRET_TOKEN_URL=http://127.0.0.1:8081/connect/token
+
+Задержку ответа можно задать через FATSECRET_STUB_LATENCY_MS,
+срок жизни выдаваемых токенов — через FATSECRET_STUB_TOKEN_TTL,
+долю ответов 503 (проверка повторов и circuit breaker) — через
+FATSECRET_STUB_ERROR_RATE.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+import zlib
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI, Form, Header, Query
+from fastapi.responses import JSONResponse
+
+LATENCY_SECONDS = float(os.getenv("FATSECRET_STUB_LATENCY_MS", "50")) / 1000
+TOKEN_TTL_SECONDS = int(os.getenv("FATSECRET_STUB_TOKEN_TTL", "86400"))
+ERROR_RATE = float(os.getenv("FATSECRET_STUB_ERROR_RATE", "0"))
+# Названия с этим префиксом «не находятся» — для проверки 404 и негативного кэша
+NOT_FOUND_PREFIX = "zz"
+
+FOODS: Dict[str, Dict[str, Any]] = {
+    "beer": {"food_name": "Beer", "unit": "ml", "calories": 43, "protein": 0.5, "fat": 0, "carbohydrate": 3.6},
+    "chicken": {"food_name": "Chicken", "unit": "g", "calories": 150, "protein": 30, "fat": 3.0, "carbohydrate": 0},
+    "pizza": {"food_name": "Pizza", "unit": "g", "calories": 266, "protein": 11, "fat": 10, "carbohydrate": 33},
+}
+
+app = FastAPI(title="FatSecret stub")
+
+
+def _food_id(food_name: str) -> str:
+    return str(zlib.crc32(food_name.lower().encode("utf-8")))
+
+
+def _synthetic_food(food_name: str) -> Dict[str, Any]:
+    # Детерминированные значения, чтобы один и тот же запрос давал один ответ
+    seed = zlib.crc32(food_name.lower().encode("utf-8"))
+    return {
+        "food_name": food_name.title(),
+        "unit": "g",
+        "calories": 50 + seed % 450,
+        "protein": seed % 30,
+        "fat": seed % 20,
+        "carbohydrate": seed % 60,
+    }
+
+
+_by_id: Dict[str, Dict[str, Any]] = {}
+_tokens: Dict[str, float] = {}
+
+
+def _lookup(food_name: str) -> Optional[Dict[str, Any]]:
+    key = food_name.strip().lower()
+    if not key or key.startswith(NOT_FOUND_PREFIX):
+        return None
+    food = FOODS.get(key) or _synthetic_food(key)
+    food_id = _food_id(key)
+    _by_id[food_id] = food
+    return {"food_id": food_id, **food}
+
+
+@app.post("/connect/token")
+async def token(grant_type: str = Form(...), scope: str = Form("basic")):
+    await asyncio.sleep(LATENCY_SECONDS)
+    access_token = uuid.uuid4().hex
+    _tokens[access_token] = time.monotonic() + TOKEN_TTL_SECONDS
+    return {"access_token": access_token, "expires_in": TOKEN_TTL_SECONDS, "token_type": "Bearer", "scope": scope}
+
+
+@app.get("/rest/server.api")
+async def server_api(
+    method: str = Query(...),
+    search_expression: Optional[str] = Query(None),
+    food_id: Optional[str] = Query(None),
+    authorization: str = Header(""),
+):
+    await asyncio.sleep(LATENCY_SECONDS)
+    if random.random() < ERROR_RATE:
+        return JSONResponse(status_code=503, content={"error": {"message": "Service unavailable"}})
+
+    access_token = authorization.removeprefix("Bearer ")
+    if _tokens.get(access_token, 0) < time.monotonic():
+        return JSONResponse(
+            status_code=401,
+            content={"error": {"code": 13, "message": "Invalid token"}},
+        )
+
+    if method == "foods.search":
+        food = _lookup(search_expression or "")
+        if food is None:
+            return {"foods": {"max_results": "1", "total_results": "0", "page_number": "0"}}
+        return {"foods": {"food": [{"food_id": food["food_id"], "food_name": food["food_name"]}]}}
+
+    if method == "food.get":
+        food = _by_id.get(food_id or "")
+        if food is None:
+            return {"error": {"code": 106, "message": f"Invalid ID: food_id '{food_id}'"}}
+        return {
+            "food": {
+                "food_id": food_id,
+                "food_name": food["food_name"],
+                "servings": {
+                    "serving": [{
+                        "metric_serving_amount": "100.000",
+                        "metric_serving_unit": food["unit"],
+                        "calories": str(food["calories"]),
+                        "protein": str(food["protein"]),
+                        "fat": str(food["fat"]),
+                        "carbohydrate": str(food["carbohydrate"]),
+                    }]
+                },
+            }
+        }
+
+    return {"error": {"code": 2, "message": f"Unknown method: {method}"}}
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.activity import ActivitySampleForm
 
 
 class CaloriesRequest(BaseModel):
@@ -12,3 +16,67 @@ class CaloriesResponse(BaseModel):
     protein: float
     fat: float
     carbohydrates: float
+
+
+class CaloriesBatchRequest(BaseModel):
+    food_names: List[str] = Field(..., min_length=1)
+
+
+class CaloriesBatchItem(BaseModel):
+    food_name: str
+    status: str  # "ok" | "not_found" | "error"
+    result: Optional[CaloriesResponse] = None
+    error: Optional[str] = None
+
+
+class CaloriesBatchResponse(BaseModel):
+    items: List[CaloriesBatchItem]
+
+
+class ProductSearchItem(BaseModel):
+    name: str
+    calories: float
+    protein: Optional[float] = None
+    fat: Optional[float] = None
+    carbohydrates: Optional[float] = None
+    source: str  # "catalog" | "cache"
+
+
+class ActivityBatchRequest(BaseModel):
+    samples: List[ActivitySampleForm] = Field(..., min_length=1)
+
+
+class ActivityBatchResponse(BaseModel):
+    received: int
+    inserted: int  # повторно присланные интервалы не считаются
+
+
+class ActivityStreamError(BaseModel):
+    line: int
+    error: str
+
+
+class ActivityStreamResponse(BaseModel):
+    received: int  # непустых строк
+    accepted: int  # принято в буфер записи
+    rejected: int
+    errors: List[ActivityStreamError]  # первые ошибки валидации
+    # Строка, с которой отправить остаток после 503 (буфер заполнен)
+    resume_from_line: Optional[int] = None
+
+
+class SuggestItem(BaseModel):
+    name: str
+    calories: float  # ккал на 100 г
+    protein: Optional[float] = None  # г белка на 100 г
+    grams: float  # сколько можно съесть
+    protein_grams: Optional[float] = None  # белка в этой порции
+    favorite: bool
+
+
+class SuggestResponse(BaseModel):
+    calories_burned: float
+    days: int
+    sort: str  # "calories" | "protein" | "favorites"
+    catalog_size: int
+    items: List[SuggestItem]
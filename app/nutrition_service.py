@@ -0,0 +1,290 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+from app.config import get_settings
+from app.fatsecret_service import FatSecretService
+from app.database.models import Product
+from app.models import CaloriesResponse, ProductSearchItem
+from app.utils.database import Database
+from app.utils.food_names import food_name_variants, normalize_food_name, upstream_query
+from app.utils.singleflight import SingleFlight
+from app.utils.state import create_store
+from app.utils.unit_of_work import outside_unit_of_work
+
+log = logging.getLogger("nutrition")
+
+# Маркер закэшированного «не найдено» (негативный кэш)
+_NOT_FOUND = object()
+
+
+class NutritionService:
+    """
+    Кэширующая обёртка над FatSecretService.get_calories.
+
+    Первый уровень — KeyValueStore (по умолчанию LRU в памяти процесса), второй — локальный индекс:
+    таблица food_cache (после рестарта кэш тёплый) и каталог products
+    с учётом русских/английских алиасов. «Не найдено» тоже кэшируется,
+    но с более коротким TTL. Одновременные промахи по одному ключу
+    схлопываются в один поход в БД/FatSecret.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.db = Database()
+        self.fatsecret = FatSecretService()
+        self.cache = create_store(
+            maxsize=settings.NUTRITION_CACHE_SIZE,
+            ttl=settings.NUTRITION_CACHE_TTL_SECONDS,
+        )
+        self.search_cache = create_store(
+            maxsize=settings.PRODUCT_SEARCH_CACHE_SIZE,
+            ttl=settings.PRODUCT_SEARCH_CACHE_TTL_SECONDS,
+        )
+        self.flight = SingleFlight()
+        self.negative_ttl = settings.NUTRITION_NEGATIVE_TTL_SECONDS
+        self.db_ttl = settings.NUTRITION_DB_CACHE_TTL_SECONDS
+        self.db_hits = 0
+        self.db_misses = 0
+        self.negative_hits = 0
+        self.upstream_calls = 0
+        self.stale_served = 0
+
+    async def start(self) -> None:
+        await self.fatsecret.start()
+
+    async def aclose(self) -> None:
+        await self.fatsecret.aclose()
+
+    async def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
+        key = normalize_food_name(food_name)
+        if not key:
+            return None
+
+        hit, result = await self._get_from_memory(key)
+        if hit:
+            return result
+
+        # Промах может уйти в FatSecret: не держим соединение unit of work
+        async with outside_unit_of_work():
+            return await self.flight.do(key, lambda: self._load(key))
+
+    async def get_calories_batch(
+        self, food_names: List[str], concurrency: int
+    ) -> Dict[str, Union[Optional[CaloriesResponse], Exception]]:
+        """
+        Возвращает результат (или исключение) для каждого уникального
+        нормализованного названия. Попадания в память отдаются сразу,
+        промахи пачкой ищутся в локальном индексе, остальное параллельно
+        запрашивается у FatSecret не более чем в concurrency потоков.
+        """
+        results: Dict[str, Union[Optional[CaloriesResponse], Exception]] = {}
+        misses: List[str] = []
+        for key in dict.fromkeys(normalize_food_name(name) for name in food_names):
+            if not key:
+                results[key] = None
+                continue
+            hit, result = await self._get_from_memory(key)
+            if hit:
+                results[key] = result
+            else:
+                misses.append(key)
+
+        if misses:
+            found = await self._get_many_local(misses)
+            results.update(found)
+            misses = [key for key in misses if key not in found]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(key: str) -> Optional[CaloriesResponse]:
+            async with semaphore:
+                return await self.flight.do(key, lambda: self._load(key, check_local=False))
+
+        async with outside_unit_of_work():
+            resolved = await asyncio.gather(*(resolve(key) for key in misses), return_exceptions=True)
+        results.update(zip(misses, resolved))
+        return results
+
+    async def _get_from_memory(self, key: str) -> Tuple[bool, Optional[CaloriesResponse]]:
+        cached = await self.cache.get(key)
+        if cached is None:
+            return False, None
+        if cached is _NOT_FOUND:
+            self.negative_hits += 1
+            return True, None
+        return True, cached
+
+    async def _load(self, key: str, check_local: bool = True) -> Optional[CaloriesResponse]:
+        if check_local:
+            found = await self._get_many_local([key])
+            if key in found:
+                return found[key]
+
+        self.upstream_calls += 1
+        try:
+            result = await self.fatsecret.get_calories(upstream_query(key))
+        except Exception as e:
+            stale = await self._get_stale(key)
+            if stale is None:
+                raise
+            log.warning("FatSecret недоступен, отдаём устаревшую запись для %r: %s", key, e)
+            return stale
+        await self._remember(key, result)
+        try:
+            await self.db.save_food_cache(key, result)
+        except ValueError as e:
+            log.warning("Не удалось сохранить %r в food_cache: %s", key, e)
+        return result
+
+    async def _get_many_local(self, keys: List[str]) -> Dict[str, Optional[CaloriesResponse]]:
+        """
+        Ищет ключи (и их алиасы) в локальном индексе. Приоритет: актуальная
+        запись food_cache, затем каталог products, затем закэшированное
+        «не найдено». Всё, что вернулось отсюда, в FatSecret не уходит.
+        """
+        variants = {key: food_name_variants(key) for key in keys}
+        names = list(dict.fromkeys(name for key in keys for name in variants[key]))
+        try:
+            cache_rows = {
+                row.key: row
+                for row in await self.db.get_food_cache_many(names)
+                if self._age(row.updated_at) <= (self.db_ttl if row.found else self.negative_ttl)
+            }
+            need_catalog = [
+                name for key in keys
+                if not any(cache_rows.get(n) is not None and cache_rows[n].found for n in variants[key])
+                for name in variants[key]
+            ]
+            products: Dict[str, Product] = {}
+            if need_catalog:
+                for product in await self.db.get_products_by_normalized_names(need_catalog):
+                    products.setdefault(product.normalized_name, product)
+        except ValueError as e:
+            log.warning("Локальный индекс недоступен: %s", e)
+            return {}
+
+        found: Dict[str, Optional[CaloriesResponse]] = {}
+        for key in keys:
+            rows = [cache_rows[n] for n in variants[key] if n in cache_rows]
+            positive = next((row for row in rows if row.found), None)
+            product = next((products[n] for n in variants[key] if n in products), None)
+            if positive is not None:
+                result = CaloriesResponse(
+                    food_name=positive.food_name,
+                    calories=positive.calories,
+                    serving_description=positive.serving_description,
+                    protein=positive.protein,
+                    fat=positive.fat,
+                    carbohydrates=positive.carbohydrates,
+                )
+            elif product is not None:
+                result = CaloriesResponse(
+                    food_name=product.name,
+                    calories=product.calories,
+                    serving_description="100 г",
+                    protein=product.protein or 0.0,
+                    fat=product.fat or 0.0,
+                    carbohydrates=product.carbohydrates or 0.0,
+                )
+            elif rows:
+                result = None
+            else:
+                continue
+            await self._remember(key, result)
+            found[key] = result
+
+        self.db_hits += len(found)
+        self.db_misses += len(keys) - len(found)
+        return found
+
+    async def _get_stale(self, key: str) -> Optional[CaloriesResponse]:
+        """Запись food_cache любой давности — лучше, чем ошибка, пока FatSecret лежит."""
+        try:
+            rows = await self.db.get_food_cache_many(food_name_variants(key))
+        except ValueError:
+            return None
+        row = next((row for row in rows if row.found), None)
+        if row is None:
+            return None
+        result = CaloriesResponse(
+            food_name=row.food_name,
+            calories=row.calories,
+            serving_description=row.serving_description,
+            protein=row.protein,
+            fat=row.fat,
+            carbohydrates=row.carbohydrates,
+        )
+        # Короткий TTL: после восстановления FatSecret запись обновится
+        await self.cache.set(key, result, ttl=self.negative_ttl)
+        self.stale_served += 1
+        return result
+
+    async def find_product(self, product_name: str) -> Optional[Product]:
+        """Товар из каталога по нормализованному названию или его алиасу."""
+        names = food_name_variants(normalize_food_name(product_name))
+        products: Dict[str, Product] = {}
+        for product in await self.db.get_products_by_normalized_names(names):
+            products.setdefault(product.normalized_name, product)
+        return next((products[name] for name in names if name in products), None)
+
+    async def search(self, query: str, limit: int) -> List[ProductSearchItem]:
+        """Подсказки для автодополнения: только локальный индекс, без FatSecret."""
+        key = normalize_food_name(query)
+        if not key:
+            return []
+        cache_key = f"{limit}:{key}"
+        cached = await self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # С запасом: одно и то же блюдо может быть и в каталоге, и в food_cache
+        rows = await self.db.search_foods(key, food_name_variants(key), limit * 2)
+        items: List[ProductSearchItem] = []
+        seen = set()
+        for row in rows:
+            name_key = normalize_food_name(row.name)
+            if name_key in seen:
+                continue
+            seen.add(name_key)
+            items.append(ProductSearchItem(
+                name=row.name,
+                calories=row.calories,
+                protein=row.protein,
+                fat=row.fat,
+                carbohydrates=row.carbohydrates,
+                source=row.source,
+            ))
+            if len(items) == limit:
+                break
+        await self.search_cache.set(cache_key, items)
+        return items
+
+    async def forget(self, food_name: str) -> None:
+        """Сбрасывает запись в кэше, например после добавления своего продукта."""
+        await self.cache.delete(normalize_food_name(food_name))
+        await self.search_cache.clear()
+
+    async def _remember(self, key: str, result: Optional[CaloriesResponse]) -> None:
+        if result is None:
+            await self.cache.set(key, _NOT_FOUND, ttl=self.negative_ttl)
+        else:
+            await self.cache.set(key, result)
+
+    @staticmethod
+    def _age(updated_at: datetime) -> float:
+        return (datetime.now(timezone.utc) - updated_at).total_seconds()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.cache.stats(),
+            "negative_hits": self.negative_hits,
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+            "upstream_calls": self.upstream_calls,
+            "stale_served": self.stale_served,
+            "upstream": self.fatsecret.stats(),
+            "single_flight": self.flight.stats(),
+            "token": self.fatsecret.tokens.stats(),
+        }
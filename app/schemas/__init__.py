@@ -1,2 +1,3 @@
 from .product import *
-from .user import *
\ No newline at end of file
+from .user import *
+from .activity import *
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel, Field, field_validator
+
+# /product_count считает не дальше 365 суток назад: старше — лишняя секция
+# activity_samples, из будущего — часы трекера сбиты. Запас в сутки на
+# часовые пояса.
+MAX_SAMPLE_AGE = timedelta(days=366)
+MAX_SAMPLE_AHEAD = timedelta(days=1)
+
+
+class ActivitySampleForm(BaseModel):
+    """Сожжённые калории за интервал, начавшийся в started_at."""
+    chat_id: str
+    started_at: datetime
+    calories: float = Field(ge=0, le=10000)
+
+    @field_validator("chat_id", mode="before")
+    @classmethod
+    def chat_id_to_str(cls, v):
+        # Трекеры присылают chat_id числом, в таблице users он строка
+        return str(v) if isinstance(v, int) else v
+
+    @field_validator("started_at")
+    @classmethod
+    def require_timezone(cls, v):
+        if v.tzinfo is None:
+            raise ValueError("Timestamp must include a timezone offset")
+        now = datetime.now(timezone.utc)
+        if not now - MAX_SAMPLE_AGE <= v <= now + MAX_SAMPLE_AHEAD:
+            raise ValueError(
+                f"Timestamp must be within {MAX_SAMPLE_AGE.days} days before "
+                f"and {MAX_SAMPLE_AHEAD.days} day after the current time"
+            )
+        return v
@@ -1,15 +1,45 @@
+from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 class ProductCreateForm(BaseModel):
     name: str = Field(unique=True)
     calories: int = Field(default=1)
+
+    @field_validator("name")
+    @classmethod
     def validate_name(cls, v):
         if not v.strip():
             raise ValueError("Must not be blank")
         forbidden_chars = ["&","<",">", '"', "'"]
         if any(char in v for char in forbidden_chars):
             raise ValueError("forbidden character(s)")
-        raise v.strip()
+        return v.strip()
+
+
+class ProductImportForm(ProductCreateForm):
+    """Строка датасета для массового импорта: калории и БЖУ на 100 г."""
+    calories: int = Field(ge=0, le=10000)
+    protein: Optional[float] = Field(default=None, ge=0)
+    fat: Optional[float] = Field(default=None, ge=0)
+    carbohydrates: Optional[float] = Field(default=None, ge=0)
+
+    @field_validator("calories", mode="before")
+    @classmethod
+    def round_calories(cls, v):
+        # В датасетах калории часто дробные ("52.4"), в каталоге — целые
+        if isinstance(v, str):
+            v = v.strip().replace(",", ".")
+        try:
+            return round(float(v))
+        except (TypeError, ValueError, OverflowError):
+            return v
 
+    @field_validator("protein", "fat", "carbohydrates", mode="before")
+    @classmethod
+    def empty_to_none(cls, v):
+        if isinstance(v, str):
+            v = v.strip().replace(",", ".")
+            return v or None
+        return v
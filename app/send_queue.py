@@ -0,0 +1,255 @@
+"""
+Очередь исходящих сообщений Telegram.
+
+Обработчик кладёт ответ в очередь и сразу возвращается; отправляют
+фоновые воркеры, соблюдая лимиты Telegram:
+  * общий — TELEGRAM_GLOBAL_RATE сообщений в секунду на бота;
+  * на чат — TELEGRAM_CHAT_RATE в секунду с запасом TELEGRAM_CHAT_BURST;
+  * массовые рассылки (BULK) дополнительно не больше доли
+    TELEGRAM_BULK_SHARE от общего лимита: ответам пользователям
+    всегда остаётся запас.
+
+Лимиты — общие token bucket'ы процесса (как у FatSecret), поэтому очереди
+бота и рассылки в разных event loop не превышают их вместе; между
+воркерами API общий лимит делится поровну. Внутри очереди ответы (INTERACTIVE)
+обгоняют рассылку, а сообщения одного чата уходят по порядку.
+
+На 429 (RetryAfter) вся отправка процесса ставится на паузу на указанное
+время, и сообщение повторяется. Остальные ошибки не повторяются: после
+таймаута сообщение могло уже дойти.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, Dict, Hashable, Optional
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from app.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry
+from app.utils.resilience import TokenBucket
+
+log = logging.getLogger("send-queue")
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+SEND_LATENCY = registry.histogram(
+    "telegram_send_latency_seconds", "От постановки в очередь до ответа Telegram", ("priority",)
+)
+SEND_RESULTS = registry.counter(
+    "telegram_send_total", "Отправленные сообщения по итогу", ("priority", "outcome")
+)
+SEND_RETRY_AFTER = registry.counter(
+    "telegram_send_retry_after_total", "Ответы 429 от Telegram (пауза отправки)"
+)
+QUEUE_DEPTH = registry.gauge(
+    "telegram_send_queue_depth", "Сообщения, ждущие отправки", ("priority",)
+)
+
+
+class SendLimits:
+    """Лимиты отправки процесса; потокобезопасны и не привязаны к event loop."""
+
+    def __init__(self):
+        settings = get_settings()
+        workers = max(1, settings.API_WORKERS)
+        rate = settings.TELEGRAM_GLOBAL_RATE / workers
+        # Без запаса: ровный темп, в любом окне в 1 с не больше rate + 1 сообщений
+        self.global_bucket = TokenBucket(rate, capacity=1, max_wait=float("inf"))
+        self.bulk_bucket = TokenBucket(rate * settings.TELEGRAM_BULK_SHARE, capacity=1, max_wait=float("inf"))
+        self.chat_rate = settings.TELEGRAM_CHAT_RATE
+        self.chat_burst = settings.TELEGRAM_CHAT_BURST
+        # Бакет простаивающего чата давно полон: вытеснение из LRU его не ослабляет
+        self._chats = TTLCache(maxsize=settings.TELEGRAM_CHAT_BUCKETS, ttl=60)
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        with self._lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst, max_wait=float("inf"))
+            self._chats.set(chat_id, bucket)
+            return bucket
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat_id: Hashable, priority: int) -> None:
+        await self._chat_bucket(chat_id).acquire()
+        if priority == BULK:
+            await self.bulk_bucket.acquire()
+        await self.global_bucket.acquire()
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            paused = max(0.0, self._paused_until - time.monotonic())
+            chats = len(self._chats)
+        return {
+            "global": self.global_bucket.stats(),
+            "bulk": self.bulk_bucket.stats(),
+            "chat_buckets": chats,
+            "paused_for": paused,
+        }
+
+
+_limits: Optional[SendLimits] = None
+_limits_lock = threading.Lock()
+
+
+def shared_limits() -> SendLimits:
+    global _limits
+    with _limits_lock:
+        if _limits is None:
+            _limits = SendLimits()
+        return _limits
+
+
+class OutboundMessage:
+    def __init__(self, chat_id: Hashable, text: str, priority: int, kwargs: Dict[str, Any]):
+        self.chat_id = chat_id
+        self.text = text
+        self.priority = priority
+        self.kwargs = kwargs
+        self.enqueued = time.monotonic()
+        self.future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        # True с момента вызова Bot.send_message: отменять поздно, сообщение могло уйти
+        self.started = False
+
+
+class OutboundQueue:
+    def __init__(self, bot: Bot, workers: int):
+        self.bot = bot
+        self.workers = workers
+        self.limits = shared_limits()
+        # Создаётся в start(): в Python 3.9 очередь привязывается к циклу
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list = []
+        self._seq = itertools.count()
+        # chat_id -> сообщения чата, ждущие воркера, который сейчас отправляет в этот чат
+        self._chats: Dict[Hashable, Deque[OutboundMessage]] = {}
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self.sent = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дожидается отправки очереди (не дольше timeout) и останавливает воркеров."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Не отправлено при остановке: %d сообщений", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, chat_id: Hashable, text: str, priority: int = INTERACTIVE, **kwargs: Any) -> OutboundMessage:
+        """Ставит сообщение в очередь; результат — в message.future (Message или исключение)."""
+        if not self._tasks:
+            raise RuntimeError("Очередь отправки не запущена")
+        message = OutboundMessage(chat_id, text, priority, kwargs)
+        self._queue.put_nowait((priority, next(self._seq), message))
+        self._depth[priority] += 1
+        QUEUE_DEPTH.inc(priority=PRIORITY_NAMES[priority])
+        return message
+
+    async def send(self, chat_id: Hashable, text: str, priority: int = INTERACTIVE, **kwargs: Any) -> Any:
+        """enqueue с ожиданием результата отправки."""
+        return await self.enqueue(chat_id, text, priority, **kwargs).future
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, message = await self._queue.get()
+            parked = self._chats.get(message.chat_id)
+            if parked is not None:
+                # Чат уже у другого воркера: он отправит и это сообщение, по порядку.
+                # Сам воркер не ждёт медленный чат и берёт следующее сообщение.
+                # В глубине очереди сообщение считается, пока ждёт там.
+                parked.append(message)
+                continue
+            parked = self._chats[message.chat_id] = deque()
+            try:
+                while True:
+                    self._depth[message.priority] -= 1
+                    QUEUE_DEPTH.dec(priority=PRIORITY_NAMES[message.priority])
+                    try:
+                        if not message.future.cancelled():
+                            await self._deliver(message)
+                    except Exception as e:
+                        log.error("Ошибка воркера отправки: %s", e, exc_info=True)
+                    finally:
+                        self._queue.task_done()
+                    if not parked:
+                        break
+                    message = parked.popleft()
+            finally:
+                del self._chats[message.chat_id]
+
+    async def _deliver(self, message: OutboundMessage) -> None:
+        priority = PRIORITY_NAMES[message.priority]
+        while True:
+            await self.limits.acquire(message.chat_id, message.priority)
+            if message.future.cancelled():
+                return
+            message.started = True
+            try:
+                result = await self.bot.send_message(chat_id=message.chat_id, text=message.text, **message.kwargs)
+            except RetryAfter as e:
+                # 429: сообщение не отправлено, повторяем после паузы
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                SEND_RETRY_AFTER.inc()
+                log.warning("Telegram попросил подождать %.1f с", delay)
+                self.limits.pause(delay)
+                message.started = False
+                continue
+            except Exception as e:
+                self.failed += 1
+                SEND_RESULTS.inc(priority=priority, outcome="error")
+                log.warning("Сообщение в чат %s не отправлено: %s", message.chat_id, e)
+                if not message.future.done():
+                    message.future.set_exception(e)
+                    # Ответы обработчиков никто не ждёт: ошибка уже в логе
+                    message.future.exception()
+                return
+            self.sent += 1
+            SEND_RESULTS.inc(priority=priority, outcome="sent")
+            SEND_LATENCY.observe(time.monotonic() - message.enqueued, priority=priority)
+            if not message.future.done():
+                message.future.set_result(result)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": {PRIORITY_NAMES[p]: depth for p, depth in self._depth.items()},
+            "active_chats": len(self._chats),
+            "parked": sum(len(parked) for parked in self._chats.values()),
+            "sent": self.sent,
+            "failed": self.failed,
+            "limits": self.limits.stats(),
+        }
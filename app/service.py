@@ -1,90 +1,138 @@
-from typing import Optional
+import logging
+from typing import Optional, Tuple
 from uuid import UUID
-from app.mocks import DatabaseMock, FatSecretServiceMock, HumanApiServiceMock
+from app.config import get_settings
+from app.database.models import Product
+from app.activity_service import ActivityService
+from app.suggest_service import SuggestService
+from app.utils.state import create_store
 from app.utils.database import Database
-from app.fatsecret_service import FatSecretService
-from app.models import CaloriesResponse
+from app.nutrition_service import NutritionService
+from app.models import SuggestResponse
+
+log = logging.getLogger("service")
 
 
 class MainService:
     def __init__(self):
         self.db = Database()
-        self.fatsecret = FatSecretService()
-        self.human_api = HumanApiServiceMock()
+        self.nutrition = NutritionService()
+        self.activity = ActivityService()
+        self.suggest = SuggestService(self.activity)
+        settings = get_settings()
+        # chat_id -> (id пользователя, текущий продукт); обновляется при смене продукта.
+        # Webhook с несколькими воркерами: /change_product мог обработать другой
+        # процесс, поэтому кэшируем только id, а продукт читаем на каждый запрос
+        self.cache_products = settings.BOT_MODE != "webhook" or settings.API_WORKERS <= 1
+        self.users = create_store(
+            maxsize=settings.USER_CACHE_SIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+        )
+
+    async def start(self) -> None:
+        """Прогрев на старте бота: токен FatSecret и id продукта по умолчанию."""
+        await self.nutrition.start()
+        try:
+            await self.db.get_default_product_id()
+        except Exception as e:
+            log.warning("Не удалось получить продукт по умолчанию при старте: %s", e)
+
+    async def _get_user(self, chat_id: str) -> Tuple[UUID, Product]:
+        key = str(chat_id)
+        cached = await self.users.get(key)
+        if cached is not None:
+            if self.cache_products:
+                return cached
+            return cached, await self.db.get_user_product(cached)
+        user_id, product = await self.db.get_or_create_user_with_product(key)
+        await self._remember_user(key, user_id, product)
+        return user_id, product
+
+    async def _remember_user(self, chat_id: str, user_id: UUID, product: Product) -> None:
+        await self.users.set(str(chat_id), (user_id, product) if self.cache_products else user_id)
 
     async def get_or_create_user_by_chat_id(self, chat_id: str) -> UUID:
-        user = await self.db.get_user_by_chat_id(chat_id)
-        if not user:
-            user = await self.db.create_user(chat_id)
-        return user.id
+        cached = await self.users.get(str(chat_id))
+        if cached is not None:
+            return cached[0] if self.cache_products else cached
+        user_id, _ = await self._get_user(chat_id)
+        return user_id
 
     async def start_user(self, chat_id: str):
         await self.get_or_create_user_by_chat_id(chat_id)
 
     async def product_count_manual(self, user_id: UUID, product_name: str, calories_burned: int) -> Optional[float]:
-        product_info = self.fatsecret.get_calories(product_name)
+        product_info = await self.nutrition.get_calories(product_name)
         if not product_info:
             return None
         if product_info.calories == 0:
             return None
         return (calories_burned / product_info.calories) * 100
 
-    async def product_count(self, user_id: UUID, days: Optional[int] = None) -> Optional[dict]:
-        user = await self.db.get_user(user_id)
-        if not user:
-            return None
-
-        product = await self.db.get_product(user.curr_product_id)
-        if not product:
-            return None
-
-        calories_burned = self.human_api.get_calories_burned(days)
-        if calories_burned is None:
-            return None
-
-        multiplier = days if days else 1
-        total_calories = calories_burned * multiplier
-
+    async def product_count(self, chat_id: str, days: Optional[int] = None) -> Optional[dict]:
+        user_id, product = await self._get_user(chat_id)
         if product.calories == 0:
             return None
 
-        amount = (total_calories / product.calories) * 100
+        # Уже сумма за все days суток: умножать на days не нужно
+        calories_burned = await self.activity.get_calories_burned(user_id, days)
+
+        amount = (calories_burned / product.calories) * 100
         return {
             "amount": amount,
             "product_name": product.name,
             "calories": product.calories
         }
 
-    async def change_product(self, user_id: UUID, product_name: str) -> bool:
-        if await self.db.exist_product(product_name):
-            product = await self.db.get_product_by_name(product_name)
-            await self.db.update_user_product(user_id, product.id)
-            return True
-
-        product_info = self.fatsecret.get_calories(product_name)
-        if not product_info:
-            return False
+    async def change_product(self, chat_id: str, product_name: str) -> bool:
+        user_id, _ = await self._get_user(chat_id)
+        product = await self.nutrition.find_product(product_name)
+        if product is None:
+            product_info = await self.nutrition.get_calories(product_name)
+            if not product_info:
+                return False
+
+            # FatSecret мог вернуть блюдо, которое уже есть в каталоге
+            product = await self.nutrition.find_product(product_info.food_name)
+            if product is None:
+                product = await self.db.get_or_create_product(
+                    product_info.food_name,
+                    int(product_info.calories),
+                    protein=product_info.protein,
+                    fat=product_info.fat,
+                    carbohydrates=product_info.carbohydrates,
+                )
+                self.suggest.invalidate()
 
-        product = await self.db.create_product(product_info.food_name, int(product_info.calories))
-        await self.db.update_user_product(user_id, product.id)
+        try:
+            await self.db.update_user_product(user_id, product.id)
+        except Exception:
+            await self.users.delete(str(chat_id))
+            raise
+        await self._remember_user(chat_id, user_id, product)
         return True
 
     async def add_custom_product(self, user_id: UUID, product_name: str, calories: int) -> bool:
         try:
             await self.db.create_product(product_name, calories)
+            await self.nutrition.forget(product_name)
+            self.suggest.invalidate()
             return True
         except:
             return False
 
-    async def get_product(self, user_id: UUID) -> Optional[dict]:
-        user = await self.db.get_user(user_id)
-        if not user:
-            return None
+    async def set_notify(self, chat_id: str, enabled: bool) -> None:
+        user_id, _ = await self._get_user(chat_id)
+        await self.db.set_user_notify(user_id, enabled)
 
-        product = await self.db.get_product(user.curr_product_id)
-        if not product:
-            return None
+    async def suggest_products(
+        self, chat_id: str, days: Optional[int], sort: str, limit: int, min_protein: float = 0.0
+    ) -> SuggestResponse:
+        user_id, product = await self._get_user(chat_id)
+        return await self.suggest.suggest(user_id, product.id, days, sort, limit, min_protein)
 
+    async def get_product(self, chat_id: str) -> Optional[dict]:
+        _, product = await self._get_user(chat_id)
         return {
             "name": product.name,
             "calories": product.calories
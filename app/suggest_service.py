@@ -0,0 +1,231 @@
+"""
+Что можно съесть на сожжённые калории: /suggest и GET /suggest.
+
+Весь каталог products держится в памяти процесса упакованными массивами
+NumPy: калории и белок на 100 г — float32, по 4 байта на продукт. Граммы
+для каждого продукта, фильтры и выбор лучших N — несколько векторных
+операций над массивами целиком, без цикла Python по продуктам, поэтому
+ранжирование 100 тыс. продуктов занимает миллисекунды
+(benchmarks/suggest_ranking.py).
+
+Каталог перечитывается из БД раз в SUGGEST_CATALOG_TTL_SECONDS (в фоне,
+запросы тем временем получают прежний снимок) и сразу после добавления
+продукта этим процессом.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from app.activity_service import ActivityService
+from app.config import get_settings
+from app.models import SuggestItem, SuggestResponse
+from app.utils.database import Database
+from app.utils.metrics import registry
+from app.utils.singleflight import SingleFlight
+
+log = logging.getLogger("suggest")
+
+# calories — больше граммов (наименее калорийные первыми), protein — больше
+# белка в разрешённой порции, favorites — сначала избранное, затем как calories
+SORTS = ("calories", "protein", "favorites")
+
+RANK_DURATION = registry.histogram(
+    "suggest_rank_duration_seconds", "Ранжирование каталога для /suggest", ("sort",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+CATALOG_LOAD_DURATION = registry.histogram(
+    "suggest_catalog_load_duration_seconds", "Загрузка каталога для /suggest из БД",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class ProductCatalog:
+    """
+    Неизменяемый снимок каталога: i-й продукт — ids[i], names[i],
+    calories[i] и protein[i] (NaN, если белок неизвестен). Калорийность
+    больше 0: на неё делим.
+    """
+
+    def __init__(self, ids: List[UUID], names: List[str], calories: np.ndarray, protein: np.ndarray):
+        self.ids = ids
+        self.names = names
+        self.calories = np.ascontiguousarray(calories, dtype=np.float32)
+        self.protein = np.ascontiguousarray(protein, dtype=np.float32)
+        self.loaded_at = time.monotonic()
+        # id -> позиция; строится при первом запросе с избранным
+        self._positions: Optional[Dict[UUID, int]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Any]) -> "ProductCatalog":
+        """Строки (id, name, calories, protein) из Database.get_product_catalog."""
+        return cls(
+            ids=[row[0] for row in rows],
+            names=[row[1] for row in rows],
+            calories=np.fromiter((row[2] for row in rows), dtype=np.float32, count=len(rows)),
+            protein=np.fromiter(
+                (np.nan if row[3] is None else row[3] for row in rows), dtype=np.float32, count=len(rows)
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.calories.nbytes + self.protein.nbytes
+
+    def positions(self, product_ids: Sequence[UUID]) -> np.ndarray:
+        """Позиции продуктов в порядке product_ids; отсутствующие в снимке пропускаются."""
+        if self._positions is None:
+            self._positions = {product_id: i for i, product_id in enumerate(self.ids)}
+        found = (self._positions.get(product_id) for product_id in product_ids)
+        return np.fromiter((i for i in found if i is not None), dtype=np.intp)
+
+    def rank(
+        self,
+        calories_burned: float,
+        sort: str,
+        limit: int,
+        max_grams: float,
+        min_protein: float = 0.0,
+        favorites: Sequence[UUID] = (),
+    ) -> List[SuggestItem]:
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort '{sort}', expected one of {', '.join(SORTS)}")
+        grams = np.float32(calories_burned * 100.0) / self.calories
+        mask = grams <= max_grams
+        favorite = self.positions(favorites)
+        if min_protein > 0:
+            # NaN не проходит сравнение: продукты без данных о белке отсеиваются
+            enough_protein = self.protein >= min_protein
+            mask &= enough_protein
+            favorite = favorite[enough_protein[favorite]]
+
+        if sort == "favorites":
+            # Избранное показываем, даже если порция больше max_grams
+            head = favorite[:limit]
+            mask[head] = False
+            order = np.concatenate((head, _top(grams, mask, limit - len(head))))
+        elif sort == "protein":
+            order = _top(grams * self.protein / 100, mask & (self.protein > 0), limit)
+        else:
+            order = _top(grams, mask, limit)
+
+        favorite_set = set(favorite.tolist())
+        items = []
+        for i in order.tolist():
+            protein = None if np.isnan(self.protein[i]) else float(self.protein[i])
+            items.append(SuggestItem(
+                name=self.names[i],
+                calories=float(self.calories[i]),
+                protein=protein,
+                grams=float(grams[i]),
+                protein_grams=None if protein is None else float(grams[i]) * protein / 100,
+                favorite=i in favorite_set,
+            ))
+        return items
+
+
+def _top(score: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """Позиции k наибольших score среди mask, по убыванию: O(n) отбор + сортировка k."""
+    candidates = np.flatnonzero(mask)
+    if k <= 0 or not len(candidates):
+        return np.empty(0, dtype=np.intp)
+    values = score[candidates]
+    if k < len(candidates):
+        best = np.argpartition(-values, k - 1)[:k]
+    else:
+        best = np.arange(len(candidates))
+    return candidates[best[np.argsort(-values[best], kind="stable")]]
+
+
+class SuggestService:
+    def __init__(self, activity: ActivityService):
+        settings = get_settings()
+        self.db = Database()
+        self.activity = activity
+        self.ttl = settings.SUGGEST_CATALOG_TTL_SECONDS
+        self.max_grams = settings.SUGGEST_MAX_GRAMS
+        self.max_favorites = settings.SUGGEST_MAX_FAVORITES
+        self._catalog: Optional[ProductCatalog] = None
+        self.flight = SingleFlight()
+        # Ссылка на фоновое обновление: цикл держит задачи только слабо
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.load_errors = 0
+        self.requests = 0
+
+    async def catalog(self) -> ProductCatalog:
+        catalog = self._catalog
+        if catalog is None:
+            return await self.flight.do("catalog", self._load)
+        stale = time.monotonic() - catalog.loaded_at > self.ttl
+        if stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+        return catalog
+
+    def invalidate(self) -> None:
+        """Следующий запрос перечитает каталог (например, после добавления продукта)."""
+        self._catalog = None
+
+    async def _load(self) -> ProductCatalog:
+        started = time.perf_counter()
+        catalog = ProductCatalog.from_rows(await self.db.get_product_catalog())
+        CATALOG_LOAD_DURATION.observe(time.perf_counter() - started)
+        self._catalog = catalog
+        self.loads += 1
+        log.info("Каталог для /suggest загружен: %d продуктов, %d байт", len(catalog), catalog.nbytes)
+        return catalog
+
+    async def _refresh(self) -> None:
+        try:
+            await self.flight.do("catalog", self._load)
+        except Exception as e:
+            # Остаёмся на прежнем снимке, следующий запрос попробует снова
+            self.load_errors += 1
+            log.warning("Не удалось обновить каталог для /suggest: %s", e)
+
+    async def suggest(
+        self,
+        user_id: UUID,
+        current_product_id: Optional[UUID],
+        days: Optional[int],
+        sort: str,
+        limit: int,
+        min_protein: float = 0.0,
+    ) -> SuggestResponse:
+        self.requests += 1
+        catalog = await self.catalog()
+        calories_burned = await self.activity.get_calories_burned(user_id, days)
+        favorites: List[UUID] = []
+        if sort == "favorites":
+            favorites = await self.db.get_user_favorites(user_id, self.max_favorites)
+            # Текущий продукт — тоже избранное, даже если выбран по умолчанию
+            if current_product_id is not None and current_product_id not in favorites:
+                favorites.insert(0, current_product_id)
+
+        started = time.perf_counter()
+        items = catalog.rank(calories_burned, sort, limit, self.max_grams, min_protein, favorites)
+        RANK_DURATION.observe(time.perf_counter() - started, sort=sort)
+        return SuggestResponse(
+            calories_burned=calories_burned,
+            days=days or 1,
+            sort=sort,
+            catalog_size=len(catalog),
+            items=items,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        catalog = self._catalog
+        return {
+            "catalog_size": len(catalog) if catalog is not None else None,
+            "catalog_bytes": catalog.nbytes if catalog is not None else None,
+            "catalog_age": time.monotonic() - catalog.loaded_at if catalog is not None else None,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "requests": self.requests,
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления параллельно, но строго по очереди внутри
+    одного чата: /change_product и следующий за ним /get_product одного
+    пользователя не обгонят друг друга.
+
+    max_pending ограничивает число принятых в обработку обновлений
+    (ожидающих своей очереди в чате + выполняющихся), workers — число
+    одновременно выполняющихся обработчиков. Обновление, ждущее свой чат,
+    не занимает слот worker'а.
+
+    Порядок соблюдается внутри одного процесса. В режиме webhook при
+    API_WORKERS > 1 балансировщик раздаёт обновления воркерам без учёта
+    чата, и два сообщения одного чата могут обрабатываться параллельно
+    в разных процессах.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        super().__init__(max_concurrent_updates=max(max_pending, workers))
+        self.workers = workers
+        self._worker_slots: Optional[asyncio.Semaphore] = None
+        # chat_id -> [lock, число обновлений этого чата в обработке]
+        self._chats: Dict[Hashable, list] = {}
+        self.pending = 0
+        self.running = 0
+        self.processed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def initialize(self) -> None:
+        self._worker_slots = asyncio.Semaphore(self.workers)
+
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._worker_slots is None:
+            await self.initialize()
+        key = self._chat_key(update)
+        enqueued = time.monotonic()
+        self.pending += 1
+        try:
+            if key is None:
+                async with self._worker_slots:
+                    await self._run(coroutine, enqueued)
+                return
+
+            chat = self._chats.setdefault(key, [asyncio.Lock(), 0])
+            chat[1] += 1
+            try:
+                async with chat[0]:
+                    async with self._worker_slots:
+                        await self._run(coroutine, enqueued)
+            finally:
+                chat[1] -= 1
+                if chat[1] == 0:
+                    del self._chats[key]
+        finally:
+            self.pending -= 1
+
+    async def _run(self, coroutine: Awaitable[Any], enqueued: float) -> None:
+        waited = time.monotonic() - enqueued
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        self.running += 1
+        try:
+            await coroutine
+        finally:
+            self.running -= 1
+            self.processed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending - self.running,
+            "running": self.running,
+            "active_chats": len(self._chats),
+            "processed": self.processed,
+            "wait_time_avg": self.wait_time_total / self.processed if self.processed else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
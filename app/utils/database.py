@@ -1,28 +1,238 @@
-from typing import Optional, AsyncGenerator
-from uuid import UUID
+import asyncio
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple, AsyncGenerator
+from uuid import UUID, uuid4
 
-from app.database.connection.session import async_session_maker
-from app.database.models import User, Product
+from app.database.connection import session as db_session
+from app.database.models import User, Product, FoodCache, ActivityDaily, UserProduct
 from app.database.connection import *
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from app.models import CaloriesResponse
+from app.schemas.activity import ActivitySampleForm
+from app.schemas.product import ProductImportForm
+from app.utils.food_names import normalize_food_name
+from app.utils.metrics import instrument_methods, registry
+from app.utils.unit_of_work import current_unit_of_work, reads_need_primary
+from sqlalchemy import (
+    Float, Row, String, any_, bindparam, case, cast, func, literal, null, or_, select, text, union_all, update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
 
+DEFAULT_PRODUCT_NAME = 'Beer'
+
+DB_CALL_DURATION = registry.histogram(
+    "db_call_duration_seconds", "Длительность методов Database", ("method",)
+)
+DB_CALL_ERRORS = registry.counter(
+    "db_call_errors_total", "Методы Database, завершившиеся исключением", ("method",)
+)
+DB_READS = registry.counter(
+    "db_reads_total", "Чтения через get_read_session по месту выполнения", ("target",)
+)
+
+# Классы SQLSTATE, после которых повтор может пройти: обрыв соединения,
+# конфликт сериализации или deadlock, нехватка ресурсов, рестарт сервера
+_TRANSIENT_SQLSTATES = ("08", "40", "53", "57P")
+
+
+def is_transient_db_error(e: BaseException) -> bool:
+    """
+    Ошибка, которую имеет смысл повторить: сеть, таймаут пула, потерянное
+    соединение, конфликт транзакций. Ошибки в данных и в коде — нет.
+    Методы Database заворачивают исключения в ValueError, поэтому
+    проверяется вся цепочка причин.
+    """
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        if isinstance(e, (OSError, asyncio.TimeoutError, PoolTimeoutError)):
+            return True
+        if isinstance(e, DBAPIError):
+            if e.connection_invalidated:
+                return True
+            # Ошибка драйвера с кодом SQLSTATE
+            e = e.orig
+            continue
+        sqlstate = getattr(e, "sqlstate", None)
+        if isinstance(sqlstate, str) and sqlstate.startswith(_TRANSIENT_SQLSTATES):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+# Горячие запросы собираются один раз при импорте: на вызове не строится
+# select() и не пересчитывается ключ кэша компиляции с нуля. Списки передаются
+# одним массивом (= ANY), поэтому у asyncpg один prepared statement на запрос,
+# а не по одному на каждую длину списка, как с IN (...).
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+_USER_BY_CHAT_ID = select(User).where(User.chat_id == bindparam("chat_id"))
+_PRODUCT_ID_BY_NAME = select(Product.id).where(Product.name == bindparam("name"))
+_PRODUCT_BY_ID = select(Product).where(Product.id == bindparam("product_id"))
+_USER_PRODUCT = (
+    select(Product)
+    .join(User, User.curr_product_id == Product.id)
+    .where(User.id == bindparam("user_id"))
+)
+_PRODUCT_BY_NAME = select(Product).where(Product.name == bindparam("name"))
+_PRODUCTS_BY_NORMALIZED_NAMES = select(Product).where(
+    Product.normalized_name == any_(bindparam("names", type_=ARRAY(String)))
+)
+_FOOD_CACHE_BY_KEYS = select(FoodCache).where(
+    FoodCache.key == any_(bindparam("keys", type_=ARRAY(String)))
+)
+# Смена продукта заодно засчитывается в избранное пользователя (user_products)
+_UPDATE_USER_PRODUCT = text("""
+    WITH updated AS (
+        UPDATE users SET curr_product_id = CAST(:product_id AS uuid)
+        WHERE id = CAST(:user_id AS uuid)
+        RETURNING id
+    ), picked AS (
+        INSERT INTO user_products (user_id, product_id, picks, last_picked_at)
+        SELECT id, CAST(:product_id AS uuid), 1, now() FROM updated
+        ON CONFLICT (user_id, product_id)
+        DO UPDATE SET picks = user_products.picks + 1, last_picked_at = now()
+    )
+    SELECT id FROM updated
+""")
+_USER_FAVORITES = (
+    select(UserProduct.product_id)
+    .where(UserProduct.user_id == bindparam("user_id"))
+    .order_by(UserProduct.picks.desc(), UserProduct.last_picked_at.desc())
+    .limit(bindparam("limit"))
+)
+# Продукты с нулевой калорийностью в подборе не участвуют: на них не делим
+_PRODUCT_CATALOG = select(Product.id, Product.name, Product.calories, Product.protein).where(
+    Product.calories > 0
+)
+_ACTIVITY_TOTAL = select(
+    func.coalesce(func.sum(ActivityDaily.calories), 0.0), func.count()
+).where(
+    ActivityDaily.user_id == bindparam("user_id"),
+    ActivityDaily.day >= bindparam("since"),
+)
+# Сэмплы и дневные суммы одним запросом: в activity_daily прибавляется только
+# то, что реально вставилось, поэтому повтор той же пачки ничего не удвоит.
+# Сэмплы неизвестных chat_id отбрасываются JOIN-ом.
+_INSERT_ACTIVITY = text("""
+    WITH inserted AS (
+        INSERT INTO activity_samples (user_id, started_at, calories)
+        SELECT u.id, s.started_at, s.calories
+        FROM unnest(
+            CAST(:chat_ids AS varchar[]), CAST(:started_at AS timestamptz[]), CAST(:calories AS float8[])
+        ) AS s (chat_id, started_at, calories)
+        JOIN users u ON u.chat_id = s.chat_id
+        ON CONFLICT (user_id, started_at) DO NOTHING
+        RETURNING user_id, started_at, calories
+    ), rollup AS (
+        INSERT INTO activity_daily (user_id, day, calories, samples)
+        SELECT user_id, (started_at AT TIME ZONE CAST(:tz AS text))::date, sum(calories), count(*)
+        FROM inserted
+        GROUP BY 1, 2
+        -- Один порядок блокировок у параллельных пачек, без взаимных deadlock
+        ORDER BY 1, 2
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            calories = activity_daily.calories + EXCLUDED.calories,
+            samples = activity_daily.samples + EXCLUDED.samples
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM rollup)
+""")
+_SET_USER_NOTIFY = (
+    update(User)
+    .where(User.id == bindparam("user_id"))
+    .values(notify_enabled=bindparam("enabled"))
+    .returning(User.id)
+)
+# Сводка только по данным трекера: без строки activity_daily за день не шлём
+# ничего, а не выдуманные калории.
+# Шард пользователя — от id, а не от chat_id: не меняется и равномерно распределён.
+# & 2147483647 вместо abs(): abs(-2^31) в int4 переполняется.
+_PREPARE_DIGESTS = text("""
+    INSERT INTO digest_deliveries (user_id, day, shard, chat_id, product_name, calories, grams, status)
+    SELECT u.id, CAST(:day AS date), CAST(:shard AS smallint), u.chat_id, p.name,
+           a.calories, a.calories / p.calories * 100, 'pending'
+    FROM users u
+    JOIN products p ON p.id = u.curr_product_id
+    JOIN activity_daily a ON a.user_id = u.id AND a.day = CAST(:day AS date)
+    WHERE u.notify_enabled
+      AND (hashtext(u.id::text) & 2147483647) % CAST(:shards AS integer) = CAST(:shard AS smallint)
+      AND p.calories > 0
+    ON CONFLICT (user_id, day) DO NOTHING
+""")
+_RESET_STALE_DIGESTS = text("""
+    UPDATE digest_deliveries SET status = 'unknown'
+    WHERE day = :day AND shard = :shard AND status = 'sending'
+""")
+_CLAIM_DIGESTS = text("""
+    UPDATE digest_deliveries d SET status = 'sending', claimed_at = now()
+    FROM (
+        SELECT user_id FROM digest_deliveries
+        WHERE day = :day AND shard = :shard AND status = 'pending'
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    ) batch
+    WHERE d.user_id = batch.user_id AND d.day = :day
+    RETURNING d.user_id, d.chat_id, d.product_name, d.calories, d.grams
+""")
+# Заблокировавшие бота отписываются тем же запросом
+_FINISH_DIGESTS = text("""
+    WITH results AS (
+        SELECT * FROM unnest(CAST(:user_ids AS uuid[]), CAST(:statuses AS varchar[])) AS r (user_id, status)
+    ), finished AS (
+        UPDATE digest_deliveries d SET status = r.status, sent_at = now()
+        FROM results r
+        WHERE d.user_id = r.user_id AND d.day = :day AND d.status = 'sending'
+        RETURNING d.user_id
+    )
+    UPDATE users u SET notify_enabled = false
+    FROM results r
+    WHERE u.id = r.user_id AND r.status = 'blocked'
+""")
+
+
+@instrument_methods(DB_CALL_DURATION, DB_CALL_ERRORS)
 class Database:
+    _default_product_id: Optional[UUID] = None
+
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
-        async with async_session_maker() as session:
+        """Сессия открытого unit of work, если он есть, иначе своя на вызов."""
+        uow = current_unit_of_work()
+        if uow is not None:
+            async with uow.session() as shared:
+                if shared is not None:
+                    yield shared
+                    return
+        async with db_session.async_session_maker() as session:
+            try:
+                yield session
+            finally:
+                await session.close()
+
+    @asynccontextmanager
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Сессия для методов, которые только читают: реплика, если она
+        настроена и не нужен read-your-writes (см. reads_need_primary).
+        """
+        replica = db_session.get_replica_session_maker()
+        if replica is None or await reads_need_primary():
+            DB_READS.inc(target="primary")
+            async with self.get_session() as session:
+                yield session
+            return
+        DB_READS.inc(target="replica")
+        async with replica() as session:
             try:
                 yield session
             finally:
                 await session.close()
 
     async def get_user(self, user_id: UUID) -> Optional[User]:
-        async with self.get_session() as session:
+        async with self.get_read_session() as session:
             try:
-                query = select(User).where(User.id == user_id)
-                result = await session.execute(query)
+                result = await session.execute(_USER_BY_ID, {"user_id": user_id})
                 curr_user = result.scalar_one_or_none()
                 return curr_user
             except Exception as e:
@@ -30,87 +240,528 @@ class Database:
                 raise ValueError(f"Error getting user with id {user_id}: {e}")
 
     async def get_user_by_chat_id(self, chat_id: str) -> Optional[User]:
-        async with self.get_session() as session:
+        async with self.get_read_session() as session:
             try:
-                query = select(User).where(User.chat_id == str(chat_id))
-                result = await session.execute(query)
+                result = await session.execute(_USER_BY_CHAT_ID, {"chat_id": str(chat_id)})
                 curr_user = result.scalar_one_or_none()
                 return curr_user
             except Exception as e:
                 await session.rollback()
                 raise ValueError(f"Error getting user with chat_id {chat_id}: {e}")
 
+    async def get_default_product_id(self) -> UUID:
+        """id продукта по умолчанию; запрашивается один раз на процесс."""
+        if Database._default_product_id is None:
+            async with self.get_session() as session:
+                result = await session.execute(_PRODUCT_ID_BY_NAME, {"name": DEFAULT_PRODUCT_NAME})
+                product_id = result.scalar_one_or_none()
+            if product_id is None:
+                raise ValueError(f"Default product '{DEFAULT_PRODUCT_NAME}' not found in database")
+            Database._default_product_id = product_id
+        return Database._default_product_id
+
+    @staticmethod
+    def _user_upsert(chat_id: str, default_product_id: UUID):
+        """
+        (id, curr_product_id) пользователя с созданием при отсутствии.
+        Вставленная в CTE строка не видна соседнему SELECT, поэтому
+        результаты объединяются через UNION ALL.
+        """
+        inserted = (
+            insert(User)
+            .values(id=uuid4(), chat_id=chat_id, curr_product_id=default_product_id)
+            .on_conflict_do_nothing(index_elements=[User.chat_id])
+            .returning(User.id, User.curr_product_id)
+            .cte("inserted")
+        )
+        return union_all(
+            select(inserted.c.id, inserted.c.curr_product_id, literal(True).label("created")),
+            select(User.id, User.curr_product_id, literal(False).label("created")).where(User.chat_id == chat_id),
+        ).subquery("u")
+
+    async def _execute_user_upsert(self, chat_id: str, build_query) -> Row:
+        chat_id = str(chat_id)
+        default_product_id = await self.get_default_product_id()
+        async with self.get_session() as session:
+            try:
+                # Пустой результат возможен, если параллельная транзакция вставила
+                # того же пользователя уже после снимка нашего запроса: повторяем.
+                for _ in range(2):
+                    users = self._user_upsert(chat_id, default_product_id)
+                    row = (await session.execute(build_query(users).add_columns(users.c.created))).first()
+                    if row is None:
+                        continue
+                    # Commit (и пометка unit of work как пишущего, что уводит чтения
+                    # чата на primary) — только если пользователь действительно создан
+                    if row[-1]:
+                        await session.commit()
+                    return row[:-1]
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting user with chat_id {chat_id}: {e}")
+        raise ValueError(f"User with chat_id {chat_id} could not be created")
+
+    async def get_or_create_user_id(self, chat_id: str) -> UUID:
+        row = await self._execute_user_upsert(
+            chat_id, lambda users: select(users.c.id).limit(1)
+        )
+        return row[0]
+
+    async def get_or_create_user_with_product(self, chat_id: str) -> Tuple[UUID, Product]:
+        """Пользователь по chat_id вместе с текущим продуктом за один запрос."""
+        row = await self._execute_user_upsert(
+            chat_id,
+            lambda users: (
+                select(users.c.id, Product)
+                .select_from(users)
+                .join(Product, Product.id == users.c.curr_product_id)
+                .limit(1)
+            ),
+        )
+        return row[0], row[1]
+
     async def create_user(self, chat_id: str) -> Optional[User]:
+        default_product_id = await self.get_default_product_id()
         async with self.get_session() as session:
-            query = select(Product).where(Product.name == 'Beer')
-            result = await session.execute(query)
-            default_product = result.scalar_one_or_none()
-            if not default_product:
-                raise ValueError("Default product 'Beer' not found in database")
-            
-            user = User(chat_id=str(chat_id), curr_product_id=default_product.id)
-            session.add(user)
+            stmt = (
+                insert(User)
+                .values(id=uuid4(), chat_id=str(chat_id), curr_product_id=default_product_id)
+                .on_conflict_do_nothing(index_elements=[User.chat_id])
+                .returning(User)
+            )
             try:
+                user = (await session.execute(stmt)).scalar_one_or_none()
                 await session.commit()
-                await session.refresh(user)
-                return user
-            except IntegrityError:
+            except Exception as e:
                 await session.rollback()
-                raise ValueError(f"User with chat_id {chat_id} already exists")
+                raise ValueError(f"Error creating user with chat_id {chat_id}: {e}")
+        if user is None:
+            raise ValueError(f"User with chat_id {chat_id} already exists")
+        return user
 
     async def exist_product(self, product_name: str) -> bool:
-        async with self.get_session() as session:
-            query = select(Product).where(Product.name == product_name)
-            result = (await session.execute(query)).scalar_one_or_none()
-            return result is not None
+        async with self.get_read_session() as session:
+            result = await session.execute(_PRODUCT_ID_BY_NAME, {"name": product_name})
+            return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    def _product_insert(
+        product_name: str,
+        calories: int,
+        protein: Optional[float],
+        fat: Optional[float],
+        carbohydrates: Optional[float],
+    ):
+        return insert(Product).values(
+            id=uuid4(),
+            name=product_name,
+            normalized_name=normalize_food_name(product_name),
+            calories=calories,
+            protein=protein,
+            fat=fat,
+            carbohydrates=carbohydrates,
+        )
 
-    async def create_product(self, product_name: str, calories: int) -> Optional[Product]:
-        if await self.exist_product(product_name):
+    async def create_product(
+        self,
+        product_name: str,
+        calories: int,
+        protein: Optional[float] = None,
+        fat: Optional[float] = None,
+        carbohydrates: Optional[float] = None,
+    ) -> Optional[Product]:
+        stmt = (
+            self._product_insert(product_name, calories, protein, fat, carbohydrates)
+            .on_conflict_do_nothing(index_elements=[Product.name])
+            .returning(Product)
+        )
+        async with self.get_session() as session:
+            try:
+                product = (await session.execute(stmt)).scalar_one_or_none()
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error creating product with name {product_name}: {e}")
+        if product is None:
             raise ValueError(f"Product with name '{product_name}' already exists")
+        return product
+
+    async def get_or_create_product(
+        self,
+        product_name: str,
+        calories: int,
+        protein: Optional[float] = None,
+        fat: Optional[float] = None,
+        carbohydrates: Optional[float] = None,
+    ) -> Product:
+        """
+        Существующий продукт с таким названием или новый. No-op UPDATE нужен,
+        чтобы RETURNING вернул строку и при конфликте (в том числе с ещё не
+        закоммиченной параллельной вставкой).
+        """
+        stmt = self._product_insert(product_name, calories, protein, fat, carbohydrates)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.name],
+            set_={"name": stmt.excluded.name},
+        ).returning(Product)
         async with self.get_session() as session:
-            product = Product(name=product_name, calories=calories)
-            session.add(product)
             try:
+                product = (await session.execute(stmt)).scalar_one()
                 await session.commit()
-                await session.refresh(product)
                 return product
-            except IntegrityError:
+            except Exception as e:
                 await session.rollback()
-                raise ValueError(f"Error creating product with name {product_name}, product already exists")
+                raise ValueError(f"Error creating product with name {product_name}: {e}")
 
+    async def upsert_products(self, products: List[ProductImportForm], update_existing: bool = True) -> int:
+        """
+        Вставляет пачку продуктов одним запросом через unnest: число
+        параметров не зависит от размера пачки. Возвращает число затронутых строк.
+        """
+        if not products:
+            return 0
+        # ON CONFLICT не может дважды изменить одну строку в одном запросе
+        unique = {product.name: product for product in products}.values()
+        conflict = (
+            """DO UPDATE SET
+                normalized_name = EXCLUDED.normalized_name,
+                calories = EXCLUDED.calories,
+                protein = EXCLUDED.protein,
+                fat = EXCLUDED.fat,
+                carbohydrates = EXCLUDED.carbohydrates"""
+            if update_existing else "DO NOTHING"
+        )
+        stmt = text(f"""
+            INSERT INTO products (id, name, normalized_name, calories, protein, fat, carbohydrates)
+            SELECT * FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:names AS varchar[]), CAST(:normalized_names AS varchar[]),
+                CAST(:calories AS integer[]), CAST(:proteins AS float8[]), CAST(:fats AS float8[]),
+                CAST(:carbohydrates AS float8[])
+            )
+            ON CONFLICT (name) {conflict}
+        """)
+        params = {
+            "ids": [uuid4() for _ in unique],
+            "names": [product.name for product in unique],
+            "normalized_names": [normalize_food_name(product.name) for product in unique],
+            "calories": [product.calories for product in unique],
+            "proteins": [product.protein for product in unique],
+            "fats": [product.fat for product in unique],
+            "carbohydrates": [product.carbohydrates for product in unique],
+        }
+        async with self.get_session() as session:
+            try:
+                result = await session.execute(stmt, params)
+                await session.commit()
+                return result.rowcount
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error importing {len(params['names'])} products: {e}")
 
     async def get_product_by_name(self, product_name: str) -> Optional[Product]:
-        async with self.get_session() as session:
+        async with self.get_read_session() as session:
             try:
-                query = select(Product).where(Product.name == product_name)
-                result = await session.execute(query)
+                result = await session.execute(_PRODUCT_BY_NAME, {"name": product_name})
                 curr_product = result.scalar_one_or_none()
                 return curr_product
             except Exception as e:
                 await session.rollback()
                 raise ValueError(f"Error getting product with name {product_name}: {e}")
 
+    async def get_products_by_normalized_names(self, names: List[str]) -> List[Product]:
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(_PRODUCTS_BY_NORMALIZED_NAMES, {"names": names})
+                return list(result.scalars().all())
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting products by names {names}: {e}")
+
+    async def search_foods(self, query: str, variants: List[str], limit: int) -> List[Row]:
+        """
+        Поиск по каталогу products и найденным записям food_cache.
+
+        Ранжирование: точное совпадение (в том числе по алиасу), затем
+        совпадение по префиксу, затем триграммная близость (pg_trgm).
+        """
+        prefix = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+        def ranked(column):
+            return (
+                case(
+                    (column.in_(variants), 0),
+                    (column.like(prefix, escape="\\"), 1),
+                    else_=2,
+                ).label("rank"),
+                func.similarity(column, query).label("score"),
+            )
+
+        def matches(column):
+            return or_(
+                column.in_(variants),
+                column.like(prefix, escape="\\"),
+                column.op("%")(query),
+            )
+
+        catalog = select(
+            Product.id,
+            Product.name,
+            cast(Product.calories, Float).label("calories"),
+            Product.protein,
+            Product.fat,
+            Product.carbohydrates,
+            literal("catalog").label("source"),
+            *ranked(Product.normalized_name),
+        ).where(matches(Product.normalized_name))
+        cached = select(
+            cast(null(), Product.id.type).label("id"),
+            FoodCache.food_name.label("name"),
+            FoodCache.calories,
+            FoodCache.protein,
+            FoodCache.fat,
+            FoodCache.carbohydrates,
+            literal("cache").label("source"),
+            *ranked(FoodCache.key),
+        ).where(FoodCache.found.is_(True), matches(FoodCache.key))
+
+        union = union_all(catalog, cached).subquery()
+        stmt = (
+            select(union)
+            .order_by(union.c.rank, union.c.score.desc(), func.length(union.c.name))
+            .limit(limit)
+        )
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(stmt)
+                return list(result.all())
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error searching foods by '{query}': {e}")
+
     async def get_product(self, product_id: UUID) -> Optional[Product]:
-        async with self.get_session() as session:
+        async with self.get_read_session() as session:
             try:
-                query = select(Product).where(Product.id == product_id)
-                result = await session.execute(query)
+                result = await session.execute(_PRODUCT_BY_ID, {"product_id": product_id})
                 curr_product = result.scalar_one_or_none()
                 return curr_product
             except Exception as e:
                 await session.rollback()
                 raise ValueError(f"Error getting product with id {product_id}: {e}")
 
+    async def get_user_product(self, user_id: UUID) -> Product:
+        """Текущий продукт пользователя одним запросом по первичному ключу."""
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(_USER_PRODUCT, {"user_id": user_id})
+                product = result.scalar_one_or_none()
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting product of user {user_id}: {e}")
+        if product is None:
+            raise ValueError(f"User with id {user_id} not found")
+        return product
+
     async def update_user_product(self, user_id: UUID, product_id: UUID):
         async with self.get_session() as session:
             try:
-                query = select(User).where(User.id == user_id)
-                result = await session.execute(query)
-                user = result.scalar_one_or_none()
-                if not user:
+                # Один UPDATE вместо SELECT пользователя и отдельного UPDATE при flush
+                result = await session.execute(
+                    _UPDATE_USER_PRODUCT, {"user_id": user_id, "product_id": product_id}
+                )
+                if result.scalar_one_or_none() is None:
                     raise ValueError(f"User with id {user_id} not found")
-                user.curr_product_id = product_id
                 await session.commit()
             except Exception as e:
                 await session.rollback()
                 raise ValueError(f"Error updating user product: {e}")
+
+    async def get_user_favorites(self, user_id: UUID, limit: int) -> List[UUID]:
+        """id продуктов, которые пользователь выбирал, самые частые первыми."""
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(_USER_FAVORITES, {"user_id": user_id, "limit": limit})
+                return list(result.scalars().all())
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting favorites of user {user_id}: {e}")
+
+    async def get_product_catalog(self) -> List[Row]:
+        """
+        id, name, calories, protein всех продуктов с калорийностью больше 0.
+        Читается своей сессией (с реплики, если она есть), а не в unit of
+        work: каталог — общий снимок процесса, и тяжёлое чтение не должно
+        идти в транзакции чужой команды.
+        """
+        session_maker = db_session.get_replica_session_maker() or db_session.async_session_maker
+        async with session_maker() as session:
+            try:
+                result = await session.execute(_PRODUCT_CATALOG)
+                return list(result.all())
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error loading product catalog: {e}")
+
+    async def get_food_cache_many(self, keys: List[str]) -> List[FoodCache]:
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(_FOOD_CACHE_BY_KEYS, {"keys": keys})
+                return list(result.scalars().all())
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting food cache entries: {e}")
+
+    async def save_food_cache(self, key: str, food: Optional[CaloriesResponse]) -> None:
+        values = {"key": key, "found": food is not None}
+        if food is not None:
+            values.update(food.model_dump())
+        async with self.get_session() as session:
+            try:
+                stmt = insert(FoodCache).values(**values, updated_at=func.now())
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FoodCache.key],
+                    set_={
+                        **{column: stmt.excluded[column] for column in values if column != "key"},
+                        "updated_at": func.now(),
+                    },
+                )
+                # Запись в кэш необязательна: при ошибке откатывается только
+                # savepoint, а не вся транзакция unit of work вокруг
+                async with session.begin_nested():
+                    await session.execute(stmt)
+                await session.commit()
+            except Exception as e:
+                raise ValueError(f"Error saving food cache entry {key}: {e}")
+
+    async def ensure_activity_partitions(self, months: Iterable[date]) -> None:
+        """
+        Создаёт помесячные секции activity_samples (границы в UTC) для
+        первых чисел месяцев months. DDL идёт отдельной транзакцией, а не в
+        unit of work: блокировка родительской таблицы не должна жить до
+        конца чужого запроса.
+        """
+        async with db_session.get_engine().begin() as conn:
+            for month in sorted(set(months)):
+                upper = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+                name = f"activity_samples_y{month.year}m{month.month:02d}"
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF activity_samples "
+                            f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{upper.isoformat()} 00:00+00')"
+                        ))
+                except Exception as e:
+                    # Параллельный процесс мог создать ту же секцию между проверкой и CREATE
+                    exists = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+                    if not exists:
+                        raise ValueError(f"Error creating activity partition {name}: {e}")
+
+    async def add_activity_samples(self, samples: List[ActivitySampleForm], timezone: str) -> Tuple[int, int]:
+        """
+        Вставляет пачку сэмплов и обновляет дневные суммы (сутки в timezone).
+        Секции под месяцы пачки должны уже существовать. Возвращает число
+        новых сэмплов и затронутых дней.
+        """
+        if not samples:
+            return 0, 0
+        params = {
+            "chat_ids": [sample.chat_id for sample in samples],
+            "started_at": [sample.started_at for sample in samples],
+            "calories": [sample.calories for sample in samples],
+            "tz": timezone,
+        }
+        async with self.get_session() as session:
+            try:
+                row = (await session.execute(_INSERT_ACTIVITY, params)).one()
+                await session.commit()
+                return row[0], row[1]
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error saving {len(samples)} activity samples: {e}")
+
+    async def get_activity_total(self, user_id: UUID, since: date) -> Tuple[float, int]:
+        """Сумма калорий из activity_daily с дня since включительно и число дней с данными."""
+        async with self.get_read_session() as session:
+            try:
+                result = await session.execute(_ACTIVITY_TOTAL, {"user_id": user_id, "since": since})
+                calories, days = result.one()
+                return float(calories), days
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error getting activity of user {user_id}: {e}")
+
+    async def set_user_notify(self, user_id: UUID, enabled: bool) -> None:
+        async with self.get_session() as session:
+            try:
+                result = await session.execute(_SET_USER_NOTIFY, {"user_id": user_id, "enabled": enabled})
+                if result.scalar_one_or_none() is None:
+                    raise ValueError(f"User with id {user_id} not found")
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error updating notifications of user {user_id}: {e}")
+
+    @asynccontextmanager
+    async def advisory_lock(self, key: int, subkey: int) -> AsyncGenerator[bool, None]:
+        """
+        Сессионная advisory-блокировка без ожидания: True, если получена.
+        Держит отдельное соединение пула до выхода из блока.
+        """
+        async with db_session.get_engine().connect() as conn:
+            acquired = await conn.scalar(select(func.pg_try_advisory_lock(key, subkey)))
+            await conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.scalar(select(func.pg_advisory_unlock(key, subkey)))
+                    await conn.commit()
+
+    async def prepare_digests(self, day: date, shard: int, shards: int) -> int:
+        """
+        Создаёт строки сводок за day для подписчиков шарда одним запросом.
+        Уже созданные не трогает; подписчиков без данных трекера за day пропускает.
+        """
+        params = {"day": day, "shard": shard, "shards": shards}
+        async with self.get_session() as session:
+            try:
+                result = await session.execute(_PREPARE_DIGESTS, params)
+                await session.commit()
+                return result.rowcount
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error preparing digests for {day}, shard {shard}: {e}")
+
+    async def reset_stale_digests(self, day: date, shard: int) -> int:
+        """sending от упавшего процесса -> unknown; вызывать только под блокировкой шарда."""
+        async with self.get_session() as session:
+            try:
+                result = await session.execute(_RESET_STALE_DIGESTS, {"day": day, "shard": shard})
+                await session.commit()
+                return result.rowcount
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error resetting stale digests for {day}, shard {shard}: {e}")
+
+    async def claim_digests(self, day: date, shard: int, limit: int) -> List[Row]:
+        """Переводит до limit сводок из pending в sending и возвращает их."""
+        async with self.get_session() as session:
+            try:
+                result = await session.execute(_CLAIM_DIGESTS, {"day": day, "shard": shard, "limit": limit})
+                rows = list(result.all())
+                await session.commit()
+                return rows
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error claiming digests for {day}, shard {shard}: {e}")
+
+    async def finish_digests(self, day: date, statuses: Dict[UUID, str]) -> None:
+        if not statuses:
+            return
+        params = {"day": day, "user_ids": list(statuses), "statuses": list(statuses.values())}
+        async with self.get_session() as session:
+            try:
+                await session.execute(_FINISH_DIGESTS, params)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                raise ValueError(f"Error saving digest results for {day}: {e}")
@@ -0,0 +1,70 @@
+import re
+from typing import Dict, List
+
+_PUNCTUATION = re.compile(r"[^\w\s%-]+")
+
+# Русские названия популярных продуктов -> английские, как их знает FatSecret.
+# Ключи и значения уже нормализованы (см. normalize_food_name).
+FOOD_ALIASES: Dict[str, str] = {
+    "пиво": "beer",
+    "вино": "wine",
+    "водка": "vodka",
+    "сидр": "cider",
+    "кофе": "coffee",
+    "латте": "latte",
+    "капучино": "cappuccino",
+    "чай": "tea",
+    "сок": "juice",
+    "кола": "cola",
+    "молоко": "milk",
+    "кефир": "kefir",
+    "йогурт": "yogurt",
+    "сыр": "cheese",
+    "творог": "cottage cheese",
+    "яйцо": "egg",
+    "хлеб": "bread",
+    "рис": "rice",
+    "гречка": "buckwheat",
+    "овсянка": "oatmeal",
+    "макароны": "pasta",
+    "картошка": "potato",
+    "картофель": "potato",
+    "картошка фри": "french fries",
+    "курица": "chicken",
+    "говядина": "beef",
+    "свинина": "pork",
+    "рыба": "fish",
+    "лосось": "salmon",
+    "пицца": "pizza",
+    "бургер": "burger",
+    "шаурма": "shawarma",
+    "пельмени": "pelmeni",
+    "суши": "sushi",
+    "яблоко": "apple",
+    "банан": "banana",
+    "апельсин": "orange",
+    "шоколад": "chocolate",
+    "мороженое": "ice cream",
+    "пончик": "donut",
+    "печенье": "cookie",
+    "орехи": "nuts",
+    "чипсы": "chips",
+}
+
+
+def normalize_food_name(food_name: str) -> str:
+    """Регистр, «ё», пунктуация и лишние пробелы не влияют на ключ поиска."""
+    name = food_name.casefold().replace("ё", "е")
+    name = _PUNCTUATION.sub(" ", name)
+    return " ".join(name.split())
+
+
+def food_name_variants(key: str) -> List[str]:
+    """Нормализованный ключ и его перевод из FOOD_ALIASES, если он есть."""
+    alias = FOOD_ALIASES.get(key)
+    return [key, alias] if alias else [key]
+
+
+def upstream_query(key: str) -> str:
+    """Что отправлять в FatSecret: база англоязычная, поэтому алиас приоритетнее."""
+    return FOOD_ALIASES.get(key, key)
@@ -0,0 +1,133 @@
+"""
+Настройка логирования для API, бота и утилит.
+
+Вызывающий поток только кладёт запись в очередь (QueueHandler); форматирование
+в JSON/текст и запись в stdout делает отдельный поток QueueListener, так что
+медленный вывод не блокирует event loop. Шумные логгеры (например, httpx,
+который пишет каждый getUpdates) можно прореживать через LOG_SAMPLING.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Стандартные атрибуты LogRecord: всё остальное пришло через extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra= попадают в объект как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей уровня ниже WARNING от указанных логгеров
+    (и их потомков). Предупреждения и ошибки не прореживаются никогда.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> float:
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return rate
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Стандартный QueueHandler.prepare() прогоняет запись через форматтер в
+    вызывающем потоке. Здесь подставляются только аргументы сообщения и текст
+    исключения, а JSON/время/шаблон собирает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    """'httpx=0.01,uvicorn.access=0.1' -> {'httpx': 0.01, 'uvicorn.access': 0.1}"""
+    rates: Dict[str, float] = {}
+    for pair in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = pair.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging() -> None:
+    """Идемпотентна: повторный вызов (бот внутри API) ничего не меняет."""
+    global _listener
+    if _listener is not None:
+        return
+    settings = get_settings()
+
+    stream = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = _DeferredQueueHandler(queue.SimpleQueue())
+    # Прореживаем до постановки в очередь: отброшенная запись почти ничего не стоит
+    handler.addFilter(SamplingFilter(_parse_sampling(settings.LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
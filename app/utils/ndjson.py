@@ -0,0 +1,35 @@
+from typing import AsyncIterator, Optional, Tuple
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Номер строки и её байты по мере чтения потока: в памяти не больше одной
+    строки. Строка длиннее max_line_bytes отдаётся как None, остаток её
+    до перевода строки пропускается.
+    """
+    buffer = bytearray()
+    line_no = 0
+    too_long = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not too_long:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        too_long = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if not too_long:
+                buffer += chunk[start:end]
+                too_long = len(buffer) > max_line_bytes
+            yield line_no, None if too_long else bytes(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+    if buffer or too_long:
+        yield line_no + 1, None if too_long else bytes(buffer)
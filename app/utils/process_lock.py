@@ -0,0 +1,41 @@
+import fcntl
+import os
+from typing import Optional, TextIO
+
+
+class ProcessLock:
+    """
+    Эксклюзивная файловая блокировка (flock) на одном хосте. Держит её
+    ровно один процесс; ОС снимает её сама, если процесс упал.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[TextIO] = None
+
+    @property
+    def acquired(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Не ждёт: False, если блокировку уже держит другой процесс."""
+        if self._file is not None:
+            return True
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.truncate(0)
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
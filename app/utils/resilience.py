@@ -0,0 +1,196 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+
+class UpstreamUnavailable(Exception):
+    """Внешний сервис временно недоступен: запрос даже не отправлялся."""
+
+
+class RateLimitExceeded(UpstreamUnavailable):
+    pass
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: rate токенов в секунду, не больше
+    capacity про запас. Если токен освободится позже чем через max_wait
+    секунд, запрос не ждёт, а сразу получает RateLimitExceeded.
+
+    Состояние защищено threading.Lock и не привязано к event loop,
+    поэтому один экземпляр можно делить между ботом и FastAPI.
+    """
+
+    def __init__(self, rate: float, capacity: int, max_wait: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+
+    def _reserve(self) -> float:
+        """Резервирует токен и возвращает, сколько нужно подождать."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"Превышен лимит запросов ({self.rate:g}/с), повторите позже"
+                )
+            # Токен может уйти в минус: это очередь уже зарезервированных запросов
+            self._tokens -= 1
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.wait_time_total += wait
+            return wait
+
+    async def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tokens = min(
+                self.capacity,
+                self._tokens + (time.monotonic() - self._updated) * self.rate,
+            )
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": tokens,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "wait_time_total": self.wait_time_total,
+        }
+
+
+class CircuitBreaker:
+    """
+    Размыкается, когда доля ошибок среди последних window вызовов достигает
+    failure_rate (при минимум min_calls вызовах). В разомкнутом состоянии
+    вызовы сразу получают CircuitOpenError; через reset_timeout секунд
+    пропускается один пробный вызов (half_open): успех замыкает цепь,
+    ошибка снова размыкает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        reset_timeout: float,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {}
+
+    def _transition(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._probe_in_flight = False
+
+    def allow(self) -> None:
+        """Бросает CircuitOpenError, если вызов сейчас делать нельзя."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at >= self.reset_timeout:
+                    self._transition(self.HALF_OPEN)
+                else:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} временно недоступен, повторите позже")
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} временно недоступен, повторите позже")
+                self._probe_in_flight = True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._transition(self.CLOSED if success else self.OPEN)
+                return
+            if self.state == self.OPEN:
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._transition(self.OPEN)
+
+    def release(self) -> None:
+        """Вызов отменён и исход неизвестен: освобождает место пробного вызова."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failure_rate": self._outcomes.count(False) / calls if calls else 0.0,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+
+async def retry_with_backoff(
+    fn: Callable[[], Awaitable[Any]],
+    attempts: int,
+    base_delay: float,
+    max_delay: float,
+    retry_if: Callable[[Exception], bool],
+    on_retry: Callable[[Exception], None] = lambda e: None,
+) -> Any:
+    """
+    Повторяет fn, пока retry_if считает ошибку временной, с экспоненциальной
+    задержкой и полным джиттером: пауза случайна в [0, min(max_delay, base_delay * 2**n)],
+    чтобы клиенты после сбоя не возвращались одновременно.
+    """
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not retry_if(e):
+                raise
+            on_retry(e)
+            await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
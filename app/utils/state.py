@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.utils.cache import TTLCache
+
+
+class KeyValueStore(ABC):
+    """
+    Состояние, которое в многопроцессном режиме может понадобиться
+    разделять между воркерами: кэши пользователей и КБЖУ.
+    Ключи — строки, методы асинхронные, чтобы за интерфейсом можно было
+    поставить сетевое хранилище (например, Redis) без правок вызывающего кода.
+    """
+
+    @abstractmethod
+    async def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class LocalStore(KeyValueStore):
+    """Хранилище в памяти процесса: у каждого воркера своё."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return self._cache.get(key, default)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", **self._cache.stats()}
+
+
+def create_store(maxsize: int, ttl: float) -> KeyValueStore:
+    backend = get_settings().STATE_BACKEND
+    if backend == "local":
+        return LocalStore(maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -0,0 +1,191 @@
+"""
+Одна сессия и одна транзакция на команду бота или HTTP-запрос.
+
+Обработчик открывает `async with unit_of_work():`, и все методы Database,
+вызванные внутри (в том числе из дочерних задач), работают через одну
+AsyncSession. Их собственные commit() превращаются во flush(), а настоящий
+COMMIT выполняется один раз при выходе из блока. Сессия создаётся лениво:
+блок, не дошедший до БД, соединение из пула не берёт. Сетевые вызовы
+внутри блока оборачиваются в outside_unit_of_work(): соединение не должно
+держать транзакцию, пока ждём внешний сервис.
+
+actor (chat_id) нужен для read-your-writes при чтении с реплики: после
+записи чтения того же actor ещё DB_REPLICA_STICKY_SECONDS идут на primary.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Hashable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database.connection import session as db_session
+from app.utils.metrics import registry
+from app.utils.state import KeyValueStore, create_store
+
+UNITS = registry.counter(
+    "db_units_of_work_total", "Завершённые unit of work по исходу", ("outcome",)
+)
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+# actor -> недавно писал; создаётся при первом обращении
+_recent_writers: Optional[KeyValueStore] = None
+
+
+def _get_recent_writers() -> KeyValueStore:
+    global _recent_writers
+    if _recent_writers is None:
+        settings = get_settings()
+        _recent_writers = create_store(
+            maxsize=settings.USER_CACHE_SIZE,
+            ttl=settings.DB_REPLICA_STICKY_SECONDS,
+        )
+    return _recent_writers
+
+
+class _SharedSession:
+    """
+    Сессия unit of work в руках метода Database: commit() только отправляет
+    изменения (flush), close() ничего не делает. rollback() откатывает всю
+    транзакцию — после ошибки в PostgreSQL её всё равно не продолжить.
+    """
+
+    def __init__(self, session: AsyncSession, uow: "UnitOfWork"):
+        self._session = session
+        self._uow = uow
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        self._uow.wrote = True
+        await self._session.flush()
+
+    async def close(self) -> None:
+        pass
+
+
+class UnitOfWork:
+    def __init__(self, actor: Optional[Hashable] = None):
+        self.actor = actor
+        self.wrote = False
+        self._session: Optional[AsyncSession] = None
+        # AsyncSession нельзя использовать из нескольких задач одновременно
+        self._lock = asyncio.Lock()
+        self._holder: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @asynccontextmanager
+    async def session(self) -> AsyncGenerator[Optional[_SharedSession], None]:
+        """None, если блок уже завершён (например, фоновая задача его пережила)."""
+        task = asyncio.current_task()
+        if self._holder is task:
+            # Метод Database, вызванный из другого метода той же задачи
+            yield _SharedSession(self._session, self)
+            return
+        async with self._lock:
+            if self.closed:
+                yield None
+                return
+            if self._session is None:
+                self._session = db_session.async_session_maker()
+            self._holder = task
+            try:
+                yield _SharedSession(self._session, self)
+            finally:
+                self._holder = None
+
+    async def finish(self, commit: bool) -> None:
+        async with self._lock:
+            self.closed = True
+            await self._end(commit)
+
+    async def release(self) -> None:
+        """
+        COMMIT того, что сделано до сих пор, и возврат соединения в пул.
+        Следующий вызов Database внутри блока начнёт новую транзакцию.
+        """
+        async with self._lock:
+            await self._end(commit=True)
+
+    async def _end(self, commit: bool) -> None:
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        try:
+            if commit:
+                await session.commit()
+                UNITS.inc(outcome="commit")
+                if self.wrote and self.actor is not None:
+                    await _get_recent_writers().set(str(self.actor), True)
+            else:
+                await session.rollback()
+                UNITS.inc(outcome="rollback")
+        except Exception as e:
+            await session.rollback()
+            UNITS.inc(outcome="error")
+            raise ValueError(f"Error committing unit of work: {e}")
+        finally:
+            await session.close()
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    uow = _current.get()
+    return uow if uow is not None and not uow.closed else None
+
+
+async def reads_need_primary() -> bool:
+    """
+    Читать ли с primary: текущий unit of work уже писал (его изменения
+    видны только в его транзакции) или его actor недавно писал и реплика
+    могла не догнать.
+    """
+    uow = current_unit_of_work()
+    if uow is None:
+        return False
+    if uow.wrote:
+        return True
+    return uow.actor is not None and await _get_recent_writers().get(str(uow.actor), False)
+
+
+@asynccontextmanager
+async def unit_of_work(actor: Optional[Hashable] = None) -> AsyncGenerator[UnitOfWork, None]:
+    """Вложенный блок присоединяется к внешнему и ничего не коммитит сам."""
+    outer = current_unit_of_work()
+    if outer is not None:
+        yield outer
+        return
+    uow = UnitOfWork(actor)
+    token = _current.set(uow)
+    try:
+        try:
+            yield uow
+        except BaseException:
+            await uow.finish(commit=False)
+            raise
+        await uow.finish(commit=True)
+    finally:
+        _current.reset(token)
+
+
+@asynccontextmanager
+async def outside_unit_of_work() -> AsyncGenerator[None, None]:
+    """
+    Для сетевых вызовов посреди команды (FatSecret с его таймаутами и
+    повторами): транзакция unit of work фиксируется и соединение уходит
+    в пул, а не простаивает в открытой транзакции, пока ждём ответа.
+    Внутри блока (и в задачах, созданных в нём) методы Database работают
+    своими короткими сессиями; после блока unit of work продолжается
+    новой транзакцией.
+    """
+    uow = current_unit_of_work()
+    if uow is None:
+        yield
+        return
+    await uow.release()
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
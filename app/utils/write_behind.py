@@ -0,0 +1,171 @@
+"""
+Буфер отложенной записи: вызывающий кладёт записи в память и сразу
+возвращается, фоновая задача пишет их в БД крупными пачками — когда
+набралось batch_size записей или прошло interval секунд.
+
+Буфер ограничен max_items: если запись не успевает, put_many ждёт места
+не дольше put_timeout и затем бросает BufferFull. Пока HTTP-обработчик
+ждёт, он не читает тело запроса, так что давление доходит и до клиента
+через TCP. Записи, принятые в буфер, но не записанные до падения процесса,
+теряются; при штатной остановке stop() дописывает всё.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Generic, List, Optional, TypeVar
+
+from app.utils.metrics import registry
+from app.utils.resilience import retry_with_backoff
+
+log = logging.getLogger("write-behind")
+
+T = TypeVar("T")
+
+FLUSH_DURATION = registry.histogram(
+    "write_behind_flush_duration_seconds", "Запись одной пачки буфера", ("buffer",)
+)
+FLUSH_SIZE = registry.histogram(
+    "write_behind_flush_size", "Записей в пачке буфера", ("buffer",),
+    buckets=(10, 100, 500, 1000, 2500, 5000, 10000, 25000, 50000),
+)
+
+
+class BufferFull(Exception):
+    """Буфер не освободился за put_timeout: запись не принята."""
+
+
+class WriteBehindBuffer(Generic[T]):
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[List[T]], Awaitable[Any]],
+        max_items: int,
+        batch_size: int,
+        interval: float,
+        put_timeout: float,
+        attempts: int = 3,
+        retry_if: Callable[[Exception], bool] = lambda e: False,
+    ):
+        self.name = name
+        self._write = write
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self.attempts = attempts
+        # Повторять стоит только временные сбои: ошибку в данных или в коде
+        # повтор не исправит, а пачка всё равно будет потеряна
+        self.retry_if = retry_if
+        self._items: Deque[T] = deque()
+        # Создаются в start(): в Python 3.9 примитивы asyncio привязываются к циклу
+        self._space: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.flush_retries = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def start(self) -> None:
+        """Идемпотентен; put_many вызывает его сам при первой записи."""
+        if self._task is not None and not self._task.done():
+            return
+        self._space = asyncio.Event()
+        self._space.set()
+        self._ready = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Дописывает всё, что осталось в буфере, и останавливает фоновую задачу."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._ready.set()
+        await self._task
+        self._task = None
+
+    async def put_many(self, items: List[T]) -> None:
+        if not items:
+            return
+        self.start()
+        deadline = time.monotonic() + self.put_timeout
+        # Пачку больше max_items принимаем в пустой буфер, иначе она не влезет никогда
+        while self._items and len(self._items) + len(items) > self.max_items:
+            self._space.clear()
+            self.backpressure_waits += 1
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                self.rejected += len(items)
+                raise BufferFull(f"Буфер {self.name} заполнен, повторите позже")
+        self._items.extend(items)
+        self.accepted += len(items)
+        if len(self._items) >= self.batch_size:
+            self._ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            # И по таймеру, и по заполнению пишем всё накопленное
+            while self._items:
+                count = min(self.batch_size, len(self._items))
+                batch = [self._items.popleft() for _ in range(count)]
+                self._space.set()
+                await self._flush(batch)
+            if self._stopping:
+                return
+
+    async def _flush(self, batch: List[T]) -> None:
+        started = time.perf_counter()
+
+        def on_retry(e: Exception) -> None:
+            self.flush_retries += 1
+            log.warning("Повтор записи пачки %s (%d записей): %s", self.name, len(batch), e)
+
+        try:
+            await retry_with_backoff(
+                lambda: self._write(batch),
+                attempts=self.attempts,
+                base_delay=0.5,
+                max_delay=5.0,
+                retry_if=self.retry_if,
+                on_retry=on_retry,
+            )
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            log.error("Пачка %s (%d записей) потеряна: %s", self.name, len(batch), e)
+        finally:
+            self.batches += 1
+            FLUSH_DURATION.observe(time.perf_counter() - started, buffer=self.name)
+            FLUSH_SIZE.observe(len(batch), buffer=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._items),
+            "max_items": self.max_items,
+            "batch_size": self.batch_size,
+            "accepted": self.accepted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "flush_retries": self.flush_retries,
+        }
@@ -0,0 +1,84 @@
+"""
+/product_count за days суток: сумма по activity_daily против сканирования
+сырых activity_samples за тот же период.
+
+Сначала нужны данные (например, 50 пользователей за год по 15 минут —
+~1.75 млн сэмплов):
+    poetry run generate-activity --users 50 --days 365 --db
+Запуск:
+    PYTHONPATH=. python benchmarks/activity_rollups.py --users 50 --days 365
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, time as dtime
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, select
+
+from app.activity_generator import chat_ids
+from app.activity_service import ActivityService
+from app.database.connection.session import async_session_maker
+from app.database.models import ActivitySample, User
+from app.utils import database as db_module
+
+_RAW_TOTAL = select(func.sum(ActivitySample.calories), func.count()).where(
+    ActivitySample.user_id == bindparam("user_id"),
+    ActivitySample.started_at >= bindparam("since"),
+)
+
+
+async def _user_ids(users: int) -> List[UUID]:
+    async with async_session_maker() as session:
+        result = await session.execute(select(User.id).where(User.chat_id.in_(chat_ids(users))))
+        return list(result.scalars().all())
+
+
+async def bench(users: int, days: int, rounds: int) -> None:
+    service = ActivityService()
+    user_ids = await _user_ids(users)
+    if not user_ids:
+        raise SystemExit("Нет синтетических пользователей: сначала generate-activity --db")
+    since_day = service.first_day(days)
+    since = datetime.combine(since_day, dtime.min, tzinfo=service.zone)
+
+    async with async_session_maker() as session:
+        rows = {"rollup": 0, "raw": 0}
+        timings = {"rollup": 0.0, "raw": 0.0}
+        for _ in range(rounds):
+            for user_id in user_ids:
+                started = time.perf_counter()
+                _, n = (await session.execute(
+                    db_module._ACTIVITY_TOTAL, {"user_id": user_id, "since": since_day}
+                )).one()
+                timings["rollup"] += time.perf_counter() - started
+                rows["rollup"] += n
+
+                started = time.perf_counter()
+                _, n = (await session.execute(_RAW_TOTAL, {"user_id": user_id, "since": since})).one()
+                timings["raw"] += time.perf_counter() - started
+                rows["raw"] += n
+        await session.rollback()
+
+    calls = rounds * len(user_ids)
+    print(f"{len(user_ids)} пользователей, days={days}, запросов на вариант: {calls}")
+    print(f"{'variant':10} {'rows/query':>12} {'ms/query':>10}")
+    for variant in ("raw", "rollup"):
+        print(f"{variant:10} {rows[variant] / calls:12.0f} {timings[variant] / calls * 1000:10.2f}")
+    print(f"speedup: {timings['raw'] / timings['rollup']:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Чтение дневных сумм против сырых сэмплов")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(bench(args.users, args.days, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
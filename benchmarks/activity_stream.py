@@ -0,0 +1,78 @@
+"""
+Пропускная способность POST /activity/stream на одном воркере: NDJSON
+от генератора уходит в приложение кусками по 64 КБ (ASGI без сети),
+замеряется приём в буфер и запись всего принятого в БД.
+
+Нужна БД из .env с применёнными миграциями; пользователи synthetic-N
+создаются сами. Запуск:
+    PYTHONPATH=. python benchmarks/activity_stream.py --users 50 --days 30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator
+
+import httpx
+
+from app.activity_generator import chat_ids, generate_samples
+from app.utils.database import Database
+
+CHUNK_BYTES = 64 * 1024
+
+
+def _ndjson(users: int, days: int, interval: int, seed: int) -> bytes:
+    lines = [
+        json.dumps({"chat_id": s.chat_id, "started_at": s.started_at.isoformat(), "calories": s.calories})
+        for s in generate_samples(users, days, interval, seed)
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def _body(data: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), CHUNK_BYTES):
+        yield data[start:start + CHUNK_BYTES]
+
+
+async def bench(users: int, days: int, interval: int, seed: int) -> None:
+    from app.main import app, handlers
+
+    db = Database()
+    for chat_id in chat_ids(users):
+        await db.get_or_create_user_id(chat_id)
+    data = _ndjson(users, days, interval, seed)
+    buffer = handlers.service.activity.buffer
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/activity/stream", content=_body(data), headers={"content-type": "application/x-ndjson"}
+        )
+        accepted_in = time.perf_counter() - started
+        await buffer.stop()
+        written_in = time.perf_counter() - started
+
+    result = response.json()
+    print(f"HTTP {response.status_code}, {len(data) / 1e6:.1f} МБ, строк {result['received']}")
+    print(f"принято в буфер: {result['accepted']} за {accepted_in:.2f} с ({result['accepted'] / accepted_in:,.0f}/с)")
+    stats = buffer.stats()
+    print(f"записано в БД:   {stats['written']} за {written_in:.2f} с ({stats['written'] / written_in:,.0f}/с), "
+          f"пачек {stats['batches']}, ожиданий места {stats['backpressure_waits']}")
+    print(f"новых сэмплов:   {handlers.service.activity.samples_inserted}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузка на POST /activity/stream")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=1, help="Другой seed — те же интервалы, другие калории")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(bench(args.users, args.days, args.interval, args.seed))
+
+
+if __name__ == "__main__":
+    main()
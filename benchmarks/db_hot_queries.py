@@ -0,0 +1,105 @@
+"""
+Микробенчмарк горячих запросов Database: как было (select() собирается на
+каждом вызове, списки через IN) и как стало (готовые statements из
+app/utils/database.py, списки через = ANY).
+
+Две части:
+  * cpu  — только сборка запроса и ключа кэша компиляции, без БД;
+  * db   — полный вызов session.execute на одном соединении.
+
+Запуск (нужна БД из .env с применёнными миграциями):
+    PYTHONPATH=. python benchmarks/db_hot_queries.py --iterations 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import select
+
+from app.database.connection.session import async_session_maker
+from app.database.models import FoodCache, Product, User
+from app.utils import database as db_module
+
+NAMES = ["pizza", "beer", "chicken", "apple", "bread"]
+
+
+def _before(name: str, chat_id: str, names: List[str]) -> Dict[str, Any]:
+    return {
+        "get_product_by_name": (select(Product).where(Product.name == name), None),
+        "get_user_by_chat_id": (select(User).where(User.chat_id == chat_id), None),
+        "get_products_by_normalized_names": (select(Product).where(Product.normalized_name.in_(names)), None),
+        "get_food_cache_many": (select(FoodCache).where(FoodCache.key.in_(names)), None),
+    }
+
+
+def _after(name: str, chat_id: str, names: List[str]) -> Dict[str, Any]:
+    return {
+        "get_product_by_name": (db_module._PRODUCT_BY_NAME, {"name": name}),
+        "get_user_by_chat_id": (db_module._USER_BY_CHAT_ID, {"chat_id": chat_id}),
+        "get_products_by_normalized_names": (db_module._PRODUCTS_BY_NORMALIZED_NAMES, {"names": names}),
+        "get_food_cache_many": (db_module._FOOD_CACHE_BY_KEYS, {"keys": names}),
+    }
+
+
+def _args(i: int) -> Tuple[str, str, List[str]]:
+    # Разная длина списка на каждой итерации, как в реальных пачках
+    return "Pizza", "bench-chat", NAMES[: 1 + i % len(NAMES)]
+
+
+def bench_cpu(iterations: int) -> Dict[str, Tuple[float, float]]:
+    results = {}
+    for query in _before(*_args(0)):
+        timings = []
+        for build in (_before, _after):
+            started = time.perf_counter()
+            for i in range(iterations):
+                stmt, _ = build(*_args(i))[query]
+                stmt._generate_cache_key()
+            timings.append((time.perf_counter() - started) / iterations * 1e6)
+        results[query] = (timings[0], timings[1])
+    return results
+
+
+async def bench_db(iterations: int) -> Dict[str, Tuple[float, float]]:
+    results = {}
+    async with async_session_maker() as session:
+        async def run(build: Callable, query: str, n: int) -> float:
+            started = time.perf_counter()
+            for i in range(n):
+                stmt, params = build(*_args(i))[query]
+                result = await session.execute(stmt, params) if params else await session.execute(stmt)
+                result.scalars().all()
+            return (time.perf_counter() - started) / n * 1e6
+
+        for query in _before(*_args(0)):
+            # Прогрев: заполняем кэш компиляции и prepared statements asyncpg
+            await run(_before, query, 50)
+            await run(_after, query, 50)
+            results[query] = (await run(_before, query, iterations), await run(_after, query, iterations))
+        await session.rollback()
+    return results
+
+
+def _report(title: str, results: Dict[str, Tuple[float, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'query':36} {'before, µs':>12} {'after, µs':>12} {'speedup':>8}")
+    for query, (before, after) in results.items():
+        print(f"{query:36} {before:12.1f} {after:12.1f} {before / after:7.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Накладные расходы горячих запросов Database")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--cpu-only", action="store_true", help="Без обращения к БД")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    _report("cpu: сборка запроса + ключ кэша компиляции", bench_cpu(args.iterations * 5))
+    if not args.cpu_only:
+        _report("db: session.execute на одном соединении", asyncio.run(bench_db(args.iterations)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+/suggest: ранжирование всего каталога массивами NumPy против цикла Python
+по тем же продуктам.
+
+БД не нужна: каталог синтетический, того же вида, что собирает
+SuggestService (калорийность 1..900, у части продуктов белок неизвестен).
+Запуск:
+    PYTHONPATH=. python benchmarks/suggest_ranking.py --products 100000
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from app.suggest_service import SORTS, ProductCatalog
+
+MAX_GRAMS = 2000.0
+
+
+def build_catalog(products: int, seed: int) -> ProductCatalog:
+    rng = np.random.default_rng(seed)
+    calories = rng.integers(1, 900, size=products).astype(np.float32)
+    protein = rng.uniform(0, 40, size=products).astype(np.float32)
+    protein[rng.random(products) < 0.2] = np.nan
+    return ProductCatalog(
+        ids=[uuid.UUID(int=i) for i in range(products)],
+        names=[f"product {i}" for i in range(products)],
+        calories=calories,
+        protein=protein,
+    )
+
+
+def rank_python(catalog: ProductCatalog, calories_burned: float, sort: str, limit: int) -> List[int]:
+    """То же, что ProductCatalog.rank без избранного, но по одному продукту за шаг."""
+    calories = catalog.calories.tolist()
+    protein = catalog.protein.tolist()
+    scored: List[Tuple[float, int]] = []
+    for i, product_calories in enumerate(calories):
+        grams = calories_burned * 100.0 / product_calories
+        if grams > MAX_GRAMS:
+            continue
+        if sort == "protein":
+            if math.isnan(protein[i]) or protein[i] <= 0:
+                continue
+            scored.append((grams * protein[i] / 100, i))
+        else:
+            scored.append((grams, i))
+    return [i for _, i in heapq.nlargest(limit, scored)]
+
+
+def timeit(fn: Callable[[], object], rounds: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ранжирование каталога для /suggest")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.products, args.seed)
+    favorites = [catalog.ids[i] for i in random.Random(args.seed).sample(range(args.products), 20)]
+    burned = 1500.0
+    print(f"{len(catalog)} продуктов, массивы {catalog.nbytes / 1024:.0f} КиБ, limit={args.limit}")
+    print(f"{'sort':10} {'numpy ms':>10} {'python ms':>10} {'speedup':>8}")
+    for sort in SORTS:
+        numpy_ms = timeit(
+            lambda: catalog.rank(burned, sort, args.limit, MAX_GRAMS, favorites=favorites), args.rounds
+        )
+        if sort == "favorites":
+            print(f"{sort:10} {numpy_ms:10.2f} {'-':>10} {'-':>8}")
+            continue
+        python_ms = timeit(lambda: rank_python(catalog, burned, sort, args.limit), max(1, args.rounds // 10))
+        print(f"{sort:10} {numpy_ms:10.2f} {python_ms:10.2f} {python_ms / numpy_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
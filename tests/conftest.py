@@ -0,0 +1,22 @@
+import os
+
+# Настройки без .env: обязательные поля и лимиты Telegram, не тормозящие тесты.
+# Задаются до первого get_settings().
+for name, value in {
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_PASSWORD": "test",
+    "TELEGRAM_BOT_TOKEN": "",
+    "BACKEND_HOST": "localhost",
+    "BACKEND_PORT": "8000",
+    "WEBHOOK_URL": "",
+    "SECRET_TOKEN": "",
+    "FATSECRET_CONSUMER_KEY": "",
+    "FATSECRET_CONSUMER_SECRET": "",
+    "TELEGRAM_GLOBAL_RATE": "10000",
+    "TELEGRAM_CHAT_RATE": "10000",
+    "TELEGRAM_CHAT_BURST": "100",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.cache import TTLCache
+
+
+def test_entry_expires_after_ttl():
+    cache = TTLCache(maxsize=10, ttl=0.02)
+    cache.set("beer", 43)
+    assert cache.get("beer") == 43
+    time.sleep(0.03)
+    assert "beer" not in cache
+    assert cache.get("beer", "missing") == "missing"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_per_entry_ttl_overrides_default():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("short", 1, ttl=0.02)
+    cache.set("long", 2)
+    time.sleep(0.03)
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b теперь самый давний
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stored_none_is_a_hit():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("unknown", None)
+    assert "unknown" in cache
+    assert cache.get("unknown", "missing") is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    cache.delete("a")
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        TTLCache(maxsize=0, ttl=60)
+
+
+def test_concurrent_access_from_threads():
+    cache = TTLCache(maxsize=50, ttl=0.001)
+    errors = []
+
+    def worker(offset: int):
+        try:
+            for i in range(2000):
+                key = (offset + i) % 100
+                cache.set(key, i)
+                cache.get(key)
+                key in cache
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n * 25,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(cache) <= 50
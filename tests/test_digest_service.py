@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from typing import Dict
+from uuid import UUID, uuid4
+
+from telegram.error import BadRequest, Forbidden, TimedOut
+
+from app.digest_service import DigestScheduler
+from app.send_queue import BULK, OutboundMessage, OutboundQueue
+
+
+class FakeBot:
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        if chat_id in self.errors:
+            raise self.errors[chat_id]
+        self.sent.append(chat_id)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.finished: Dict[UUID, str] = {}
+
+    async def finish_digests(self, day: date, statuses: Dict[UUID, str]) -> None:
+        self.finished.update(statuses)
+
+
+def make_message(started: bool = False) -> OutboundMessage:
+    message = OutboundMessage("chat", "text", BULK, {})
+    message.started = started
+    return message
+
+
+async def test_status_of_finished_messages():
+    sent, blocked, timed_out, failed, cancelled = (make_message(started=True) for _ in range(5))
+    sent.future.set_result(None)
+    blocked.future.set_exception(Forbidden("bot was blocked by the user"))
+    timed_out.future.set_exception(TimedOut())
+    failed.future.set_exception(BadRequest("chat not found"))
+    cancelled.future.cancel()
+
+    assert DigestScheduler._status(sent) == "sent"
+    assert DigestScheduler._status(blocked) == "blocked"
+    # Запрос ушёл, ответа нет: сводка могла дойти, повторно не шлём
+    assert DigestScheduler._status(timed_out) == "unknown"
+    assert DigestScheduler._status(failed) == "failed"
+    assert DigestScheduler._status(cancelled) == "pending"
+
+
+async def test_status_of_unfinished_messages():
+    waiting = make_message()
+    assert DigestScheduler._status(waiting) == "pending"
+    # Не начатую отправку отменяем, чтобы очередь её не отправила
+    assert waiting.future.cancelled()
+
+    in_flight = make_message(started=True)
+    assert DigestScheduler._status(in_flight) == "unknown"
+    assert not in_flight.future.done()
+
+
+async def test_send_batch_records_status_of_every_row():
+    bot = FakeBot({"blocked": Forbidden("bot was blocked by the user"), "gone": BadRequest("chat not found")})
+    queue = OutboundQueue(bot, workers=2)
+    await queue.start()
+    scheduler = DigestScheduler(queue)
+    scheduler.db = FakeDatabase()
+    rows = [
+        SimpleNamespace(user_id=uuid4(), chat_id=chat_id, calories=500.0, grams=100.0, product_name="Beer")
+        for chat_id in ("ok", "blocked", "gone")
+    ]
+    await scheduler._send_batch(date(2026, 1, 1), rows)
+    await queue.stop()
+
+    assert [scheduler.db.finished[row.user_id] for row in rows] == ["sent", "blocked", "failed"]
+    assert scheduler.statuses == {"sent": 1, "blocked": 1, "failed": 1}
+    assert bot.sent == ["ok"]
+
+
+async def test_due_day_starts_at_digest_hour():
+    scheduler = DigestScheduler(send_queue=None)
+    scheduler.hour = 9
+    assert scheduler.due_day(datetime(2026, 3, 2, 8, 59, tzinfo=timezone.utc)) is None
+    assert scheduler.due_day(datetime(2026, 3, 2, 9, 0, tzinfo=timezone.utc)) == date(2026, 3, 1)
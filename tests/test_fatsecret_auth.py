@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import List
+
+import httpx
+import pytest
+
+from app.fatsecret_auth import TokenManager, TokenUnavailable
+from app.fatsecret_service import FatSecretService
+from app.utils.resilience import UpstreamUnavailable
+
+
+class Fetcher:
+    def __init__(self, expires_in: float, fail: bool = False):
+        self.expires_in = expires_in
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise TokenUnavailable("oauth down")
+        return f"t{self.calls}", self.expires_in
+
+
+async def test_refresh_is_scheduled_margin_before_expiry():
+    fetcher = Fetcher(expires_in=1000)
+    tokens = TokenManager(fetcher, refresh_margin=300)
+    assert await tokens.get_token() == "t1"
+    assert tokens._refresh_at - time.monotonic() == pytest.approx(700, abs=1)
+    # Пока токен свежий, новых запросов нет
+    assert await tokens.get_token() == "t1"
+    assert fetcher.calls == 1
+    await tokens.stop()
+
+
+async def test_short_lived_token_refreshes_at_half_life():
+    tokens = TokenManager(Fetcher(expires_in=100), refresh_margin=300)
+    await tokens.refresh()
+    assert tokens._refresh_at - time.monotonic() == pytest.approx(50, abs=1)
+
+
+async def test_background_refresh_replaces_token_before_expiry():
+    fetcher = Fetcher(expires_in=0.2)
+    tokens = TokenManager(fetcher, refresh_margin=0.15)
+    await tokens.start()
+    await asyncio.sleep(0.25)
+    assert fetcher.calls >= 2
+    assert await tokens.get_token() != "t1"
+    await tokens.stop()
+
+
+async def test_concurrent_requests_share_one_refresh():
+    fetcher = Fetcher(expires_in=1000)
+    tokens = TokenManager(fetcher)
+    assert await asyncio.gather(*(tokens.get_token() for _ in range(5))) == ["t1"] * 5
+    assert fetcher.calls == 1
+    # Токен, который уже заменили, второй раз не обновляется
+    assert await tokens.refresh(stale_token="t0") == "t1"
+    assert await tokens.refresh(stale_token="t1") == "t2"
+    await tokens.stop()
+
+
+async def test_failed_fetch_raises_upstream_unavailable_without_background_loop():
+    fetcher = Fetcher(expires_in=1000, fail=True)
+    tokens = TokenManager(fetcher)
+    await tokens.start()
+    with pytest.raises(UpstreamUnavailable):
+        await tokens.get_token()
+    assert tokens.failures == 2
+    assert tokens._refresh_task is None
+
+
+def make_service(handler) -> FatSecretService:
+    service = FatSecretService()
+    service.client_id, service.client_secret = "id", "secret"
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service._semaphore = asyncio.Semaphore(5)
+    return service
+
+
+async def test_api_401_refreshes_token_and_retries_once():
+    requests: List[str] = []
+    issued = []
+    revoked = {"Bearer t1"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            requests.append("token")
+            issued.append(f"t{len(issued) + 1}")
+            return httpx.Response(200, json={"access_token": issued[-1], "expires_in": 3600})
+        requests.append(request.headers["Authorization"])
+        if request.headers["Authorization"] in revoked:
+            return httpx.Response(401, json={"error": {"message": "invalid token"}})
+        return httpx.Response(200, json={"food": {"food_name": "Apple"}})
+
+    service = make_service(handler)
+    assert (await service.get_food_details("1"))["food_name"] == "Apple"
+    assert requests == ["token", "Bearer t1", "token", "Bearer t2"]
+
+    # Новый токен тоже отвергнут: второго повтора нет
+    requests.clear()
+    revoked.update({"Bearer t2", "Bearer t3"})
+    with pytest.raises(Exception):
+        await service.get_food_details("1")
+    assert requests == ["Bearer t2", "token", "Bearer t3"]
+    await service.aclose()
+
+
+async def test_missing_credentials_fail_fast():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("request must not be sent")
+
+    service = make_service(handler)
+    service.client_id = ""
+    with pytest.raises(TokenUnavailable):
+        await service.tokens.get_token()
+    await service.aclose()
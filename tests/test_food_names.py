@@ -0,0 +1,43 @@
+import pytest
+
+from app.utils.food_names import (
+    FOOD_ALIASES,
+    food_name_variants,
+    normalize_food_name,
+    upstream_query,
+)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("Пиво", "пиво"),
+        ("  Картошка   ФРИ ", "картошка фри"),
+        ("Зелёный чай!", "зеленый чай"),
+        ("Coca-Cola, 0.5", "coca-cola 0 5"),
+        ("Молоко 3,2%", "молоко 3 2%"),
+        ("...", ""),
+        ("", ""),
+    ],
+)
+def test_normalize_food_name(raw, expected):
+    assert normalize_food_name(raw) == expected
+
+
+def test_aliases_are_normalized():
+    for key, alias in FOOD_ALIASES.items():
+        assert normalize_food_name(key) == key
+        assert normalize_food_name(alias) == alias
+
+
+def test_variants_include_alias():
+    assert food_name_variants("пиво") == ["пиво", "beer"]
+    assert food_name_variants("картошка фри") == ["картошка фри", "french fries"]
+    assert food_name_variants("beer") == ["beer"]
+    assert food_name_variants("борщ") == ["борщ"]
+
+
+def test_upstream_query_prefers_english_alias():
+    assert upstream_query("яблоко") == "apple"
+    assert upstream_query("борщ") == "борщ"
+    assert upstream_query(normalize_food_name("Яблоко!")) == "apple"
@@ -0,0 +1,90 @@
+import argparse
+import gzip
+import json
+from typing import List
+
+import pytest
+
+from app import importer
+from app.schemas.product import ProductImportForm
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.batches: List[List[ProductImportForm]] = []
+
+    async def upsert_products(self, products, update_existing: bool = True) -> int:
+        self.batches.append(list(products))
+        return len(products)
+
+
+@pytest.fixture
+def db(monkeypatch) -> FakeDatabase:
+    db = FakeDatabase()
+    monkeypatch.setattr(importer, "Database", lambda: db)
+    return db
+
+
+def test_detect_format():
+    assert importer._detect_format("foods.csv") == "csv"
+    assert importer._detect_format("foods.csv.gz") == "csv"
+    assert importer._detect_format("foods.jsonl.gz") == "jsonl"
+    assert importer._detect_format("foods.ndjson") == "jsonl"
+
+
+def test_parse_columns():
+    columns = importer._parse_columns("name=product_name, calories=energy_kcal_100g")
+    assert columns["name"] == "product_name"
+    assert columns["calories"] == "energy_kcal_100g"
+    assert columns["fat"] == "fat"
+    for spec in ("sugar=sugars", "name=", "name"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            importer._parse_columns(spec)
+
+
+def test_read_csv_rows_with_line_numbers(tmp_path):
+    path = tmp_path / "foods.csv"
+    path.write_text("name;calories\nApple;52\nBread;265\n", encoding="utf-8")
+    rows = list(importer.read_rows(str(path), "csv", delimiter=";"))
+    assert rows == [(2, {"name": "Apple", "calories": "52"}), (3, {"name": "Bread", "calories": "265"})]
+
+
+def test_read_gzipped_jsonl_marks_broken_lines(tmp_path):
+    path = tmp_path / "foods.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "Apple", "calories": 52}) + "\n\n{broken\n[1, 2]\n")
+    rows = list(importer.read_rows(str(path), "jsonl"))
+    assert rows[0] == (1, {"name": "Apple", "calories": 52})
+    assert [line_no for line_no, _ in rows] == [1, 3, 4]
+    assert all("__error__" in record for _, record in rows[1:])
+
+
+async def test_import_validates_and_writes_in_batches(tmp_path, db):
+    path = tmp_path / "foods.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        f.write(
+            "product_name,energy_kcal_100g,protein,fat,carbohydrates\n"
+            "Apple,52.4,\"0,3\",0.2,14\n"
+            "Bread,265,9,3.2,49\n"
+            ",100,,,\n"            # пустое название
+            "Bad <tag>,100,,,\n"   # запрещённые символы
+            "Lard,-5,,,\n"         # отрицательные калории
+            "Rice,130,,,\n"
+        )
+    stats = await importer.import_products(
+        str(path),
+        columns=importer._parse_columns("name=product_name,calories=energy_kcal_100g"),
+        batch_size=2,
+    )
+    assert (stats.read, stats.written, stats.rejected) == (6, 3, 3)
+    assert [len(batch) for batch in db.batches] == [2, 1]
+    apple = db.batches[0][0]
+    assert (apple.name, apple.calories, apple.protein, apple.fat) == ("Apple", 52, 0.3, 0.2)
+    assert db.batches[1][0].protein is None
+
+
+async def test_import_jsonl_rejects_broken_lines(tmp_path, db):
+    path = tmp_path / "foods.jsonl"
+    path.write_text('{"name": "Apple", "calories": 52}\nnot json\n"string"\n', encoding="utf-8")
+    stats = await importer.import_products(str(path))
+    assert (stats.read, stats.written, stats.rejected) == (3, 1, 2)
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from app.models import CaloriesResponse
+from app.nutrition_service import NutritionService
+
+
+class FakeDatabase:
+    """food_cache в словаре; каталог products пуст."""
+
+    def __init__(self):
+        self.rows: Dict[str, SimpleNamespace] = {}
+
+    async def get_food_cache(self, key: str):
+        return self.rows.get(key)
+
+    async def get_food_cache_many(self, keys: List[str]):
+        return [self.rows[key] for key in keys if key in self.rows]
+
+    async def get_products_by_normalized_names(self, names: List[str]):
+        return []
+
+    async def save_food_cache(self, key: str, food: Optional[CaloriesResponse]) -> None:
+        self.rows[key] = SimpleNamespace(
+            key=key,
+            found=food is not None,
+            updated_at=datetime.now(timezone.utc),
+            **(food.model_dump() if food is not None else {}),
+        )
+
+
+class FakeFatSecret:
+    def __init__(self, foods: Dict[str, CaloriesResponse]):
+        self.foods = foods
+        self.calls: List[str] = []
+
+    async def get_calories(self, food_name: str) -> Optional[CaloriesResponse]:
+        self.calls.append(food_name)
+        return self.foods.get(food_name)
+
+
+APPLE = CaloriesResponse(
+    food_name="Apple",
+    calories=52.0,
+    serving_description="100 г",
+    protein=0.3,
+    fat=0.2,
+    carbohydrates=14.0,
+)
+
+
+def make_service(db: FakeDatabase, foods: Dict[str, CaloriesResponse]) -> NutritionService:
+    service = NutritionService()
+    service.db = db
+    service.fatsecret = FakeFatSecret(foods)
+    return service
+
+
+async def test_found_result_is_served_from_memory():
+    service = make_service(FakeDatabase(), {"apple": APPLE})
+    assert await service.get_calories("Apple") == APPLE
+    assert await service.get_calories("  APPLE ") == APPLE
+    assert service.fatsecret.calls == ["apple"]
+    assert service.upstream_calls == 1
+
+
+async def test_not_found_is_cached():
+    db = FakeDatabase()
+    service = make_service(db, {})
+    assert await service.get_calories("unobtainium") is None
+    assert await service.get_calories("unobtainium") is None
+    assert service.upstream_calls == 1
+    assert service.negative_hits == 1
+    assert db.rows["unobtainium"].found is False
+
+
+async def test_not_found_expires_with_negative_ttl():
+    service = make_service(FakeDatabase(), {"apple": APPLE})
+    service.negative_ttl = 0.02
+    assert await service.get_calories("unobtainium") is None
+    # Найденное живёт по основному TTL и не перезапрашивается
+    assert await service.get_calories("apple") == APPLE
+    await asyncio.sleep(0.03)
+    assert await service.get_calories("unobtainium") is None
+    assert await service.get_calories("apple") == APPLE
+    assert service.fatsecret.calls == ["unobtainium", "apple", "unobtainium"]
+
+
+async def test_food_cache_table_survives_restart():
+    db = FakeDatabase()
+    await make_service(db, {"apple": APPLE}).get_calories("apple")
+    await make_service(db, {}).get_calories("unobtainium")
+
+    restarted = make_service(db, {})
+    assert await restarted.get_calories("apple") == APPLE
+    assert await restarted.get_calories("unobtainium") is None
+    assert restarted.fatsecret.calls == []
+    assert restarted.db_hits == 2
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from app.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitExceeded,
+    TokenBucket,
+    retry_with_backoff,
+)
+
+
+async def test_token_bucket_spends_burst_then_paces():
+    bucket = TokenBucket(rate=20, capacity=3, max_wait=1.0)
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.03
+    assert bucket.throttled == 0
+
+    for _ in range(2):
+        await bucket.acquire()
+    # Ещё два токена по 1/20 с
+    assert time.monotonic() - started >= 0.09
+    assert bucket.throttled == 2
+
+
+async def test_token_bucket_rejects_beyond_max_wait():
+    bucket = TokenBucket(rate=1, capacity=1, max_wait=0.1)
+    await bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        await bucket.acquire()
+    assert bucket.rejected == 1
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.allow()
+        breaker.record(False)
+
+
+def test_circuit_breaker_opens_on_failure_rate():
+    breaker = CircuitBreaker("upstream", window=10, min_calls=4, failure_rate=0.5, reset_timeout=60)
+    breaker.allow()
+    breaker.record(True)
+    _fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.CLOSED  # меньше min_calls
+    _fail(breaker, 1)
+    breaker.allow()
+    breaker.record(True)
+    # 2 ошибки из 4
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_circuit_breaker_half_open_lets_one_probe():
+    breaker = CircuitBreaker("upstream", window=4, min_calls=2, failure_rate=0.5, reset_timeout=0.0)
+    _fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # пробный вызов уже идёт
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.transitions == {"closed->open": 1, "open->half_open": 2, "half_open->open": 1, "half_open->closed": 1}
+
+
+def test_circuit_breaker_release_frees_probe():
+    breaker = CircuitBreaker("upstream", window=4, min_calls=2, failure_rate=0.5, reset_timeout=0.0)
+    _fail(breaker, 2)
+    breaker.allow()
+    breaker.release()  # пробный вызов отменён
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+async def test_retry_with_backoff_retries_only_transient_errors():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("temporary")
+        return "ok"
+
+    retried = []
+    result = await retry_with_backoff(
+        flaky, attempts=3, base_delay=0.001, max_delay=0.01,
+        retry_if=lambda e: isinstance(e, ConnectionError), on_retry=retried.append,
+    )
+    assert result == "ok"
+    assert len(calls) == 3
+    assert len(retried) == 2
+
+    async def broken():
+        calls.append(1)
+        raise ValueError("permanent")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        await retry_with_backoff(
+            broken, attempts=3, base_delay=0.001, max_delay=0.01,
+            retry_if=lambda e: isinstance(e, ConnectionError),
+        )
+    assert len(calls) == 1
+
+
+async def test_retry_with_backoff_raises_last_error_after_attempts():
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise ConnectionError(f"attempt {len(calls)}")
+
+    with pytest.raises(ConnectionError, match="attempt 2"):
+        await retry_with_backoff(down, attempts=2, base_delay=0.001, max_delay=0.01, retry_if=lambda e: True)
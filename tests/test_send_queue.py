@@ -0,0 +1,124 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import pytest
+from telegram.error import Forbidden, RetryAfter
+
+from app.send_queue import BULK, INTERACTIVE, OutboundQueue
+
+
+class FakeBot:
+    def __init__(self, delays: Dict[int, float] = None, errors: Dict[int, List[Exception]] = None):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.sent: List[Tuple[int, str]] = []
+        self.calls = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delays.get(chat_id, 0))
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append((chat_id, text))
+        return text
+
+
+async def started_queue(bot: FakeBot, workers: int) -> OutboundQueue:
+    queue = OutboundQueue(bot, workers=workers)
+    await queue.start()
+    return queue
+
+
+async def test_interactive_replies_overtake_bulk():
+    bot = FakeBot()
+    queue = await started_queue(bot, workers=1)
+    for i in range(5):
+        queue.enqueue(100 + i, f"digest {i}", priority=BULK)
+    queue.enqueue(1, "reply", priority=INTERACTIVE)
+    await queue.stop()
+    assert bot.sent[0] == (1, "reply")
+    assert [text for _, text in bot.sent[1:]] == [f"digest {i}" for i in range(5)]
+
+
+async def test_messages_of_one_chat_keep_order_without_blocking_others():
+    # Чат 1 медленный: его сообщения ждут у одного воркера, остальные чаты идут мимо
+    bot = FakeBot(delays={1: 0.02})
+    queue = await started_queue(bot, workers=2)
+    for i in range(4):
+        queue.enqueue(1, f"slow {i}")
+    for i in range(4):
+        queue.enqueue(2, f"fast {i}")
+    await queue.stop()
+
+    slow = [text for chat_id, text in bot.sent if chat_id == 1]
+    fast = [text for chat_id, text in bot.sent if chat_id == 2]
+    assert slow == [f"slow {i}" for i in range(4)]
+    assert fast == [f"fast {i}" for i in range(4)]
+    # Быстрый чат закончил раньше, чем медленный
+    assert bot.sent.index((2, "fast 3")) < bot.sent.index((1, "slow 3"))
+    assert queue.stats()["active_chats"] == 0
+
+
+async def test_parked_messages_count_in_queue_depth():
+    bot = FakeBot(delays={1: 0.05})
+    queue = await started_queue(bot, workers=2)
+    for i in range(3):
+        queue.enqueue(1, f"reply {i}")
+    await asyncio.sleep(0.01)
+    # Первое отправляется, два ждут за ним в очереди чата
+    stats = queue.stats()
+    assert stats["parked"] == 2
+    assert stats["queue_depth"]["interactive"] == 2
+    await queue.stop()
+    assert queue.stats()["queue_depth"]["interactive"] == 0
+
+
+async def test_retry_after_pauses_and_resends():
+    bot = FakeBot(errors={1: [RetryAfter(0.05)]})
+    queue = await started_queue(bot, workers=1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    message = queue.enqueue(1, "hello")
+    assert await message.future == "hello"
+    assert loop.time() - started >= 0.05
+    assert bot.calls == 2
+    assert bot.sent == [(1, "hello")]
+    await queue.stop()
+
+
+async def test_other_errors_reach_the_future_and_are_not_retried():
+    bot = FakeBot(errors={1: [Forbidden("bot was blocked by the user")]})
+    queue = await started_queue(bot, workers=1)
+    with pytest.raises(Forbidden):
+        await queue.send(1, "hello")
+    assert bot.calls == 1
+    assert queue.failed == 1
+
+    # Очередь продолжает работать
+    assert await queue.send(2, "next") == "next"
+    await queue.stop()
+
+
+async def test_cancelled_message_is_not_sent():
+    bot = FakeBot(delays={1: 0.02})
+    queue = await started_queue(bot, workers=1)
+    queue.enqueue(1, "first")
+    second = queue.enqueue(1, "second")
+    second.future.cancel()
+    await queue.stop()
+    assert bot.sent == [(1, "first")]
+    assert not second.started
+
+
+async def test_stop_drains_queue_and_enqueue_requires_start():
+    bot = FakeBot()
+    queue = OutboundQueue(bot, workers=2)
+    with pytest.raises(RuntimeError):
+        queue.enqueue(1, "too early")
+    await queue.start()
+    for i in range(20):
+        queue.enqueue(i % 3, str(i))
+    await queue.stop()
+    assert len(bot.sent) == 20
+    assert queue.stats()["queue_depth"] == {"interactive": 0, "bulk": 0}
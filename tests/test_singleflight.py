@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.ensure_future(flight.do("key", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert len(flight) == 1
+    release.set()
+    assert await asyncio.gather(*waiters) == ["value"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "collapsed": 4}
+
+
+async def test_error_is_shared_and_key_is_freed():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise RuntimeError("upstream down")
+
+    waiters = [asyncio.ensure_future(flight.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # Ошибка не кэшируется: следующий вызов выполняется заново
+    async def ok():
+        return 42
+
+    assert await flight.do("key", ok) == 42
+    assert flight.calls == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "value"
+
+    first = asyncio.ensure_future(flight.do("key", load))
+    second = asyncio.ensure_future(flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "value"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_different_keys_run_independently():
+    flight = SingleFlight()
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    results = await asyncio.gather(*(flight.do(k, lambda k=k: load(k)) for k in ("a", "b", "a")))
+    assert results == ["a", "b", "a"]
+    assert sorted(calls) == ["a", "b"]
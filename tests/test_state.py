@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.config import get_settings
+from app.utils.state import LocalStore, create_store
+
+
+async def test_local_store_roundtrip():
+    store = LocalStore(maxsize=10, ttl=60)
+    assert await store.get("chat:1", "missing") == "missing"
+    await store.set("chat:1", ("user", "product"))
+    assert await store.get("chat:1") == ("user", "product")
+    await store.delete("chat:1")
+    assert await store.get("chat:1") is None
+
+
+async def test_local_store_ttl_and_clear():
+    store = LocalStore(maxsize=10, ttl=60)
+    await store.set("short", 1, ttl=0.02)
+    await store.set("long", 2)
+    await asyncio.sleep(0.03)
+    assert await store.get("short") is None
+    assert await store.get("long") == 2
+    await store.clear()
+    assert await store.get("long") is None
+
+
+async def test_local_store_is_bounded():
+    store = LocalStore(maxsize=2, ttl=60)
+    for key in ("a", "b", "c"):
+        await store.set(key, key)
+    stats = store.stats()
+    assert stats["backend"] == "local"
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_create_store_uses_configured_backend(monkeypatch):
+    assert isinstance(create_store(maxsize=1, ttl=1), LocalStore)
+    monkeypatch.setattr(get_settings(), "STATE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_store(maxsize=1, ttl=1)
@@ -0,0 +1,90 @@
+import math
+import uuid
+
+import numpy as np
+import pytest
+
+from app.suggest_service import ProductCatalog, _top
+
+
+def make_catalog(products):
+    """products: (name, калории на 100 г, белок на 100 г или None)."""
+    return ProductCatalog.from_rows([
+        (uuid.UUID(int=i), name, calories, protein) for i, (name, calories, protein) in enumerate(products)
+    ])
+
+
+CATALOG = [
+    ("cucumber", 15.0, 0.7),
+    ("apple", 52.0, None),
+    ("chicken", 165.0, 31.0),
+    ("tofu", 76.0, 8.0),
+    ("butter", 717.0, 0.9),
+]
+
+
+def names(items):
+    return [item.name for item in items]
+
+
+def test_calories_sort_gives_most_grams_first():
+    catalog = make_catalog(CATALOG)
+    items = catalog.rank(100.0, "calories", limit=3, max_grams=10000)
+    assert names(items) == ["cucumber", "apple", "tofu"]
+    assert items[0].grams == pytest.approx(100 * 100 / 15)
+    assert items[1].protein is None and items[1].protein_grams is None
+
+
+def test_max_grams_drops_too_large_portions():
+    catalog = make_catalog(CATALOG)
+    # 300 ккал: огурцов 2 кг, яблок 577 г — огурцы больше порога
+    items = catalog.rank(300.0, "calories", limit=10, max_grams=1000)
+    assert "cucumber" not in names(items)
+    assert all(item.grams <= 1000 for item in items)
+
+
+def test_protein_sort_skips_unknown_protein():
+    catalog = make_catalog(CATALOG)
+    items = catalog.rank(165.0, "protein", limit=10, max_grams=10000)
+    assert names(items)[0] == "chicken"
+    assert items[0].protein_grams == pytest.approx(31.0)
+    assert "apple" not in names(items)
+
+
+def test_min_protein_filters_nan_and_favorites():
+    catalog = make_catalog(CATALOG)
+    favorites = [uuid.UUID(int=1), uuid.UUID(int=2)]  # apple (белок неизвестен), chicken
+    items = catalog.rank(100.0, "favorites", limit=10, max_grams=10000, min_protein=5, favorites=favorites)
+    assert names(items) == ["chicken", "tofu"]
+    assert [item.favorite for item in items] == [True, False]
+
+
+def test_favorites_go_first_even_over_max_grams():
+    catalog = make_catalog(CATALOG)
+    favorites = [uuid.UUID(int=0), uuid.UUID(int=99)]  # cucumber и продукт не из каталога
+    items = catalog.rank(500.0, "favorites", limit=3, max_grams=1000, favorites=favorites)
+    assert names(items) == ["cucumber", "apple", "tofu"]
+    assert items[0].favorite and items[0].grams > 1000
+    assert not items[1].favorite
+    assert "cucumber" not in names(catalog.rank(500.0, "calories", limit=3, max_grams=1000))
+
+
+def test_unknown_sort_is_rejected():
+    with pytest.raises(ValueError):
+        make_catalog(CATALOG).rank(100.0, "price", limit=3, max_grams=1000)
+
+
+def test_top_returns_best_k_in_order():
+    score = np.array([5.0, 1.0, 9.0, 7.0, 3.0, 9.0], dtype=np.float32)
+    mask = np.array([True, True, True, True, True, False])
+    assert _top(score, mask, 3).tolist() == [2, 3, 0]
+    assert _top(score, mask, 10).tolist() == [2, 3, 0, 4, 1]
+    assert _top(score, mask, 0).tolist() == []
+    assert _top(score, np.zeros(6, dtype=bool), 3).tolist() == []
+
+
+def test_catalog_stores_unknown_protein_as_nan():
+    catalog = make_catalog(CATALOG)
+    assert len(catalog) == 5
+    assert catalog.calories.dtype == np.float32
+    assert math.isnan(catalog.protein[1])
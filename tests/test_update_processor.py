@@ -0,0 +1,96 @@
+import asyncio
+from typing import List
+
+from telegram import Update
+
+from app.update_processor import PerChatUpdateProcessor
+
+
+def make_update(chat_id: int, update_id: int = 1) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": "/get_product",
+        },
+    }, None)
+
+
+async def test_updates_of_one_chat_run_in_order():
+    processor = PerChatUpdateProcessor(workers=4, max_pending=16)
+    await processor.initialize()
+    log: List[str] = []
+
+    async def handler(name: str, delay: float):
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+
+    # Первое обновление медленнее второго, но второе его не обгоняет
+    await asyncio.gather(
+        processor.do_process_update(make_update(1, 1), handler("change_product", 0.03)),
+        processor.do_process_update(make_update(1, 2), handler("get_product", 0.0)),
+    )
+    assert log == ["start change_product", "end change_product", "start get_product", "end get_product"]
+    assert processor.stats()["active_chats"] == 0
+
+
+async def test_different_chats_run_concurrently():
+    processor = PerChatUpdateProcessor(workers=4, max_pending=16)
+    await processor.initialize()
+    running = 0
+    peak = 0
+
+    async def handler():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(*(
+        processor.do_process_update(make_update(chat_id), handler()) for chat_id in range(4)
+    ))
+    assert peak == 4
+    assert processor.processed == 4
+
+
+async def test_workers_limit_concurrency_and_waiting_chat_holds_no_slot():
+    processor = PerChatUpdateProcessor(workers=2, max_pending=16)
+    await processor.initialize()
+    running = 0
+    peak = 0
+    started: List[int] = []
+
+    async def handler(chat_id: int):
+        nonlocal running, peak
+        started.append(chat_id)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    # Пять обновлений чата 1 и одно чата 2: больше двух сразу не выполняется,
+    # а ждущие своей очереди в чате 1 не занимают слот и не задерживают чат 2
+    updates = [processor.do_process_update(make_update(1, i), handler(1)) for i in range(5)]
+    updates.append(processor.do_process_update(make_update(2), handler(2)))
+    await asyncio.gather(*updates)
+    assert peak == 2
+    assert started[:2] == [1, 2]
+    assert processor.processed == 6
+    assert processor.stats()["queue_depth"] == 0
+
+
+async def test_updates_without_chat_are_not_serialized():
+    processor = PerChatUpdateProcessor(workers=2, max_pending=4)
+    await processor.initialize()
+    done = []
+
+    async def handler(i):
+        await asyncio.sleep(0.01)
+        done.append(i)
+
+    await asyncio.gather(*(processor.do_process_update(object(), handler(i)) for i in range(2)))
+    assert sorted(done) == [0, 1]
@@ -0,0 +1,149 @@
+import asyncio
+from typing import List
+
+import pytest
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from app.utils.database import is_transient_db_error
+from app.utils.write_behind import BufferFull, WriteBehindBuffer
+
+
+def make_buffer(write, **kwargs) -> WriteBehindBuffer:
+    options = dict(
+        max_items=100, batch_size=10, interval=0.05, put_timeout=0.1, attempts=1,
+        retry_if=lambda e: isinstance(e, ConnectionError),
+    )
+    options.update(kwargs)
+    return WriteBehindBuffer("test", write, **options)
+
+
+async def test_writes_full_batches_in_order():
+    batches: List[List[int]] = []
+
+    async def write(batch):
+        batches.append(list(batch))
+
+    buffer = make_buffer(write, interval=10)
+    await buffer.put_many(list(range(25)))
+    await buffer.stop()
+    assert batches == [list(range(10)), list(range(10, 20)), list(range(20, 25))]
+    assert buffer.stats()["written"] == 25
+
+
+async def test_flushes_partial_batch_after_interval():
+    written = asyncio.Event()
+
+    async def write(batch):
+        written.set()
+
+    buffer = make_buffer(write, interval=0.02)
+    await buffer.put_many([1, 2, 3])
+    await asyncio.wait_for(written.wait(), 1)
+    assert len(buffer) == 0
+    await buffer.stop()
+
+
+async def test_backpressure_waits_for_space_then_rejects():
+    release = asyncio.Event()
+
+    async def write(batch):
+        await release.wait()
+
+    buffer = make_buffer(write, max_items=20, batch_size=10, put_timeout=0.05)
+    await buffer.put_many(list(range(10)))
+    await asyncio.sleep(0.01)  # первая пачка ушла в запись и висит
+    await buffer.put_many(list(range(20)))
+    assert len(buffer) == 20
+
+    with pytest.raises(BufferFull):
+        await buffer.put_many([1])
+    assert buffer.rejected == 1
+    assert buffer.backpressure_waits >= 1
+
+    # Запись освободилась: место появляется, put_many проходит
+    release.set()
+    await buffer.put_many([1])
+    await buffer.stop()
+    assert buffer.written == 31
+
+
+async def test_oversized_batch_is_accepted_into_empty_buffer():
+    async def write(batch):
+        pass
+
+    buffer = make_buffer(write, max_items=5, batch_size=5)
+    await buffer.put_many(list(range(12)))
+    await buffer.stop()
+    assert buffer.written == 12
+
+
+async def test_failed_batch_is_retried_then_dropped():
+    attempts = []
+
+    async def write(batch):
+        attempts.append(len(batch))
+        raise ConnectionError("db down")
+
+    buffer = make_buffer(write, attempts=2, interval=10)
+    await buffer.put_many(list(range(10)))
+    await buffer.stop()
+    assert attempts == [10, 10]
+    assert buffer.flush_retries == 1
+    assert buffer.dropped == 10
+    assert buffer.written == 0
+
+
+async def test_permanent_error_is_not_retried():
+    attempts = []
+
+    async def write(batch):
+        attempts.append(len(batch))
+        raise ValueError("duplicate key")
+
+    buffer = make_buffer(write, attempts=3, interval=10)
+    await buffer.put_many(list(range(10)))
+    await buffer.stop()
+    assert attempts == [10]
+    assert buffer.flush_retries == 0
+    assert buffer.dropped == 10
+
+
+class _AdaptedError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def _wrapped(error: Exception) -> ValueError:
+    # Как в методах Database: исключение заворачивается в ValueError
+    try:
+        try:
+            raise error
+        except Exception:
+            raise ValueError("Error saving activity samples")
+    except ValueError as e:
+        return e
+
+
+def test_transient_db_errors():
+    deadlock = DBAPIError("INSERT", {}, _AdaptedError("40P01"))
+    duplicate = IntegrityError("INSERT", {}, _AdaptedError("23505"))
+    assert is_transient_db_error(_wrapped(ConnectionResetError()))
+    assert is_transient_db_error(_wrapped(deadlock))
+    assert is_transient_db_error(_AdaptedError("08006"))
+    assert not is_transient_db_error(_wrapped(duplicate))
+    assert not is_transient_db_error(_wrapped(TypeError("bad batch")))
+
+
+async def test_stop_drains_everything():
+    written: List[int] = []
+
+    async def write(batch):
+        await asyncio.sleep(0.001)
+        written.extend(batch)
+
+    buffer = make_buffer(write, interval=10, max_items=1000)
+    for start in range(0, 100, 7):
+        await buffer.put_many(list(range(start, min(start + 7, 100))))
+    await buffer.stop()
+    assert written == list(range(100))